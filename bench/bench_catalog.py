@@ -0,0 +1,210 @@
+"""
+Benchmark + cek CatalogCrawler (src/catalog.py) terhadap toko tiruan besar.
+
+    python -m bench.bench_catalog [sku] [latency_ms]
+
+Stub lokal meniru /api/v4/shop/search_items untuk satu toko berisi `sku`
+item (urut terbaru dulu, ~10% stok habis). Crawler memakai ShopeeClient asli
+(breaker, rate limiter, parser) dan SQLiteStorage di direktori sementara;
+auto-track dimatikan supaya stub tidak perlu melayani PDP.
+
+Tiap fase = satu sapuan penuh (crawl berulang sampai kursor kembali ke depan):
+  baseline : toko belum dikenal -> semua halaman diproses, 0 notifikasi
+  sama     : tidak ada perubahan -> semua halaman dilewati lewat checksum
+  berubah  : 5 listing baru + 30 restock -> tepat itu yang dikabari; halaman
+             yang cuma bergeser karena listing baru tetap dihitung sama
+  keyword  : feed kata kunci di toko yang sama, lalu 1 listing baru yang cocok
+Peak memori Python (tracemalloc) per fase ikut dicetak: harus datar, tidak
+tumbuh dengan jumlah SKU.
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import parse_qs, urlsplit
+
+os.environ.setdefault("RATE_LIMIT", "1000000")
+os.environ.setdefault("RATE_LIMIT_MAX", "1000000")
+os.environ.setdefault("RATE_LIMIT_MIN", "1000000")
+os.environ.setdefault("CURL_DIR", os.path.join(tempfile.gettempdir(), "bench_catalog_no_curl_dir"))
+os.environ.setdefault("METRICS_PORT", "0")
+
+from src.catalog import CatalogCrawler  # noqa: E402
+from src.monitor import ProductMonitor  # noqa: E402
+from src.shopee import ShopeeClient  # noqa: E402
+from src.storage import SQLiteStorage  # noqa: E402
+
+SHOP_ID = "77"
+CHAT_ID = 1
+PAGE_SIZE = 60
+
+
+class ListingStub:
+    """Toko tiruan; `items` urut terbaru dulu, tiap item [itemid, ctime, stock, name]."""
+
+    def __init__(self, sku: int, latency: float):
+        self.latency = latency
+        self.requests = 0
+        past = int(time.time()) - 86400
+        self.items = [
+            [sku - n, past - n, 0 if n % 10 == 3 else 5, f"Kaos {'Merah' if n % 7 == 0 else 'Polos'} {sku - n}"]
+            for n in range(sku)
+        ]
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def add_listing(self, name: str):
+        item_id = max(item[0] for item in self.items) + 1
+        self.items.insert(0, [item_id, int(time.time()) + 1, 3, name])
+
+    def restock(self, count: int):
+        empty = [item for item in self.items if item[2] == 0]
+        step = max(1, len(empty) // count)
+        for item in empty[::step][:count]:
+            item[2] = 8
+
+    def _page(self, query: dict) -> dict:
+        offset, limit = int(query["offset"][0]), int(query["limit"][0])
+        keyword = query.get("keyword", [""])[0].lower()
+        items = [item for item in self.items if keyword in item[3].lower()] if keyword else self.items
+        page = items[offset:offset + limit]
+        return {
+            "total_count": len(items),
+            "nomore": offset + limit >= len(items),
+            "items": [
+                {"itemid": item_id, "shopid": int(SHOP_ID), "item_basic": {
+                    "itemid": item_id, "shopid": int(SHOP_ID), "name": name, "ctime": ctime,
+                    "stock": stock, "price": 2500000000, "status": 1,
+                }}
+                for item_id, ctime, stock, name in page
+            ],
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                payload = json.dumps(self._page(parse_qs(urlsplit(request.split()[1].decode()).query))).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class Inbox:
+    """Pengganti NotificationDispatcher: simpan pesan per chat."""
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, chat_id, text):
+        self.messages.append((chat_id, text))
+
+    def enqueue_many(self, chat_ids, text):
+        for chat_id in chat_ids:
+            self.enqueue(chat_id, text)
+
+
+async def sweep(crawler: CatalogCrawler, stub: ListingStub, feed_id: int) -> dict:
+    """Crawl berulang sampai kursor sapuan kembali ke halaman depan."""
+    total = {"crawls": 0, "pages": 0, "unchanged": 0, "new": 0, "restocks": 0}
+    before = stub.requests
+    tracemalloc.start()
+    started = time.perf_counter()
+    while True:
+        feed = next(f for f in crawler.storage.load_shop_feeds() if f["id"] == feed_id)
+        if total["crawls"] and feed["sweep_page"] == crawler.head_pages:
+            break
+        result = await crawler.crawl(feed)
+        assert not result["failed"], "fetch gagal"
+        total["crawls"] += 1
+        total["pages"] += result["pages"]
+        total["unchanged"] += result["unchanged"]
+        total["new"] += len(result["new"])
+        total["restocks"] += len(result["restocks"])
+    total["seconds"] = time.perf_counter() - started
+    total["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    total["requests"] = stub.requests - before
+    return total
+
+
+def report(label: str, total: dict):
+    print(
+        f"{label:<9}: {total['seconds'] * 1000:8.0f} ms, {total['crawls']:3d} crawl, "
+        f"{total['requests']:4d} request, {total['pages']:4d} halaman (sama {total['unchanged']:4d}), "
+        f"baru {total['new']:2d}, restock {total['restocks']:2d}, peak {total['peak_kb']:7.0f} KiB"
+    )
+
+
+async def main():
+    sku = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 2) / 1000
+    stub = ListingStub(sku, latency)
+    await stub.start()
+    directory = tempfile.mkdtemp(prefix="catalog_bench_")
+    storage = SQLiteStorage(os.path.join(directory, "tracker.db"))
+    inbox = Inbox()
+    client = ShopeeClient(base_url=f"http://127.0.0.1:{stub.port}")
+    crawler = CatalogCrawler(
+        ProductMonitor(storage), inbox, client=client,
+        page_size=PAGE_SIZE, head_pages=1, sweep_pages=25, auto_track=False,
+    )
+    print(f"{sku} SKU, {PAGE_SIZE} item/halaman, latency stub {latency * 1000:.0f} ms/request")
+
+    feed_id, _ = storage.add_shop_watch(CHAT_ID, SHOP_ID)
+    total = await sweep(crawler, stub, feed_id)
+    report("baseline", total)
+    assert total["new"] == total["restocks"] == 0 and not inbox.messages
+
+    total = await sweep(crawler, stub, feed_id)
+    report("sama", total)
+    assert total["unchanged"] == total["pages"]
+
+    for n in range(5):
+        stub.add_listing(f"Kaos Edisi Baru {n}")
+    stub.restock(30)
+    total = await sweep(crawler, stub, feed_id)
+    report("berubah", total)
+    assert (total["new"], total["restocks"]) == (5, 30), total
+    # tiap halaman yang berubah memuat minimal satu listing baru / restock
+    assert total["pages"] - total["unchanged"] <= total["new"] + total["restocks"], total
+    # listing baru ada di halaman depan -> satu pesan; restock per crawl yang menemukannya
+    assert sum("Listing baru" in text for _, text in inbox.messages) == 1
+    assert sum(text.count("🛒") for _, text in inbox.messages if "Restock" in text) == 30
+
+    inbox.messages.clear()
+    keyword_id, _ = storage.add_shop_watch(CHAT_ID, SHOP_ID, "merah")
+    total = await sweep(crawler, stub, keyword_id)
+    report("keyword", total)
+    assert total["new"] == 0
+    stub.add_listing("Kaos Merah Baru")
+    total = await sweep(crawler, stub, keyword_id)
+    assert total["new"] == 1 and "Kaos Merah Baru" in inbox.messages[-1][1]
+    print(f"keyword  : listing baru yang cocok terdeteksi dalam {total['crawls']} crawl")
+
+    await client.aclose()
+    storage.close()
+    stub.server.close()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
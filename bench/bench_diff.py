@@ -0,0 +1,104 @@
+"""
+Benchmark deteksi perubahan variasi.
+
+    python -m bench.bench_diff [variasi] [variasi_per_item]
+
+Default 100k variasi (10k item x 10 variasi). Tiap skenario menjalankan satu
+"cycle" diff seluruh item dengan persentase variasi yang berubah tertentu,
+lalu mencatat waktu, jumlah item yang perlu ditulis ke storage, dan event.
+Terakhir dicek: variasi baru (setengahnya langsung ada stok) tidak boleh
+jadi event restock, hanya new_variant untuk yang ada stoknya.
+"""
+import random
+import sys
+import time
+
+from src.diff import NEW_VARIANT, RESTOCK, ChangeDetector
+from src.parser import ProductRecord, VariantRecord
+
+
+def make_records(items: int, per_item: int, rng: random.Random):
+    records = {}
+    for i in range(items):
+        variants = tuple(
+            VariantRecord(1000 * i + m, f"Variasi {m}", 10000 + m * 500, rng.randint(0, 20))
+            for m in range(per_item)
+        )
+        key = ("1", str(i))
+        records[key] = ProductRecord(key[0], key[1], f"Produk {i}", 1, None, None, variants)
+    return records
+
+
+def mutate(records: dict, fraction: float, rng: random.Random) -> dict:
+    """Salinan records dengan `fraction` variasi berubah stok/harga."""
+    result = {}
+    for key, record in records.items():
+        variants = record.variants
+        if rng.random() < fraction * len(variants):
+            variants = list(variants)
+            n = rng.randrange(len(variants))
+            v = variants[n]
+            if rng.random() < 0.5:
+                stock = 0 if v.stock else rng.randint(1, 20)
+                variants[n] = VariantRecord(v.model_id, v.name, v.price, stock)
+            else:
+                variants[n] = VariantRecord(v.model_id, v.name, v.price - 1000, v.stock)
+            variants = tuple(variants)
+        result[key] = ProductRecord(key[0], key[1], record.name, 1, None, None, variants)
+    return result
+
+
+def add_variants(records: dict, count: int) -> dict:
+    """Salinan records dengan satu variasi baru di `count` item pertama (genap: stok 0)."""
+    result = dict(records)
+    for n, key in enumerate(list(records)[:count]):
+        record = records[key]
+        model_id = 10 ** 9 + n
+        variants = record.variants + (VariantRecord(model_id, "Variasi baru", 15000, 0 if n % 2 == 0 else 4),)
+        result[key] = ProductRecord(key[0], key[1], record.name, 1, None, None, variants)
+    return result
+
+
+def run_cycle(detector: ChangeDetector, records: dict):
+    start = time.perf_counter()
+    changed = events = 0
+    for key, record in records.items():
+        dirty, found = detector.diff(key, record)
+        changed += dirty
+        events += len(found)
+    return time.perf_counter() - start, changed, events
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    per_item = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    items = max(1, total // per_item)
+    rng = random.Random(42)
+
+    records = make_records(items, per_item, rng)
+    detector = ChangeDetector(low_stock=3, price_drop_percent=1)
+    elapsed, changed, _ = run_cycle(detector, records)
+    print(f"{items} item x {per_item} variasi = {items * per_item} variasi")
+    print(f"baseline: {elapsed * 1000:.1f} ms, {changed} item ditulis\n")
+
+    print(f"{'berubah':>8} {'ms/cycle':>9} {'ns/variasi':>11} {'ditulis':>8} {'event':>7}")
+    for fraction in (0.0, 0.001, 0.01, 0.1):
+        polled = mutate(records, fraction, rng)
+        elapsed, changed, events = run_cycle(detector, polled)
+        records = polled
+        print(
+            f"{fraction:>7.1%} {elapsed * 1000:>9.1f} {elapsed * 1e9 / (items * per_item):>11.0f} "
+            f"{changed:>8} {events:>7}"
+        )
+
+    count = min(1000, items)
+    polled = add_variants(records, count)
+    found = [e for key, record in polled.items() for e in detector.diff(key, record)[1]]
+    kinds = [e.kind for e in found]
+    assert RESTOCK not in kinds, "variasi baru tidak boleh jadi restock"
+    assert kinds.count(NEW_VARIANT) == count // 2 and all(e.new_stock == 4 for e in found), kinds[:5]
+    print(f"\nvariasi baru di {count} item: {kinds.count(NEW_VARIANT)} new_variant (yang ada stok), 0 restock")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark HistoryStore (src/history.py).
+
+    python -m bench.bench_history [series] [polls]
+
+Menulis `series` variasi x `polls` poll (interval 5 menit, harga berubah
+sesekali, stok turun pelan lalu restock) ke direktori sementara, lalu
+mengukur: laju append, checkpoint & kompaksi, ukuran di disk per sample,
+latency query / window_stats, dan waktu buka ulang (replay WAL).
+"""
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from src.history import HistoryStore
+
+INTERVAL = 300
+FLUSH_EVERY = 500  # series per flush, kira-kira satu siklus poll
+
+
+def main():
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    polls = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    rng = random.Random(1)
+    directory = tempfile.mkdtemp(prefix="history_bench_")
+    # WAL limit kecil supaya checkpoint & kompaksi ikut terukur
+    store = HistoryStore(directory, retention_days=365, wal_limit=2 * 1024 * 1024)
+
+    keys = [(str(i // 4), str(i // 4), i % 4) for i in range(series)]
+    prices = [rng.randrange(10, 2000) * 1000 for _ in keys]
+    stocks = [rng.randrange(0, 50) for _ in keys]
+    start = int(time.time()) - polls * INTERVAL
+
+    t0 = time.perf_counter()
+    for poll in range(polls):
+        ts = start + poll * INTERVAL
+        for i, key in enumerate(keys):
+            if rng.random() < 0.02:
+                prices[i] = max(1000, prices[i] + rng.choice((-1, 1)) * rng.randrange(1, 20) * 1000)
+            if rng.random() < 0.1:
+                stocks[i] = stocks[i] - 1 if stocks[i] > 0 else rng.randrange(5, 50)
+            store.append(key, ts + i % INTERVAL, prices[i], stocks[i])
+            if i % FLUSH_EVERY == FLUSH_EVERY - 1:
+                store.flush()
+        store.flush()
+    elapsed = time.perf_counter() - t0
+    total = series * polls
+    print(f"{series} series x {polls} poll = {total} sample")
+    print(f"append+flush  : {elapsed:.2f}s ({total / elapsed:,.0f} sample/s)")
+
+    t0 = time.perf_counter()
+    store.checkpoint()
+    print(f"checkpoint    : {(time.perf_counter() - t0) * 1000:.0f} ms")
+    stats = store.stats()
+    print(
+        f"disk          : {stats['disk_bytes'] / 1024 / 1024:.1f} MB, {stats['segments']} segment, "
+        f"{stats['bytes_per_sample']} byte/sample"
+    )
+
+    end = start + polls * INTERVAL
+    sample_keys = [keys[rng.randrange(series)] for _ in range(1000)]
+    for name, call in (
+        ("query (semua)", lambda k: store.query(k, 0, end)),
+        ("query (1 jam)", lambda k: store.query(k, end - 3600, end)),
+        ("window_stats", lambda k: store.window_stats(k, start, end)),
+    ):
+        t0 = time.perf_counter()
+        for key in sample_keys:
+            call(key)
+        print(f"{name:<14}: {(time.perf_counter() - t0) * 1000 / len(sample_keys):.3f} ms/series")
+
+    # sample terakhir di WAL saja, lalu buka ulang
+    for i, key in enumerate(keys):
+        store.append(key, end + i % INTERVAL, prices[i], stocks[i])
+    store.flush()
+    check = keys[rng.randrange(series)]
+    expected = store.query(check, 0, end + INTERVAL)
+    for segment in store.segments:
+        segment.close()
+
+    t0 = time.perf_counter()
+    reopened = HistoryStore(directory, retention_days=365)
+    print(f"buka ulang    : {(time.perf_counter() - t0) * 1000:.0f} ms (replay WAL {series} sample)")
+    assert reopened.query(check, 0, end + INTERVAL) == expected, "isi berbeda setelah buka ulang"
+    reopened.close()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
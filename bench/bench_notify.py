@@ -0,0 +1,111 @@
+"""
+Benchmark pengiriman notifikasi terhadap Bot API tiruan.
+
+    python -m bench.bench_notify [rate] [subscribers]
+
+MockBot meniru batas Telegram: `rate` pesan/detik global dan 1 pesan/detik
+per chat; lewat dari itu dijawab RetryAfter. Skenario: satu item populer
+restock ke `subscribers` chat sekaligus, ditambah 100 chat yang dapat 5 event
+berurutan (harus jadi digest). Dibandingkan dengan kirim naif (gather semua).
+
+Default rate=300 supaya cepat; pakai rate=30 untuk angka Telegram asli.
+"""
+import asyncio
+import sys
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+
+from src.notifier import NotificationDispatcher
+from src.storage import SQLiteStorage
+
+
+class MockBot:
+    def __init__(self, rate: float, latency: float = 0.03):
+        self.rate = rate
+        self.latency = latency
+        self.window = deque()
+        self.last_chat = {}
+        self.sent = 0
+        self.rejected = 0
+
+    async def send_message(self, chat_id, text):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1.0:
+            self.window.popleft()
+        if len(self.window) >= self.rate or now - self.last_chat.get(chat_id, -10.0) < 1.0:
+            self.rejected += 1
+            raise RetryAfter(1)
+        self.window.append(now)
+        self.last_chat[chat_id] = now
+        self.sent += 1
+
+
+def workload(subscribers: int):
+    """(chat_ids, text) sesuai urutan enqueue."""
+    jobs = [(list(range(1, subscribers + 1)), "🔔 Restock [Hitam]: stok 0 → 12")]
+    for n in range(5):
+        jobs.append((list(range(100001, 100101)), f"💸 Harga turun produk #{n}"))
+    return jobs
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+async def run_dispatcher(rate: float, subscribers: int):
+    bot = MockBot(rate)
+    storage = SQLiteStorage(":memory:")
+    dispatcher = NotificationDispatcher(bot, storage, rate=rate, digest_window=0.2, concurrency=50)
+    dispatcher.start()
+    start = time.monotonic()
+    total = 0
+    for chat_ids, text in workload(subscribers):
+        dispatcher.enqueue_many(chat_ids, text)
+        total += len(chat_ids)
+    while dispatcher.delivered + dispatcher.dropped < total:
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - start
+    await dispatcher.stop()
+    left = len(storage.load_outbox())
+    return elapsed, total, bot, dispatcher.latencies, left, dispatcher
+
+
+async def run_naive(rate: float, subscribers: int):
+    bot = MockBot(rate)
+    start = time.monotonic()
+    sends = [
+        bot.send_message(chat_id, text)
+        for chat_ids, text in workload(subscribers)
+        for chat_id in chat_ids
+    ]
+    results = await asyncio.gather(*sends, return_exceptions=True)
+    failed = sum(isinstance(r, Exception) for r in results)
+    return time.monotonic() - start, len(sends), bot, failed
+
+
+def main():
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 300
+    subscribers = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    elapsed, total, bot, failed = asyncio.run(run_naive(rate, subscribers))
+    print(f"== naif (gather), batas {rate:.0f} pesan/s ==")
+    print(f"{total} notifikasi, {bot.sent} terkirim, {failed} kena RetryAfter dan hilang, {elapsed:.2f}s\n")
+
+    elapsed, total, bot, latencies, left, d = asyncio.run(run_dispatcher(rate, subscribers))
+    print("== NotificationDispatcher ==")
+    print(
+        f"{total} notifikasi -> {bot.sent} pesan ({d.digests} digest), "
+        f"RetryAfter {bot.rejected}, dibuang {d.dropped}, sisa outbox {left}"
+    )
+    print(
+        f"{elapsed:.2f}s, {bot.sent / elapsed:.1f} pesan/s, "
+        f"latency p50 {percentile(latencies, 0.5):.2f}s p99 {percentile(latencies, 0.99):.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark parser produk.
+
+    python -m bench.bench_parser
+
+Parse semua fixture di bench/fixtures, lalu payload PDP sintetis yang makin
+besar (lebih banyak model + filler) untuk memastikan biaya parse & memori
+record per poll tetap datar terhadap ukuran payload.
+"""
+import copy
+import glob
+import json
+import os
+import time
+import tracemalloc
+
+from src.parser import parse_batch, parse_product
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixtures():
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[os.path.basename(path)[:-5]] = f.read()
+    return fixtures
+
+
+def synthetic_payload(base: dict, models: int, filler_kb: int) -> str:
+    payload = copy.deepcopy(base)
+    item = payload["data"]["item"]
+    template = item["models"][0]
+    item["models"] = []
+    for i in range(models):
+        m = dict(template)
+        m.update({"model_id": 200000 + i, "name": f"Variasi {i}", "stock": i % 7, "price": (10000 + i) * 100000})
+        item["models"].append(m)
+    item["description"] = "x" * (filler_kb * 1024)
+    return json.dumps(payload)
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def retained_bytes(raw: str) -> int:
+    """Memori yang tersisa setelah parse (record saja, dict hasil decode sudah dibuang)."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    record = parse_product(json.loads(raw))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del record
+    return size
+
+
+def main():
+    fixtures = load_fixtures()
+    print("== fixtures ==")
+    for name, raw in fixtures.items():
+        payload = json.loads(raw)
+        records = parse_batch(payload) if name.startswith("batch") else [parse_product(payload)]
+        for record in records:
+            print(f"{name:<16} {record!r}")
+
+    print("\n== scaling (per payload) ==")
+    print(f"{'models':>6} {'filler':>7} {'bytes':>9} {'decode us':>10} {'parse us':>9} {'us/model':>9} {'retained':>9}")
+    base = json.loads(fixtures["pdp_models"])
+    for models, filler_kb in [(1, 4), (10, 16), (100, 64), (1000, 256)]:
+        raw = synthetic_payload(base, models, filler_kb)
+        decoded = json.loads(raw)
+        repeat = max(20, 20000 // (models + filler_kb))
+        decode_us = timeit(lambda: json.loads(raw), repeat)
+        parse_us = timeit(lambda: parse_product(decoded), repeat)
+        print(
+            f"{models:>6} {filler_kb:>5}KB {len(raw):>9} {decode_us:>10.1f} {parse_us:>9.1f} "
+            f"{parse_us / models:>9.2f} {retained_bytes(raw):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Replay benchmark pipeline add -> poll -> diff -> notify, tanpa Shopee asli.
+
+    python -m bench.bench_pipeline [--sizes 1000,10000,100000] [--rounds 3]
+        [--latency 0.02] [--p403 0.002] [--perror 0.002] [--change 0.05]
+        [--concurrency 50] [--chats 1000] [--aimd]
+
+Server Shopee tiruan (proses terpisah, asyncio, HTTP/1.1 keep-alive)
+memutar ulang response PDP rekaman di bench/fixtures: pdp_models /
+pdp_no_models dengan item id, stok & harga diganti, dan payload error
+seperti result.json (error_90309999). Tiap response diberi latency
+`latency` detik (±50%), lalu dengan peluang `p403` dijawab 403 dan `perror`
+dijawab payload error.
+
+403 & error 90309999 dihitung blok oleh client. Tanpa --aimd rate limiter
+dipatok di rate maksimum supaya blok sintetis tidak membuat AIMD menurunkan
+rate dan angka yang keluar mengukur limiter, bukan pipeline; karantina sesi
+dan circuit breaker tetap jalan seperti biasa.
+
+Tiap ukuran dijalankan di proses baru (supaya peak RSS terpisah) dengan
+SQLiteStorage + HistoryStore di direktori sementara dan MockBot dari
+bench_notify sebagai Telegram:
+
+  add    : /add semua item (lewat ProductBatcher, seperti bot)
+  poll   : `rounds` putaran; sebelum tiap putaran server menaikkan versi
+           ~`change` item (stok habis/restock + harga turun) lalu semua item
+           dicek sekali secepat `concurrency`, diikuti monitor.flush()
+  notify : tunggu antrian notifikasi habis; latency = enqueue -> terkirim,
+           detik = dari awal poll pertama sampai antrian kosong
+
+Dilaporkan: throughput, latency p50/p99 per fase, peak RSS, dan ringkasan
+metrics (src/metrics.py) per tahap.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SHOP_ID = 270580867
+
+
+# --- server tiruan -----------------------------------------------------------
+
+def _load(name: str) -> dict:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _unit(item_id: int, n: int) -> float:
+    """Angka pseudo-acak [0, 1) yang stabil untuk (item, putaran)."""
+    return ((item_id * 2654435761 + n * 40503) % 1000003) / 1000003
+
+
+class FakeShopee:
+    def __init__(self, latency: float, p403: float, perror: float, change: float):
+        self.latency = latency
+        self.p403 = p403
+        self.perror = perror
+        self.change = change
+        self.round = 0
+        self.requests = 0
+        self.rng = random.Random(1)
+        self.templates = [_load("pdp_models.json"), _load("pdp_no_models.json"), _load("pdp_no_models.json")]
+        self.error = json.dumps(_load("error_90309999.json")).encode()
+
+    def version(self, item_id: int) -> int:
+        return sum(1 for n in range(1, self.round + 1) if _unit(item_id, n) < self.change)
+
+    def body(self, item_id: int) -> bytes:
+        version = self.version(item_id)
+        template = self.templates[item_id % len(self.templates)]
+        payload = dict(template)
+        payload["data"] = data = dict(template["data"])
+        data["item"] = item = dict(template["data"]["item"])
+        item["item_id"], item["shop_id"] = item_id, SHOP_ID
+        # tiap versi: stok bergantian habis/ada, harga turun 1%
+        price = (100000 + item_id % 1000) * 100000 * (99 ** version) // (100 ** version)
+        if item["models"]:
+            item["models"] = [
+                dict(m, item_id=item_id, stock=0 if (version + k) % 2 else 7 + k, price=price + k * 100000)
+                for k, m in enumerate(item["models"])
+            ]
+        else:
+            item["stock"] = 0 if version % 2 else 12
+            item["price"] = price
+        return json.dumps(payload).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                status, body = await self.respond(request.decode("latin-1").split()[1])
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, path: str):
+        if path.startswith("/_round/"):
+            self.round = int(path.rsplit("/", 1)[1])
+            return "200 OK", b"{}"
+        if path == "/_stats":
+            return "200 OK", json.dumps({"requests": self.requests, "round": self.round}).encode()
+
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        r = self.rng.random()
+        if r < self.p403:
+            return "403 Forbidden", b"{}"
+        if r < self.p403 + self.perror:
+            return "200 OK", self.error
+        query = dict(p.split("=", 1) for p in path.split("?", 1)[1].split("&") if "=" in p)
+        return "200 OK", self.body(int(query.get("item_id", 0)))
+
+
+def serve(options: dict, port_queue):
+    async def main():
+        shopee = FakeShopee(**options)
+        server = await asyncio.start_server(shopee.handle, "127.0.0.1", 0, backlog=1024)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+# --- satu ukuran (proses anak) ----------------------------------------------
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def phase(name: str, count: int, elapsed: float, latencies) -> dict:
+    return {
+        "phase": name,
+        "count": count,
+        "seconds": elapsed,
+        "per_second": count / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+async def run_size(items: int, rounds: int, concurrency: int, chats: int) -> dict:
+    import httpx
+
+    from bench.bench_notify import MockBot
+    from src.history import HistoryStore
+    from src.metrics import metrics
+    from src.monitor import ProductMonitor
+    from src.notifier import NotificationDispatcher
+    from src.poller import RestockPoller
+    from src.storage import SQLiteStorage
+
+    base_url = os.environ["SHOPEE_BASE_URL"]
+    tmp = tempfile.mkdtemp(prefix="bench_pipeline_")
+    storage = SQLiteStorage(os.path.join(tmp, "tracker.db"))
+    monitor = ProductMonitor(storage, history=HistoryStore(os.path.join(tmp, "history")))
+    bot = MockBot(rate=100000, latency=0.005)
+    notifier = NotificationDispatcher(bot, storage, rate=100000, digest_window=0.2, concurrency=100)
+    notifier.start()
+    poller = RestockPoller(monitor, notifier, mode="fixed", concurrency=concurrency)
+    results = []
+
+    # add
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failed = [], 0
+
+    async def add(i: int):
+        nonlocal failed
+        async with slots:
+            started = time.perf_counter()
+            ok, _ = await monitor.add_product(f"https://shopee.co.id/bench-i.{SHOP_ID}.{i}", chat_id=i % chats + 1)
+            latencies.append(time.perf_counter() - started)
+            failed += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(add(i) for i in range(1, items + 1)))
+    results.append(dict(phase("add", items, time.perf_counter() - started, latencies), failed=failed))
+
+    # poll
+    poll_started = time.perf_counter()
+    async with httpx.AsyncClient() as control:
+        for n in range(1, rounds + 1):
+            await control.get(f"{base_url}/_round/{n}")
+            latencies, events_before = [], sum(metrics.by_label("events_total", "kind").values())
+
+            async def check(key, product):
+                await slots.acquire()
+                t = time.perf_counter()
+                await poller._check(key, product, slots)
+                latencies.append(time.perf_counter() - t)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(check(key, product) for key, product in list(monitor.products.items())))
+            monitor.flush()
+            events = sum(metrics.by_label("events_total", "kind").values()) - events_before
+            results.append(dict(phase(f"poll {n}", len(latencies), time.perf_counter() - started, latencies), events=events))
+
+    # notify: dihitung dari awal poll pertama sampai antrian kosong
+    drain = time.perf_counter()
+    while notifier.pending and time.perf_counter() - drain < 300:
+        await asyncio.sleep(0.05)
+    results.append(dict(
+        phase("notify", notifier.delivered, time.perf_counter() - poll_started, notifier.latencies),
+        messages=bot.sent, dropped=notifier.dropped,
+    ))
+    await notifier.stop()
+    monitor.close()
+    await monitor.batcher.client.aclose()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        "items": items,
+        "phases": results,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": metrics.stages(),
+        "http": metrics.by_label("http_responses_total", "status"),
+        "api_errors": metrics.by_label("api_errors_total", "code"),
+    }
+
+
+def child(args):
+    from src.logs import setup_logging
+
+    setup_logging("ERROR", "")
+    result = asyncio.run(run_size(args.run, args.rounds, args.concurrency, args.chats))
+    print("RESULT " + json.dumps(result))
+
+
+# --- orkestrasi -------------------------------------------------------------
+
+def report(result: dict):
+    print(f"\n== {result['items']} item, peak RSS {result['rss_mb']:.0f} MB ==")
+    print(f"{'fase':<8} {'jumlah':>8} {'detik':>8} {'per detik':>10} {'p50 ms':>8} {'p99 ms':>8}  lain")
+    for p in result["phases"]:
+        extra = ", ".join(f"{k} {v}" for k, v in p.items() if k not in ("phase", "count", "seconds", "per_second", "p50", "p99"))
+        print(
+            f"{p['phase']:<8} {p['count']:>8} {p['seconds']:>8.2f} {p['per_second']:>10.0f} "
+            f"{p['p50'] * 1000:>8.1f} {p['p99'] * 1000:>8.1f}  {extra}"
+        )
+    stages = ", ".join(f"{name} {s['avg'] * 1000:.2f}" for name, s in result["stages"].items())
+    print(f"tahap (avg ms): {stages}")
+    print(f"HTTP {result['http']}, error code {result['api_errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--p403", type=float, default=0.002)
+    parser.add_argument("--perror", type=float, default=0.002)
+    parser.add_argument("--change", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--aimd", action="store_true", help="rate limiter AIMD ikut turun saat blok")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)  # proses anak
+    args = parser.parse_args()
+
+    if args.run:
+        child(args)
+        return
+
+    options = {"latency": args.latency, "p403": args.p403, "perror": args.perror, "change": args.change}
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(options, ports), daemon=True)
+    server.start()
+    port = ports.get(timeout=10)
+    print(f"Server tiruan :{port} {options}, {args.rounds} putaran, concurrency {args.concurrency}")
+
+    env = dict(
+        os.environ,
+        SHOPEE_BASE_URL=f"http://127.0.0.1:{port}",
+        RATE_LIMIT="1000000",
+        RATE_LIMIT_MAX="1000000",
+        RATE_LIMIT_MIN=os.environ.get("RATE_LIMIT_MIN", "0.2") if args.aimd else "1000000",
+        CACHE_TTL="0",
+        FETCH_CONCURRENCY=str(args.concurrency),
+        METRICS_PORT="0",
+        CURL_DIR=os.path.join(tempfile.gettempdir(), "bench_pipeline_no_curl_dir"),
+    )
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            proc = subprocess.run(
+                [sys.executable, "-m", "bench.bench_pipeline", "--run", str(size),
+                 "--rounds", str(args.rounds), "--concurrency", str(args.concurrency), "--chats", str(args.chats)],
+                env=env, stdout=subprocess.PIPE, text=True,
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+            if proc.returncode or not lines:
+                print(f"\n== {size} item: gagal (exit {proc.returncode}) ==")
+                continue
+            report(json.loads(lines[-1][len("RESULT "):]))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark + cek ShortLinkResolver (src/resolver.py) terhadap stub redirect lokal.
+
+    python -m bench.bench_resolver [links] [latency_ms]
+
+Stub meniru shp.ee: /s/<n> -> 302 /r/<n> -> 302 URL produk Shopee
+(resolver berhenti di sini, shopee.co.id tidak pernah dihubungi). Tiap link
+ke-10 menolak HEAD (405) supaya fallback GET ikut teruji; /dead/<n> -> 404.
+
+Yang diukur / dicek:
+  dingin  : semua link baru, resolve paralel, request = 2 per link (+1 fallback)
+  hangat  : link yang sama lagi -> 0 request (memo)
+  restart : resolver baru di database yang sama -> 0 request (tabel short_links)
+  serentak: dua resolve_many bersamaan untuk link baru -> tiap link sekali
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from src.resolver import ShortLinkResolver
+from src.storage import SQLiteStorage
+
+
+class RedirectStub:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.port = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                method, path = request.decode().split()[:2]
+                await asyncio.sleep(self.latency)
+                _, kind, code = path.split("/")[:3]
+                if kind == "s" and method == "HEAD" and int(code) % 10 == 0:
+                    status, location = "405 Method Not Allowed", None
+                elif kind == "s":
+                    status, location = "302 Found", f"/r/{code}?smtt=0.0.9"
+                elif kind == "r":
+                    status, location = "302 Found", f"https://shopee.co.id/Produk-Bench-i.77.{code}?sp_atk=x&xptdk=y"
+                else:
+                    status, location = "404 Not Found", None
+                headers = f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n"
+                if location:
+                    headers += f"Location: {location}\r\n"
+                writer.write((headers + "\r\n").encode())
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    stub = RedirectStub(latency)
+    await stub.start()
+    base = f"http://127.0.0.1:{stub.port}"
+    directory = tempfile.mkdtemp(prefix="resolver_bench_")
+    db = os.path.join(directory, "tracker.db")
+    print(f"{count} link, latency stub {latency * 1000:.0f} ms/request")
+
+    async def run(label: str, resolver: ShortLinkResolver, links, expect_requests=None):
+        before = stub.requests
+        started = time.perf_counter()
+        resolved = await resolver.resolve_many(links)
+        elapsed = time.perf_counter() - started
+        requests = stub.requests - before
+        ok = sum(key is not None for key in resolved.values())
+        print(f"{label:<9}: {elapsed * 1000:8.1f} ms, {requests:5d} request, {ok}/{len(resolved)} ter-resolve")
+        if expect_requests is not None:
+            assert requests == expect_requests, f"{label}: {requests} request, harusnya {expect_requests}"
+        return resolved
+
+    links = [f"{base}/s/{n}" for n in range(1, count + 1)]
+    # varian link yang sama (host huruf besar, query share) -> satu entri cache
+    links += [f"{base.upper()}/s/{n}?share=wa" for n in range(1, count + 1, 20)]
+    links += [f"{base}/dead/{n}" for n in range(5)]
+
+    storage = SQLiteStorage(db)
+    resolver = ShortLinkResolver(storage)
+    resolved = await run("dingin", resolver, links, count * 2 + count // 10 + 5)
+    assert resolved[f"{base}/s/7"] == ("77", "7")
+    assert resolved[f"{base.upper()}/s/21?share=wa"] == ("77", "21")
+    assert resolved[f"{base}/dead/1"] is None
+    await run("hangat", resolver, links[:count], 0)
+    await resolver.aclose()
+    storage.close()
+
+    storage = SQLiteStorage(db)
+    resolver = ShortLinkResolver(storage)
+    await run("restart", resolver, links[:count], 0)
+
+    fresh = [f"{base}/s/{n}" for n in range(count + 1, count + 201)]
+    resolver = ShortLinkResolver(storage)
+    before = stub.requests
+    await asyncio.gather(resolver.resolve_many(fresh), resolver.resolve_many(fresh[::-1]))
+    requests = stub.requests - before
+    print(f"serentak : {requests} request untuk {len(fresh)} link diminta dua kali")
+    assert requests == len(fresh) * 2 + len(fresh) // 10
+
+    await resolver.aclose()
+    storage.close()
+    stub.server.close()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
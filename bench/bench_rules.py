@@ -0,0 +1,115 @@
+"""
+Benchmark evaluasi aturan /rule (src/rules.py) per batch.
+
+    python -m bench.bench_rules [aturan,...] [item_berubah]
+
+Untuk tiap jumlah aturan: item = aturan / 5 (tiap item 5 pelanggan beraturan,
+3 variasi), aturan campuran harga target / stok minimal / variasi. Satu
+batch = `item_berubah` item yang harga & stoknya berubah. Dibandingkan:
+
+  index : AlertRules.evaluate() (kelompok per item, bisect target harga)
+  naif  : cek ulang semua aturan terhadap snapshot sebelum/sesudah
+
+Keduanya harus menghasilkan hit yang sama persis. Waktu index mestinya
+hampir tetap saat jumlah aturan naik, waktu naif naik linear.
+"""
+import random
+import sys
+import time
+
+from src.diff import snapshot_of
+from src.parser import ProductRecord, VariantRecord
+from src.rules import AlertRule, AlertRules, best_variant
+
+COLORS = ("merah", "biru", "hitam")
+
+
+def record(item: int, prices, stocks) -> ProductRecord:
+    variants = tuple(
+        VariantRecord(m, f"{COLORS[m]} XL", prices[m], stocks[m]) for m in range(len(COLORS))
+    )
+    return ProductRecord("77", str(item), f"Produk {item}", 1, min(prices), sum(stocks), variants)
+
+
+def random_rule(rng: random.Random) -> AlertRule:
+    kind = rng.random()
+    if kind < 0.5:
+        return AlertRule(max_price=rng.randrange(50, 150) * 1000)
+    if kind < 0.7:
+        return AlertRule(min_stock=rng.choice((1, 3, 5)))
+    if kind < 0.9:
+        return AlertRule(variant=rng.choice(COLORS))
+    return AlertRule(max_price=rng.randrange(50, 150) * 1000, min_stock=3, variant=rng.choice(COLORS))
+
+
+def naive(rules: AlertRules, batch):
+    """Referensi: semua aturan dicek satu per satu."""
+    hits = []
+    for key, chats in rules.rules.items():
+        change = batch.get(key)
+        for chat_id, rule in chats.items():
+            if change is None or not rule.conditional:
+                continue
+            old, new_record = change
+            new = snapshot_of(new_record)
+            names = {v.model_id: v.name.lower() for v in new_record.variants}
+            limit = rule.max_price if rule.max_price is not None else float("inf")
+            now = best_variant(new, names, rule.variant, rule.min_stock or 1)
+            before = best_variant(old, names, rule.variant, rule.min_stock or 1)
+            if now is not None and now[0] <= limit and not (before is not None and before[0] <= limit):
+                hits.append((key, chat_id))
+    return hits
+
+
+def run(count: int, changed: int, rng: random.Random):
+    items = max(changed, count // 5)
+    rules = AlertRules()
+    state = {}
+    for item in range(items):
+        key = ("77", str(item))
+        prices = [rng.randrange(60, 200) * 1000 for _ in COLORS]
+        stocks = [rng.choice((0, 0, 2, 8)) for _ in COLORS]
+        state[key] = (prices, stocks)
+        for n in range(count // items):
+            rules.set(key, item * 10 + n, random_rule(rng))
+
+    started = time.perf_counter()
+    for key in rules.rules:
+        rules._groups(key)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    batch = {}
+    for item in rng.sample(range(items), changed):
+        key = ("77", str(item))
+        prices, stocks = state[key]
+        old = snapshot_of(record(item, prices, stocks))
+        prices = [max(1000, p + rng.randrange(-60, 20) * 1000) for p in prices]
+        stocks = [rng.choice((0, 1, 4, 10)) for _ in COLORS]
+        batch[key] = (old, record(item, prices, stocks))
+        rules.observe(key, old, batch[key][1])
+
+    started = time.perf_counter()
+    hits = rules.evaluate()
+    index_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    expected = naive(rules, batch)
+    naive_ms = (time.perf_counter() - started) * 1000
+
+    assert sorted((h.key, h.chat_id) for h in hits) == sorted(expected)
+    print(
+        f"{len(rules):>9} {items:>8} {changed:>8} {compile_ms:>10.1f} {index_ms:>9.2f} "
+        f"{naive_ms:>9.1f} {len(hits):>6}"
+    )
+
+
+def main():
+    counts = [int(c) for c in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 500000]
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(7)
+    print(f"{'aturan':>9} {'item':>8} {'berubah':>8} {'compile ms':>10} {'index ms':>9} {'naif ms':>9} {'hit':>6}")
+    for count in counts:
+        run(count, changed, rng)
+
+
+if __name__ == "__main__":
+    main()
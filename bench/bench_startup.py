@@ -0,0 +1,184 @@
+"""
+Time-to-first-response bot dengan daftar pantauan besar.
+
+    python -m bench.bench_startup [produk] [chat]
+
+Membuat database berisi `produk` item (3 variasi) yang dipantau `chat` chat,
+lalu menjalankan `python main.py all` terhadap Bot API tiruan lokal
+(TELEGRAM_API_URL) dua kali: LAZY_STARTUP=1 dan LAZY_STARTUP=0. Update
+pertama yang diterima bot: /start (tidak butuh data), /status (tidak
+menunggu data, menampilkan progres muat) dan /list (butuh daftar pantauan).
+Yang diukur sejak proses dijalankan:
+
+  getMe         : import + setup selesai, bot mulai bicara ke Telegram
+  balas /start  : time-to-first-response
+  balas /status : `*` kalau balasannya masih berisi progres muat
+  balas /list   : data pantauan siap dipakai
+"""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs
+
+from src.storage import SQLiteStorage
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+TOKEN = "123456:bench"
+START_CHAT, LIST_CHAT, STATUS_CHAT = 1, 2, 3
+
+
+def make_db(path: str, products: int, chats: int):
+    storage = SQLiteStorage(path)
+    rows, snapshots = [], {}
+    for i in range(products):
+        rows.append({
+            "shop_id": "77", "item_id": str(i), "name": f"Produk {i}", "url": f"https://shopee.co.id/p-i.77.{i}",
+            "stock": 5, "price": 10000, "last_status": {"available": True, "stock": 5, "price": 10000},
+        })
+        snapshots[("77", str(i))] = tuple((model, 5, 10000) for model in range(3))
+    storage.save_statuses(rows, snapshots)
+    for chat in range(chats):
+        storage.add_subscriptions(100 + chat, [("77", str(i)) for i in range(chat, products, chats)])
+    storage.add_subscriptions(LIST_CHAT, [("77", str(i)) for i in range(5)])
+    storage.close()
+
+
+class FakeBotApi:
+    """Bot API tiruan: getUpdates memberi /start, /status, /list sekali, sendMessage dicatat waktunya."""
+
+    def __init__(self):
+        self.events = {}
+        self.delivered = False
+        self.status_loading = False
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def _update(self, update_id: int, chat_id: int, text: str) -> dict:
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": int(time.time()), "text": text,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "bench"},
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+            },
+        }
+
+    async def _result(self, method: str, params: dict):
+        if method == "getMe":
+            self.events.setdefault("getMe", time.perf_counter())
+            return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        if method == "getUpdates":
+            if not self.delivered:
+                self.delivered = True
+                return [
+                    self._update(1, START_CHAT, "/start"),
+                    self._update(2, STATUS_CHAT, "/status"),
+                    self._update(3, LIST_CHAT, "/list"),
+                ]
+            await asyncio.sleep(0.5)
+            return []
+        if method == "sendMessage":
+            chat_id = int(params.get("chat_id", 0))
+            label = {START_CHAT: "/start", LIST_CHAT: "/list", STATUS_CHAT: "/status"}.get(chat_id, "lain")
+            if label not in self.events and label == "/status":
+                self.status_loading = "masih dimuat" in params.get("text", "")
+            self.events.setdefault(label, time.perf_counter())
+            return {
+                "message_id": 100, "date": int(time.time()), "text": params.get("text", ""),
+                "chat": {"id": chat_id, "type": "private"},
+            }
+        return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                method = request.split()[1].decode().rsplit("/", 1)[-1]
+                if body.startswith(b"{"):
+                    params = json.loads(body)
+                else:
+                    params = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+                payload = json.dumps({"ok": True, "result": await self._result(method, params)}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run(directory: str, lazy: bool) -> dict:
+    api = FakeBotApi()
+    await api.start()
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN=TOKEN,
+        TELEGRAM_API_URL=f"http://127.0.0.1:{api.port}/bot",
+        LAZY_STARTUP="1" if lazy else "0",
+        DB_PATH=os.path.join(directory, "tracker.db"),
+        HISTORY_DIR=os.path.join(directory, "history"),
+        # jangan sentuh Shopee beneran: poll yang sempat jalan langsung gagal konek
+        SHOPEE_BASE_URL="http://127.0.0.1:9",
+        CURL_DIR=os.path.join(directory, "no_curl"),
+        CHECK_INTERVAL="3600",
+        METRICS_PORT="0",
+        LOG_FILE="",
+        LOG_LEVEL="WARNING",
+    )
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "main.py"), "all",
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(1200):
+            if "/list" in api.events or proc.returncode is not None:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        proc.terminate()
+        await proc.wait()
+        api.server.close()
+    result = {label: (at - started) * 1000 for label, at in api.events.items()}
+    result["loading"] = api.status_loading
+    return result
+
+
+async def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    directory = tempfile.mkdtemp(prefix="startup_bench_")
+    make_db(os.path.join(directory, "tracker.db"), products, chats)
+    print(f"{products} produk x 3 variasi, {chats} chat")
+    print(f"{'mode':<6} {'getMe':>9} {'/start':>9} {'/status':>10} {'/list':>9}  (ms sejak proses dijalankan)")
+    for lazy in (True, False):
+        result = await run(directory, lazy)
+        cols = [f"{result[label]:9.0f}" if label in result else f"{'-':>9}" for label in ("getMe", "/start", "/status", "/list")]
+        cols[2] += "*" if result["loading"] else " "
+        print(f"{'lazy' if lazy else 'eager':<6} {' '.join(cols)}")
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,194 @@
+"""
+Uji mode cluster dengan beberapa proses worker lokal.
+
+    python -m bench.cluster_sim [items] [workers]
+
+Menjalankan server Shopee tiruan (stok tiap item berganti tiap beberapa
+detik), database sementara berisi `items` produk, lalu `workers` proses
+`python main.py worker`. Front-end (RestockPoller mode remote) jalan di proses
+ini. Skenario: semua worker jalan -> satu worker di-kill (tanpa pamit,
+dideteksi lewat WORKER_TIMEOUT) -> satu worker baru masuk -> front-end
+menambah & menghapus produk (worker cuma membaca perubahannya lewat
+target_changes, bukan memuat ulang semua produk).
+
+Tiap fase dilaporkan: berapa item yang ter-fetch (coverage), fetch "dobel"
+(item yang sama di-fetch dua kali dalam < POLL_MIN_INTERVAL/2 detik, tanda
+dua worker merasa memiliki item yang sama), fetch item yang sudah dihapus,
+dan hasil yang diterima front-end.
+"""
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIN_INTERVAL = 2.0
+PHASE_SECONDS = 12.0
+
+
+class FakeShopee(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fetches = []  # (waktu, item_id)
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        item_id = query.get("item_id", ["0"])[0]
+        with self.lock:
+            self.fetches.append((time.monotonic(), item_id))
+        stock = 3 if (int(time.time() / 4) + int(item_id)) % 2 else 0
+        body = json.dumps({"data": {"item": {"itemid": int(item_id), "title": f"Item {item_id}", "stock": stock, "price": 1000000}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def add_items(storage, items):
+    with storage.transaction():
+        for i in items:
+            key = ("1", str(i))
+            storage.save_product({
+                "shop_id": key[0], "item_id": key[1], "name": f"Item {i}", "stock": 0, "price": 10,
+                "url": f"https://shopee.co.id/x-i.1.{i}", "last_status": {"available": False, "stock": 0, "price": 10},
+            })
+            storage.add_subscription(i % 50, key)
+
+
+def seed_db(path: str, items: int):
+    from src.storage import SQLiteStorage
+
+    storage = SQLiteStorage(path)
+    add_items(storage, range(items))
+    storage.set_meta("legacy_json_imported", "1")
+    storage.close()
+
+
+def spawn(worker_id: str, env: dict, logdir: str) -> subprocess.Popen:
+    log = open(os.path.join(logdir, f"{worker_id}.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-u", "main.py", "worker"],
+        cwd=ROOT, env=dict(env, WORKER_ID=worker_id), stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def phase_report(name: str, since: float, items: set, removed: set, received: int):
+    with FakeShopee.lock:
+        fetches = [(t, i) for t, i in FakeShopee.fetches if t >= since]
+    last, doubles = {}, 0
+    for t, item_id in sorted(fetches):
+        if item_id in last and t - last[item_id] < MIN_INTERVAL / 2:
+            doubles += 1
+        last[item_id] = t
+    coverage = len(items & set(last)) / len(items)
+    stale = len(removed & set(last))
+    print(
+        f"{name:<28} fetch {len(fetches):>6}, coverage {coverage:>6.1%}, "
+        f"dobel {doubles:>4}, item terhapus {stale:>3}, hasil ke front-end {received:>5}"
+    )
+    return coverage, stale
+
+
+async def frontend(db: str):
+    from src.monitor import ProductMonitor
+    from src.poller import RestockPoller
+    from src.storage import SQLiteStorage
+
+    class Notifier:
+        sent = 0
+
+        def enqueue_many(self, chat_ids, text, delay=0.0):
+            self.sent += len(chat_ids)
+
+    monitor = ProductMonitor(SQLiteStorage(db))
+    poller = RestockPoller(monitor, Notifier(), mode="remote")
+    poller.start()
+    return monitor, poller
+
+
+async def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeShopee)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    tmp = tempfile.mkdtemp(prefix="cluster_sim_")
+    db = os.path.join(tmp, "tracker.db")
+    seed_db(db, items)
+
+    env = dict(
+        os.environ,
+        DB_PATH=db,
+        SHOPEE_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}",
+        CHECK_INTERVAL="6",
+        POLL_MIN_INTERVAL=str(MIN_INTERVAL),
+        HEARTBEAT_INTERVAL="1",
+        WORKER_TIMEOUT="3",
+        RATE_LIMIT="500",
+        RATE_LIMIT_MAX="500",
+        CACHE_TTL="0",
+        METRICS_PORT="0",
+    )
+    os.environ.update(DB_PATH=db)
+    monitor, poller = await frontend(db)
+    current, removed = {str(i) for i in range(items)}, set()
+
+    def churn():
+        # 10% item baru langsung ke DB, 10% item lama di-/remove lewat front-end
+        fresh = range(items, items + max(1, items // 10))
+        gone = range(0, max(1, items // 10))
+        add_items(monitor.storage, fresh)
+        for i in gone:
+            monitor.unsubscribe(i % 50, ("1", str(i)))
+        current.update(str(i) for i in fresh)
+        current.difference_update(str(i) for i in gone)
+        removed.update(str(i) for i in gone)
+
+    print(f"{items} item, {count} worker, db {db}\n")
+
+    workers = {f"w{n}": spawn(f"w{n}", env, tmp) for n in range(1, count + 1)}
+    try:
+        phases = [
+            (f"{count} worker", None),
+            ("w1 di-kill (SIGKILL)", lambda: workers["w1"].send_signal(signal.SIGKILL)),
+            (f"w{count + 1} masuk", lambda: workers.setdefault(f"w{count + 1}", spawn(f"w{count + 1}", env, tmp))),
+            (f"+{max(1, items // 10)} / -{max(1, items // 10)} item", churn),
+        ]
+        for name, action in phases:
+            if action:
+                action()
+            await asyncio.sleep(4)  # beri waktu rebalance / start
+            since, received = time.monotonic(), poller.checks
+            await asyncio.sleep(PHASE_SECONDS)
+            coverage, stale = phase_report(name, since, current, removed, poller.checks - received)
+        # fase start/kill worker bergantung waktu start proses; churn harus persis
+        assert coverage == 1.0 and stale == 0, f"{name}: coverage {coverage:.1%}, item terhapus {stale}"
+    finally:
+        for proc in workers.values():
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+        for proc in workers.values():
+            proc.wait(timeout=10)
+        poller.stop()
+        server.shutdown()
+
+    print()
+    for worker_id in sorted(workers):
+        with open(os.path.join(tmp, f"{worker_id}.log")) as f:
+            lines = [line.strip() for line in f if "🧩" in line or "👋" in line]
+        print(f"{worker_id}: {lines[-1] if lines else '-'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
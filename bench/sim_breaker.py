@@ -0,0 +1,241 @@
+"""
+Simulasi rate limiter AIMD + circuit breaker (src/ratelimit.py) terhadap
+Shopee tiruan yang memblok.
+
+    python -m bench.sim_breaker [cooldown_detik]
+
+Stub lokal (asyncio, HTTP/1.1 keep-alive) menjawab PDP dari
+bench/fixtures/pdp_no_models.json, atau sesuai `mode`: 429, payload error
+90309999 / 90309998 (dihitung blok), lambat, JSON rusak, error code biasa.
+Client memakai ShopeeClient + CredentialPool asli dengan satu sesi (tanpa
+curl.txt), breaker dengan cooldown pendek.
+
+Yang dicek:
+  backoff  : tiap blok memotong rate limiter sesi jadi setengahnya
+  trip     : sesi dikarantina setelah 3 blok -> breaker langsung open
+             (tanpa menunggu BREAKER_THRESHOLD blok), request berikutnya
+             tidak sampai ke server
+  pause    : RestockPoller.run_cycle selama breaker tidak closed hanya
+             mengirim satu probe dan menandai cycle `paused`
+  siklus   : open -> (cooldown) half_open -> probe diblok -> open lagi
+             dengan cooldown 2x -> probe sukses -> closed, cycle penuh lagi
+  304      : ETag yang entry cache-nya sudah dibuang -> diambil ulang utuh,
+             bukan warning "HTTP 304"
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlsplit
+
+os.environ.setdefault("RATE_LIMIT", "50")
+os.environ.setdefault("RATE_LIMIT_MIN", "1")
+os.environ.setdefault("RATE_LIMIT_MAX", "100")
+os.environ.setdefault("METRICS_PORT", "0")
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SHOP_ID = "270580867"
+MISSING = os.path.join(tempfile.gettempdir(), "sim_breaker_no_curl")
+
+
+class ShopeeStub:
+    """
+    PDP tiruan, tiap response ditunda `latency` detik. `mode` berlaku untuk semua item, `modes[item_id]` per item:
+      ok, 429, 90309999, 90309998 (blok), slow (tidur `slow` detik),
+      broken (JSON rusak), missing (error code bukan blok), 500.
+    Response ok membawa ETag; If-None-Match yang cocok dijawab 304.
+    """
+
+    def __init__(self, latency: float = 0.0, slow: float = 5.0):
+        self.mode = "ok"
+        self.modes = {}
+        self.latency = latency
+        self.slow = slow
+        self.requests = 0
+        self.not_modified = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.connections = 0
+        with open(os.path.join(FIXTURES, "pdp_no_models.json"), "r", encoding="utf-8") as f:
+            self.template = json.load(f)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+
+    def close(self):
+        self.server.close()
+
+    def body(self, item_id: int) -> bytes:
+        payload = dict(self.template)
+        payload["data"] = data = dict(self.template["data"])
+        data["item"] = item = dict(self.template["data"]["item"])
+        item["item_id"], item["shop_id"] = item_id, int(SHOP_ID)
+        return json.dumps(payload).encode()
+
+    async def respond(self, path: str, headers: dict):
+        item_id = int(parse_qs(urlsplit(path).query).get("item_id", ["0"])[0])
+        mode = self.modes.get(item_id, self.mode)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if mode == "429":
+            return "429 Too Many Requests", b"{}", {}
+        if mode == "500":
+            return "500 Internal Server Error", b"{}", {}
+        if mode in ("90309999", "90309998"):
+            return "200 OK", json.dumps({"error": int(mode), "error_msg": None}).encode(), {}
+        if mode == "missing":
+            return "200 OK", json.dumps({"error": 4, "error_msg": "item not found", "data": None}).encode(), {}
+        if mode == "broken":
+            return "200 OK", b'{"data": {"item": ', {}
+        if mode == "slow":
+            await asyncio.sleep(self.slow)
+        etag = f'"{item_id}-v1"'
+        if headers.get("if-none-match") == etag:
+            self.not_modified += 1
+            return "304 Not Modified", b"", {"ETag": etag}
+        return "200 OK", self.body(item_id), {"ETag": etag}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                self.requests += 1
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+                try:
+                    status, body, extra = await self.respond(request.decode("latin-1").split()[1], headers)
+                finally:
+                    self.in_flight -= 1
+                head = f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                head += "".join(f"{k}: {v}\r\n" for k, v in extra.items())
+                writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+class Inbox:
+    """Pengganti NotificationDispatcher."""
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, chat_id, text, delay: float = 0.0):
+        self.messages.append((chat_id, text))
+
+    def enqueue_many(self, chat_ids, text, delay: float = 0.0):
+        for chat_id in chat_ids:
+            self.enqueue(chat_id, text)
+
+
+def step(label: str, detail: str):
+    print(f"{label:<8}: {detail}")
+
+
+async def main():
+    from src.batcher import ProductBatcher
+    from src.credentials import CredentialPool
+    from src.monitor import ProductMonitor
+    from src.poller import RestockPoller
+    from src.ratelimit import CircuitBreaker
+    from src.shopee import ShopeeClient, build_product_url, is_error_marker
+
+    cooldown = float(sys.argv[1]) if len(sys.argv) > 1 else 0.3
+    stub = ShopeeStub()
+    await stub.start()
+    pool = CredentialPool(curl_file=MISSING, curl_dir=MISSING, quarantine_after=3, quarantine_seconds=cooldown)
+    client = ShopeeClient(base_url=stub.base_url, pool=pool)
+    client.breaker = breaker = CircuitBreaker(threshold=5, cooldown=cooldown)
+    batcher = ProductBatcher(client)
+    monitor = ProductMonitor(batcher=batcher)
+    poller = RestockPoller(monitor, Inbox(), interval=1, batcher=batcher, mode="fixed")
+
+    items = [str(1000 + n) for n in range(10)]
+    for item_id in items:
+        ok, _ = await monitor.add_product(f"https://shopee.co.id/sim-i.{SHOP_ID}.{item_id}", chat_id=1)
+        assert ok, item_id
+    assert len(pool.credentials) == 1, "harus satu sesi saja"
+    credential = next(iter(pool.credentials.values()))
+    limiter = credential.limiters.for_url(build_product_url(SHOP_ID, items[0], stub.base_url))
+    step("siap", f"{len(items)} item, rate {limiter.rate:.1f}/s, breaker {breaker.state}")
+
+    # backoff: tiap jenis blok memotong rate
+    for mode in ("429", "90309999", "90309998"):
+        stub.mode = mode
+        before = limiter.rate
+        result = await client.fetch_async(SHOP_ID, items[0])
+        assert result is None or is_error_marker(result), result
+        assert limiter.rate == max(limiter.min_rate, before * limiter.decrease), (mode, before, limiter.rate)
+        step("backoff", f"{mode:>8}: rate {before:.1f} -> {limiter.rate:.1f}/s, breaker {breaker.state}")
+
+    # 3 blok beruntun = sesi satu-satunya dikarantina -> breaker open di blok itu juga
+    assert not credential.is_healthy() and breaker.state == breaker.OPEN, breaker.status()
+    assert pool.quarantine_after < breaker.threshold
+    sent = stub.requests
+    assert await client.fetch_async(SHOP_ID, items[1]) is None
+    assert stub.requests == sent, "request lolos selagi breaker open"
+    step("trip", f"open setelah {pool.quarantine_after} blok (threshold {breaker.threshold}), "
+                 f"retry {breaker.retry_in():.2f}s")
+
+    # selama cooldown: cycle dipause tanpa request sama sekali
+    await poller.run_cycle()
+    assert poller.last_cycle.get("paused") and stub.requests == sent
+    step("pause", f"cycle saat open: {stub.requests - sent} request")
+
+    # cooldown habis, masih diblok: satu probe, open lagi dengan cooldown 2x
+    await asyncio.sleep(breaker.retry_in() + 0.01)
+    await poller.run_cycle()
+    assert poller.last_cycle.get("paused") and stub.requests == sent + 1, stub.requests - sent
+    assert breaker.state == breaker.OPEN and breaker.cooldown == 2 * cooldown, breaker.status()
+    step("probe", f"half_open -> diblok -> open, cooldown {breaker.cooldown:.2f}s, 1 request")
+
+    # server pulih: probe sukses -> closed, sisa cycle jalan penuh
+    stub.mode = "ok"
+    rate = limiter.rate
+    await asyncio.sleep(breaker.retry_in() + 0.01)
+    sent = stub.requests
+    started = time.perf_counter()
+    await poller.run_cycle()
+    assert breaker.state == breaker.CLOSED and breaker.cooldown == cooldown, breaker.status()
+    assert not poller.last_cycle.get("paused") and poller.last_cycle["checked"] == len(items)
+    assert stub.requests == sent + 1 + len(items) and limiter.rate > rate
+    step("closed", f"probe sukses, cycle penuh {stub.requests - sent} request "
+                   f"dalam {time.perf_counter() - started:.2f}s, rate naik ke {limiter.rate:.1f}/s")
+
+    # 304 untuk ETag yang entry cache-nya dibuang selagi request jalan -> ambil ulang utuh
+    key = (SHOP_ID, items[2])
+    assert client.cache.etag(key)
+    stub.modes[int(items[2])], stub.slow = "slow", 0.2
+    sent, not_modified = stub.requests, stub.not_modified
+    task = asyncio.ensure_future(client.fetch_async(*key))
+    while not stub.in_flight:
+        await asyncio.sleep(0.005)
+    client.cache.invalidate(key)
+    record = await task
+    assert record is not None and record.item_id == items[2], record
+    assert stub.not_modified == not_modified + 1 and stub.requests == sent + 2
+    assert client.cache.etag(key), "hasil ambil ulang harus masuk cache lagi"
+    step("304", f"entry hilang saat revalidasi -> diambil ulang ({record.name})")
+
+    await client.aclose()
+    stub.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
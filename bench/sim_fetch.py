@@ -0,0 +1,113 @@
+"""
+Cek engine fetch async (ShopeeClient.fetch_async / fetch_many + ProductBatcher)
+terhadap Shopee tiruan lokal.
+
+    python -m bench.sim_fetch [items] [concurrency]
+
+Memakai ShopeeStub dari bench.sim_breaker dengan rate limiter dipatok
+tinggi, jadi yang diukur engine-nya, bukan AIMD. Yang dicek:
+
+  concurrency : fetch_many tidak pernah punya lebih dari `concurrency`
+                request in-flight (batas dari argumen maupun dari client),
+                dan koneksi keep-alive dipakai ulang (<= concurrency koneksi)
+  error       : item dengan error code biasa / JSON rusak / HTTP 500 hanya
+                menggagalkan item itu sendiri; sisanya tetap ter-fetch
+  timeout     : item yang lambat berakhir None setelah timeout client,
+                tanpa menahan item lain selama itu
+  coalescing  : lookup item yang sama bersamaan lewat ProductBatcher = satu
+                request
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("RATE_LIMIT", "1000000")
+os.environ.setdefault("RATE_LIMIT_MAX", "1000000")
+os.environ.setdefault("RATE_LIMIT_MIN", "1000000")
+
+from bench.sim_breaker import SHOP_ID, ShopeeStub  # noqa: E402
+
+MISSING = os.path.join(tempfile.gettempdir(), "sim_fetch_no_curl")
+TIMEOUT = 0.5
+
+
+def step(label: str, detail: str):
+    print(f"{label:<11}: {detail}")
+
+
+async def main():
+    from src.batcher import ProductBatcher
+    from src.credentials import CredentialPool
+    from src.shopee import ShopeeClient, is_error_marker
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    stub = ShopeeStub(latency=0.005, slow=TIMEOUT * 4)
+    await stub.start()
+    pool = CredentialPool(curl_file=MISSING, curl_dir=MISSING)
+    client = ShopeeClient(base_url=stub.base_url, concurrency=concurrency, pool=pool, timeout=TIMEOUT)
+    pairs = [(SHOP_ID, str(10000 + n)) for n in range(count)]
+
+    # batas dari client, lalu batas lebih kecil dari argumen fetch_many
+    for limit in (None, max(1, concurrency // 2)):
+        stub.peak, sent = 0, stub.requests
+        started = time.perf_counter()
+        results = await client.fetch_many(pairs + pairs[:10], concurrency=limit)
+        elapsed = time.perf_counter() - started
+        expected = limit or concurrency
+        assert len(results) == count and all(r is not None and not is_error_marker(r) for r in results.values())
+        assert stub.requests - sent == count, "pasangan duplikat harus di-fetch sekali"
+        assert stub.peak == expected, (stub.peak, expected)
+        assert stub.connections <= concurrency, stub.connections
+        step("concurrency", f"{count} item, batas {expected}: peak in-flight {stub.peak}, "
+                            f"{stub.connections} koneksi, {count / elapsed:.0f} item/s")
+
+    # error per item
+    broken = {int(pairs[1][1]): "missing", int(pairs[2][1]): "broken", int(pairs[3][1]): "500"}
+    stub.modes.update(broken)
+    results = await client.fetch_many(pairs[:50])
+    assert is_error_marker(results[pairs[1]]) and results[pairs[1]].error == 4
+    assert results[pairs[2]] is None and results[pairs[3]] is None
+    good = [r for key, r in results.items() if int(key[1]) not in broken]
+    assert len(good) == 47 and all(r is not None and not is_error_marker(r) for r in good)
+    assert client.breaker.state == client.breaker.CLOSED
+    step("error", "error code / JSON rusak / HTTP 500 cuma menggagalkan itemnya, 47/50 lainnya OK")
+    for item_id in broken:
+        stub.modes.pop(item_id)
+
+    # timeout: item lambat None, yang lain tidak ikut menunggu
+    slow = pairs[5]
+    stub.modes[int(slow[1])] = "slow"
+    finished = {}
+
+    async def timed(pair):
+        record = await client.fetch_async(*pair)
+        finished[pair] = time.perf_counter() - started
+        return record
+
+    started = time.perf_counter()
+    records = await asyncio.gather(*(timed(pair) for pair in pairs[:20]))
+    assert records[5] is None and all(r is not None for n, r in enumerate(records) if n != 5)
+    assert TIMEOUT <= finished[slow] < stub.slow, finished[slow]
+    others = max(t for pair, t in finished.items() if pair != slow)
+    assert others < TIMEOUT, others
+    step("timeout", f"item lambat None setelah {finished[slow]:.2f}s (timeout {TIMEOUT}s), "
+                    f"19 item lain selesai dalam {others:.2f}s")
+    stub.modes.pop(int(slow[1]))
+
+    # coalescing: 50 lookup bersamaan untuk 5 item = 5 request
+    batcher = ProductBatcher(client)
+    sent = stub.requests
+    lookups = [batcher.get(*pairs[n % 5], fresh=True) for n in range(50)]
+    records = await asyncio.gather(*lookups)
+    assert all(r is not None for r in records) and stub.requests - sent == 5, stub.requests - sent
+    step("coalescing", f"50 lookup bersamaan untuk 5 item -> {stub.requests - sent} request")
+
+    await client.aclose()
+    stub.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,6 +7,63 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', 'your_bot_token_here')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', 'your_chat_id_here')
 CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', 300))  # 5 menit default
-
-# Print untuk debugging (opsional)
-print(f"Config loaded - Token: {TELEGRAM_BOT_TOKEN}, Chat ID: {TELEGRAM_CHAT_ID}, Interval: {CHECK_INTERVAL}")
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', 20))  # jumlah request Shopee paralel
+SHOPEE_BATCH_URL = os.getenv('SHOPEE_BATCH_URL', '')  # endpoint multi-item (opsional)
+BATCH_SIZE = int(os.getenv('BATCH_SIZE', 50))
+RATE_LIMIT = float(os.getenv('RATE_LIMIT', 5))  # request/detik per host (awal)
+RATE_LIMIT_MIN = float(os.getenv('RATE_LIMIT_MIN', 0.2))
+RATE_LIMIT_MAX = float(os.getenv('RATE_LIMIT_MAX', 20))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))  # blok beruntun sebelum polling dipause
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 60))  # detik sebelum probe
+CURL_DIR = os.getenv('CURL_DIR', os.path.join(os.path.dirname(__file__), '..', 'curl.d'))  # satu capture curl per file
+CREDENTIAL_QUARANTINE_AFTER = int(os.getenv('CREDENTIAL_QUARANTINE_AFTER', 3))  # blok beruntun per sesi
+CREDENTIAL_QUARANTINE_SECONDS = float(os.getenv('CREDENTIAL_QUARANTINE_SECONDS', 600))
+CACHE_TTL = float(os.getenv('CACHE_TTL', 60))  # detik data produk dianggap fresh
+CACHE_STALE_TTL = float(os.getenv('CACHE_STALE_TTL', 600))  # tambahan detik boleh dipakai sambil refresh
+CACHE_MAX_ITEMS = int(os.getenv('CACHE_MAX_ITEMS', 100000))
+LOW_STOCK_THRESHOLD = int(os.getenv('LOW_STOCK_THRESHOLD', 3))  # 0 = matikan notifikasi stok menipis
+PRICE_DROP_MIN_PERCENT = float(os.getenv('PRICE_DROP_MIN_PERCENT', 1))  # turun harga minimal (%)
+NOTIFY_EVENTS = os.getenv('NOTIFY_EVENTS', 'restock,price_drop,low_stock,price_low,new_variant')  # event yang dikirim ke Telegram
+NOTIFY_RATE = float(os.getenv('NOTIFY_RATE', 30))  # pesan/detik global (batas Telegram ~30)
+NOTIFY_CHAT_INTERVAL = float(os.getenv('NOTIFY_CHAT_INTERVAL', 1))  # detik antar pesan ke chat yang sama
+NOTIFY_GROUP_INTERVAL = float(os.getenv('NOTIFY_GROUP_INTERVAL', 3))  # grup: ~20 pesan/menit
+NOTIFY_DIGEST_WINDOW = float(os.getenv('NOTIFY_DIGEST_WINDOW', 1))  # detik kumpulkan notifikasi jadi satu pesan
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', 5))
+NOTIFY_CONCURRENCY = int(os.getenv('NOTIFY_CONCURRENCY', 10))  # send_message paralel
+POLL_MODE = os.getenv('POLL_MODE', 'fixed')  # fixed (semua item tiap CHECK_INTERVAL) | adaptive (opt-in)
+POLL_BUDGET = float(os.getenv('POLL_BUDGET', 0))  # request/detik untuk poll; 0 = jumlah item / CHECK_INTERVAL
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 30))
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 3600))
+VOLATILITY_HALFLIFE = float(os.getenv('VOLATILITY_HALFLIFE', 21600))  # detik, lupakan riwayat perubahan lama
+OUT_OF_STOCK_WEIGHT = float(os.getenv('OUT_OF_STOCK_WEIGHT', 2))  # item habis lebih sering dicek (nunggu restock)
+ROLE = os.getenv('ROLE', 'all')  # all | bot | worker (lihat src/cluster.py)
+WORKER_ID = os.getenv('WORKER_ID', '')  # default hostname-pid
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 5))
+WORKER_TIMEOUT = float(os.getenv('WORKER_TIMEOUT', 20))  # worker tanpa heartbeat selama ini dianggap mati
+RING_VNODES = int(os.getenv('RING_VNODES', 64))
+HISTORY_DIR = os.getenv('HISTORY_DIR', os.path.join(os.path.dirname(__file__), '..', 'data', 'history'))
+HISTORY_RETENTION_DAYS = float(os.getenv('HISTORY_RETENTION_DAYS', 365))  # 0 = simpan selamanya
+HISTORY_WAL_LIMIT = int(os.getenv('HISTORY_WAL_LIMIT', 4 * 1024 * 1024))  # byte WAL sebelum checkpoint ke segment
+HISTORY_ALERT_DAYS = float(os.getenv('HISTORY_ALERT_DAYS', 30))  # window notifikasi harga terendah
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # DEBUG | INFO | WARNING | ERROR
+LOG_FILE = os.getenv('LOG_FILE', os.path.join(os.path.dirname(__file__), '..', 'shopee_error.log'))  # WARNING ke atas; kosong = mati
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))  # endpoint Prometheus /metrics; 0 = mati
+ADMIN_CHAT_IDS = os.getenv('ADMIN_CHAT_IDS', '')  # chat yang boleh /stats (pisah koma); kosong = tidak ada
+IMPORT_MAX_ITEMS = int(os.getenv('IMPORT_MAX_ITEMS', 10000))  # batas URL unik per /import
+IMPORT_CHUNK = int(os.getenv('IMPORT_CHUNK', 200))  # item per potongan fetch + tulis saat /import
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', 5 * 1024 * 1024))  # ukuran file /import maksimum
+RESOLVE_CONCURRENCY = int(os.getenv('RESOLVE_CONCURRENCY', 16))  # resolve link pendek paralel
+RESOLVE_TIMEOUT = float(os.getenv('RESOLVE_TIMEOUT', 10))
+RESOLVE_MAX_REDIRECTS = int(os.getenv('RESOLVE_MAX_REDIRECTS', 5))
+LAZY_STARTUP = os.getenv('LAZY_STARTUP', '1') == '1'  # bot langsung jawab, data dimuat di background
+LOAD_CHUNK = int(os.getenv('LOAD_CHUNK', 200))  # baris per langkah muat sebelum gantian dengan update Telegram
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')  # Bot API server sendiri, mis. http://host:8081/bot
+CATALOG_INTERVAL = float(os.getenv('CATALOG_INTERVAL', 900))  # detik antar crawl daftar item toko (/watchshop)
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', 60))  # item per halaman daftar toko
+CATALOG_HEAD_PAGES = int(os.getenv('CATALOG_HEAD_PAGES', 1))  # halaman terdepan (listing terbaru) yang dicek tiap crawl
+CATALOG_SWEEP_PAGES = int(os.getenv('CATALOG_SWEEP_PAGES', 10))  # halaman lanjutan per crawl, bergilir sampai habis
+CATALOG_CONCURRENCY = int(os.getenv('CATALOG_CONCURRENCY', 2))  # feed toko yang di-crawl bersamaan
+CATALOG_AUTO_TRACK = os.getenv('CATALOG_AUTO_TRACK', '1') == '1'  # listing baru langsung ikut dipantau per item
+RULE_UTC_OFFSET = float(os.getenv('RULE_UTC_OFFSET', 7))  # zona waktu jam tenang /rule (jam dari UTC, WIB = 7)
+DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '..', 'data', 'tracker.db'))
@@ -1,4 +1,18 @@
-from src.telegram_bot import run_bot
+import logging
+import sys
+
+from config.setting import ROLE
+from src.logs import setup_logging
 
 if __name__ == "__main__":
-    run_bot()
+    setup_logging()
+    # python main.py [all|bot|worker]
+    role = sys.argv[1] if len(sys.argv) > 1 else ROLE
+    if role == "worker":
+        from src.cluster import run_worker
+        run_worker()
+    elif role in ("all", "bot"):
+        from src.telegram_bot import run_bot
+        run_bot(role)
+    else:
+        logging.getLogger(__name__).error("❌ Role tidak dikenal: %s (all | bot | worker)", role)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.setting import BATCH_SIZE, SHOPEE_BATCH_URL
+from src.cache import FRESH, STALE
+from src.parser import ProductRecord
+from src.shopee import ShopeeClient, get_client
+
+logger = logging.getLogger(__name__)
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+BATCH_WINDOW = 0.02  # detik menunggu lookup lain sebelum batch dikirim
+
+
+class ProductBatcher:
+    """
+    Gabungkan lookup (shop_id, item_id) yang datang berdekatan.
+
+    - Data yang masih fresh di cache client langsung dijawab dari cache;
+      data stale juga, sambil di-refresh di background (stale-while-revalidate).
+    - Caller yang minta item yang sama saat request-nya masih jalan
+      (mis. dua user /add URL yang sama) menunggu future yang sama.
+    - Lookup yang menumpuk dalam BATCH_WINDOW dikirim bersama: lewat endpoint
+      multi-item kalau SHOPEE_BATCH_URL diset, kalau tidak di-fan-out paralel
+      lewat ShopeeClient (yang sudah membatasi request in-flight).
+    """
+
+    def __init__(
+        self,
+        client: Optional[ShopeeClient] = None,
+        batch_url: str = SHOPEE_BATCH_URL,
+        batch_size: int = BATCH_SIZE,
+        window: float = BATCH_WINDOW,
+    ):
+        self.client = client or get_client()
+        self.batch_url = batch_url
+        self.batch_size = max(1, batch_size)
+        self.window = window
+
+        self._inflight: Dict[ProductKey, asyncio.Future] = {}
+        self._pending: Dict[ProductKey, None] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        self.requests = 0   # lookup yang diminta caller
+        self.coalesced = 0  # lookup yang numpang request lain
+        self.sent = 0       # request HTTP yang benar-benar dikirim
+
+    @property
+    def group_size(self) -> int:
+        """Berapa item yang enak dikirim sekaligus (1 kalau tidak ada endpoint batch)."""
+        return self.batch_size if self.batch_url else 1
+
+    async def get(
+        self, shop_id: str, item_id: str, fresh: bool = False, max_age: Optional[float] = None
+    ) -> Optional[ProductRecord]:
+        """
+        fresh=True melewati cache (poller butuh data terbaru, tetap pakai
+        If-None-Match); max_age mengganti TTL cache untuk lookup ini.
+        """
+        key = (str(shop_id), str(item_id))
+        self.requests += 1
+
+        if not fresh:
+            cached, state = self.client.cache.lookup(key, max_age)
+            if state == FRESH:
+                return cached
+            if state == STALE:
+                self._lookup(key)
+                return cached
+
+        # shield: satu caller yang di-cancel tidak membatalkan caller lain
+        return await asyncio.shield(self._lookup(key))
+
+    def _lookup(self, key: ProductKey) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._inflight[key] = loop.create_future()
+            self._pending[key] = None
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    async def get_many(self, pairs: Iterable[ProductKey]) -> Dict[ProductKey, Optional[ProductRecord]]:
+        keys = list(dict.fromkeys((str(s), str(i)) for s, i in pairs))
+        results = await asyncio.gather(*(self.get(*key) for key in keys))
+        return dict(zip(keys, results))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        keys = list(self._pending)
+        self._pending = {}
+        for start in range(0, len(keys), self.batch_size):
+            task = asyncio.get_running_loop().create_task(self._dispatch(keys[start:start + self.batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, keys: List[ProductKey]):
+        try:
+            if self.batch_url and len(keys) > 1:
+                self.sent += 1
+                results = await self.client.fetch_batch(keys, self.batch_url)
+            else:
+                self.sent += len(keys)
+                results = await self.client.fetch_many(keys)
+        except Exception as e:
+            logger.error("❌ batch dispatch error: %s", e)
+            results = {}
+
+        for key in keys:
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(results.get(key))
+
+
+_batcher: Optional[ProductBatcher] = None
+
+
+def get_batcher() -> ProductBatcher:
+    """ProductBatcher bersama (satu antrian coalescing untuk seluruh bot)."""
+    global _batcher
+    if _batcher is None:
+        _batcher = ProductBatcher()
+    return _batcher
@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config.setting import CACHE_MAX_ITEMS, CACHE_STALE_TTL, CACHE_TTL
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "fetched_at")
+
+    def __init__(self, value: dict, etag: Optional[str], fetched_at: float):
+        self.value = value
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+class ProductCache:
+    """
+    Cache LRU + TTL hasil fetch produk, key (shop_id, item_id).
+
+    - umur < ttl          : fresh, langsung dipakai
+    - umur < ttl+stale_ttl: stale, boleh dipakai sambil di-refresh di background
+    - lebih tua / tidak ada: miss
+    ETag dari response disimpan untuk request If-None-Match berikutnya.
+    """
+
+    def __init__(self, max_items: int = CACHE_MAX_ITEMS, ttl: float = CACHE_TTL, stale_ttl: float = CACHE_STALE_TTL):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[ProductKey, CacheEntry]" = OrderedDict()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0  # 304 Not Modified
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key: ProductKey, max_age: Optional[float] = None) -> Tuple[Optional[dict], str]:
+        """Return (value, FRESH/STALE/MISS) dan update counter."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        ttl = self.ttl if max_age is None else max_age
+        age = time.monotonic() - entry.fetched_at
+        self._entries.move_to_end(key)
+        if age < ttl:
+            self.hits += 1
+            return entry.value, FRESH
+        if age < ttl + self.stale_ttl:
+            self.stale_hits += 1
+            return entry.value, STALE
+        self.misses += 1
+        return None, MISS
+
+    def etag(self, key: ProductKey) -> Optional[str]:
+        entry = self._entries.get(key)
+        return entry.etag if entry is not None else None
+
+    def put(self, key: ProductKey, value: dict, etag: Optional[str] = None):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.value = value
+            entry.etag = etag or entry.etag
+            entry.fetched_at = time.monotonic()
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = CacheEntry(value, etag, time.monotonic())
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def revalidated(self, key: ProductKey) -> Optional[dict]:
+        """Server jawab 304: entry dianggap baru lagi. Return value yang di-cache."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.revalidations += 1
+        entry.fetched_at = time.monotonic()
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def invalidate(self, key: ProductKey):
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
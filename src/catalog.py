@@ -0,0 +1,248 @@
+"""
+Pantauan toko / kata kunci di dalam toko (/watchshop): crawl daftar item toko
+per halaman, kabari listing baru dan restock.
+
+Satu feed = (shop_id, keyword), dipakai bersama semua chat yang memantaunya.
+Daftar diurutkan terbaru dulu (sort_by=ctime), jadi listing baru muncul di
+halaman depan. Tiap crawl satu feed:
+
+- halaman depan (CATALOG_HEAD_PAGES) selalu diambil, listing baru cepat ketahuan;
+- lalu CATALOG_SWEEP_PAGES halaman mulai dari kursor `sweep_page`. Kursor maju
+  tiap crawl dan kembali ke depan setelah halaman terakhir, jadi toko dengan
+  puluhan ribu SKU tersapu bertahap dengan jumlah request per crawl tetap;
+- checksum tiap halaman (item, stok, harga, status) dibandingkan dengan crawl
+  sebelumnya: halaman yang sama persis dilewati tanpa baca/tulis per item;
+- halaman yang checksum-nya beda dicocokkan per item dengan feed_items: item
+  yang belum dikenal = listing baru (kalau sapuan pertama sudah selesai, atau
+  listing-nya dibuat setelah feed dipasang), stok 0 -> ada = restock. Hanya
+  item yang baru atau stok/harganya berubah yang ditulis. Satu listing baru
+  menggeser isi semua halaman sesudahnya (paginasi offset), jadi halaman yang
+  cuma bergeser dihitung tidak berubah: satu SELECT per halaman, tanpa tulis.
+
+Endpoint daftar item tidak punya request kondisional (ETag / "sejak"), jadi
+halaman di jendela crawl tetap di-request tiap crawl; yang dihemat checksum
+adalah kerja per item di DB. Jumlah request per crawl dibatasi lewat jendela
+sweep (CATALOG_HEAD_PAGES + CATALOG_SWEEP_PAGES), bukan lewat checksum.
+
+Halaman diproses satu per satu lewat async generator dan state per item ada di
+SQLite, jadi memori tidak tergantung jumlah SKU toko. Listing baru dimasukkan
+ke ProductMonitor (add_many) untuk chat pemantaunya dan selanjutnya dipoll per
+variasi seperti item /add biasa.
+"""
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+
+from config.setting import (
+    CATALOG_AUTO_TRACK,
+    CATALOG_CONCURRENCY,
+    CATALOG_HEAD_PAGES,
+    CATALOG_INTERVAL,
+    CATALOG_PAGE_SIZE,
+    CATALOG_SWEEP_PAGES,
+)
+from src.metrics import metrics
+from src.monitor import ProductMonitor
+from src.notifier import NotificationDispatcher
+from src.parser import ListingPage, ProductRecord
+from src.shopee import ShopeeClient
+from src.urls import product_url
+
+logger = logging.getLogger(__name__)
+
+MAX_LISTED = 10  # item per pesan notifikasi, sisanya cuma dihitung
+
+
+def page_checksum(page: ListingPage) -> int:
+    """Checksum 64-bit (signed, muat di INTEGER SQLite) isi satu halaman."""
+    digest = hashlib.blake2b(digest_size=8)
+    for r in page.records:
+        digest.update(f"{r.item_id}:{r.stock}:{r.price}:{r.status};".encode())
+    return int.from_bytes(digest.digest(), "big", signed=True)
+
+
+def feed_label(feed: dict) -> str:
+    keyword = f" \"{feed['keyword']}\"" if feed["keyword"] else ""
+    return f"toko {feed['shop_id']}{keyword}"
+
+
+class CatalogCrawler:
+    def __init__(
+        self,
+        monitor: ProductMonitor,
+        notifier: Optional[NotificationDispatcher],
+        client: Optional[ShopeeClient] = None,
+        interval: float = CATALOG_INTERVAL,
+        page_size: int = CATALOG_PAGE_SIZE,
+        head_pages: int = CATALOG_HEAD_PAGES,
+        sweep_pages: int = CATALOG_SWEEP_PAGES,
+        concurrency: int = CATALOG_CONCURRENCY,
+        auto_track: bool = CATALOG_AUTO_TRACK,
+    ):
+        self.monitor = monitor
+        self.storage = monitor.storage
+        self.notifier = notifier
+        self._client = client
+        self.interval = interval
+        self.page_size = max(1, page_size)
+        self.head_pages = max(1, head_pages)
+        self.sweep_pages = max(0, sweep_pages)
+        self.concurrency = max(1, concurrency)
+        self.auto_track = auto_track
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._urgent: Set[int] = set()
+        self.stats = {"crawls": 0, "pages": 0, "unchanged": 0, "new": 0, "restocks": 0, "failed": 0}
+
+    @property
+    def client(self) -> ShopeeClient:
+        return self._client or self.monitor.batcher.client
+
+    def start(self):
+        """Harus dipanggil dari dalam event loop yang sedang jalan."""
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("🏪 Crawler toko aktif, interval %.0fs", self.interval)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def wake(self, feed_id: int):
+        """Crawl feed ini secepatnya (mis. baru dipasang lewat /watchshop)."""
+        self._urgent.add(feed_id)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_full = loop.time()
+        while True:
+            self._wake.clear()
+            urgent, self._urgent = self._urgent, set()
+            if loop.time() >= next_full:
+                next_full = loop.time() + self.interval
+                await self.crawl_all()
+            elif urgent:
+                await self.crawl_all(urgent)
+            if not self._urgent:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), max(0.0, next_full - loop.time()))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def crawl_all(self, only: Optional[Set[int]] = None):
+        feeds = [f for f in self.storage.load_shop_feeds() if only is None or f["id"] in only]
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def one(feed: dict):
+            async with slots:
+                try:
+                    await self.crawl(feed)
+                except Exception as e:
+                    logger.error("❌ crawl %s error: %r", feed_label(feed), e)
+
+        await asyncio.gather(*(one(feed) for feed in feeds))
+
+    async def iter_pages(self, feed: dict, pages: Iterable[int]) -> AsyncIterator[Tuple[int, Optional[ListingPage]]]:
+        """
+        (nomor halaman, halaman) berurutan, satu request per langkah. Berhenti
+        setelah halaman terakhir listing; (nomor, None) kalau fetch gagal.
+        """
+        for page_no in pages:
+            page = await self.client.fetch_listing(
+                feed["shop_id"], page_no * self.page_size, self.page_size, feed["keyword"]
+            )
+            yield page_no, page
+            if page is None or not page.more:
+                return
+
+    async def crawl(self, feed: dict) -> dict:
+        """Satu crawl: halaman depan + satu jendela sweep. Return ringkasan."""
+        start = max(feed["sweep_page"], self.head_pages)
+        pages = list(range(self.head_pages)) + list(range(start, start + self.sweep_pages))
+        result = {"pages": 0, "unchanged": 0, "new": [], "restocks": [], "failed": False}
+        next_sweep, baseline, last_page = start + self.sweep_pages, feed["baseline"], None
+
+        async for page_no, page in self.iter_pages(feed, pages):
+            if page is None:
+                # breaker terbuka / diblok: kursor tidak maju, dicoba lagi crawl berikutnya
+                result["failed"] = True
+                next_sweep = page_no if page_no >= start else feed["sweep_page"]
+                break
+            result["pages"] += 1
+            self._process(feed, page_no, page, result)
+            if not page.more:
+                # halaman terakhir: sapuan berikutnya mulai dari depan lagi
+                next_sweep, baseline, last_page = self.head_pages, True, page_no
+
+        self.storage.save_feed_cursor(feed["id"], next_sweep, baseline, last_page)
+        self._count(result)
+        await self._publish(feed, result)
+        return result
+
+    def _process(self, feed: dict, page_no: int, page: ListingPage, result: dict):
+        checksum = page_checksum(page)
+        if checksum == self.storage.feed_page_checksum(feed["id"], page_no):
+            result["unchanged"] += 1
+            return
+        known = self.storage.feed_items(feed["id"], [r.item_id for r in page.records])
+        changed = []
+        for record, ctime in zip(page.records, page.ctimes):
+            previous = known.get(record.item_id)
+            if previous is None:
+                # sebelum sapuan pertama selesai, item lama juga belum dikenal
+                if feed["baseline"] or ctime > (feed["created_at"] or 0):
+                    result["new"].append(record)
+            elif not previous[0] and record.available:
+                result["restocks"].append(record)
+            if previous != (record.stock, record.price):
+                changed.append((record.item_id, record.stock, record.price))
+        if not changed:
+            # isinya sama, cuma bergeser karena listing baru di depannya
+            result["unchanged"] += 1
+        self.storage.save_feed_page(feed["id"], page_no, checksum, changed)
+
+    def _count(self, result: dict):
+        stats = self.stats
+        stats["crawls"] += 1
+        stats["pages"] += result["pages"]
+        stats["unchanged"] += result["unchanged"]
+        stats["new"] += len(result["new"])
+        stats["restocks"] += len(result["restocks"])
+        stats["failed"] += result["failed"]
+        metrics.inc("catalog_pages_total", result["unchanged"], result="unchanged")
+        metrics.inc("catalog_pages_total", result["pages"] - result["unchanged"], result="changed")
+        metrics.inc("events_total", len(result["new"]), kind="new_listing")
+        metrics.inc("events_total", len(result["restocks"]), kind="shop_restock")
+
+    async def _publish(self, feed: dict, result: dict):
+        chats = feed.get("chats") or []
+        if not chats:
+            return
+        if result["new"]:
+            if self.notifier is not None:
+                self.notifier.enqueue_many(chats, self.format(f"🆕 Listing baru di {feed_label(feed)}", result["new"]))
+            if self.auto_track:
+                items = {(r.shop_id, r.item_id): product_url((r.shop_id, r.item_id)) for r in result["new"]}
+                for chat_id in chats:
+                    await self.monitor.add_many(items, chat_id)
+        if result["restocks"] and self.notifier is not None:
+            for chat_id in chats:
+                # item yang dipantau per item sudah dikabari poller sendiri
+                tracked = self.monitor.chat_items.get(chat_id, {})
+                records = [r for r in result["restocks"] if (r.shop_id, r.item_id) not in tracked]
+                if records:
+                    self.notifier.enqueue(chat_id, self.format(f"🔔 Restock di {feed_label(feed)}", records))
+
+    @staticmethod
+    def format(title: str, records: List[ProductRecord]) -> str:
+        lines = [title, ""]
+        for r in records[:MAX_LISTED]:
+            price = f"Rp {r.price:,}" if r.price is not None else "-"
+            lines.append(f"🛒 {r.name}\n   💰 {price} | 📦 {r.stock}\n   🔗 {product_url((r.shop_id, r.item_id))}")
+        if len(records) > MAX_LISTED:
+            lines.append(f"\n… dan {len(records) - MAX_LISTED} lainnya")
+        return "\n".join(lines)
@@ -0,0 +1,238 @@
+"""
+Mode cluster: bot front-end + N worker poller.
+
+    python main.py bot      # command Telegram + notifikasi, tidak fetch berkala
+    python main.py worker   # poll satu shard produk (jalankan beberapa)
+    python main.py          # semua dalam satu proses (seperti biasa)
+
+Koordinasi lewat database SQLite yang sama (DB_PATH, mode WAL):
+
+- tiap worker menulis heartbeat ke tabel `workers`; worker yang heartbeat-nya
+  lebih tua dari WORKER_TIMEOUT dianggap mati;
+- pemilik item = consistent hash ring dari worker yang hidup, jadi saat
+  worker masuk/keluar hanya ~1/N item yang pindah pemilik;
+- worker hanya mengirim hasil poll yang berubah ke tabel `results`, front-end
+  membacanya, menghitung event dan mengirim notifikasi.
+
+Tiap worker punya ShopeeClient & credential sendiri (atur CURL_FILE/CURL_DIR
+per worker untuk sesi/IP berbeda). Saat rebalance, worker bisa sempat
+berbeda pandangan soal anggota ring selama satu HEARTBEAT_INTERVAL; item yang
+terdampak paling banyak di-fetch dua kali sekali itu saja.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.setting import HEARTBEAT_INTERVAL, RING_VNODES, WORKER_ID, WORKER_TIMEOUT
+from src.diff import ChangeDetector
+from src.metrics import MetricsServer, metrics
+from src.monitor import poll_weight
+from src.parser import ProductRecord
+from src.rules import AlertRules
+from src.shopee import is_error_marker
+from src.storage import TARGET_CHANGES_KEEP, SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring dengan `vnodes` titik per node."""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = RING_VNODES):
+        self.nodes = tuple(sorted(set(nodes)))
+        self.vnodes = vnodes
+        points = sorted((_hash(f"{node}#{v}"), node) for node in self.nodes for v in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: ProductKey) -> Optional[str]:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(f"{key[0]}.{key[1]}"))
+        return self._owners[i % len(self._owners)]
+
+
+class ShardView:
+    """
+    Pengganti ProductMonitor untuk RestockPoller di worker: hanya produk milik
+    shard ini, dan hasil poll yang berubah dikumpulkan lalu ditulis ke tabel
+    `results` saat flush(). Worker tidak mengirim notifikasi.
+    """
+
+    fetched_on_add = False  # item dari target_changes belum pernah di-fetch worker ini
+
+    def __init__(self, storage: SQLiteStorage, worker_id: str, detector: Optional[ChangeDetector] = None):
+        self.storage = storage
+        self.worker_id = worker_id
+        self.detector = detector or ChangeDetector()
+        self.ring = HashRing()
+        self.products: Dict[ProductKey, dict] = {}
+        self.version = 0
+        self._results: List[Tuple[str, str, str, float]] = []
+        self.reported = 0
+        self._change_id: Optional[int] = None  # id target_changes terakhir yang sudah diterapkan
+        self.rules = AlertRules()  # selalu kosong: aturan /rule dievaluasi di front-end
+
+    def refresh(self, workers: List[str]) -> Tuple[int, int]:
+        """
+        Samakan shard dengan produk di DB & worker hidup. Return (masuk, keluar).
+
+        Anggota ring berubah (atau log perubahan sudah terpotong) -> muat ulang
+        semua target; selain itu cukup produk yang tercatat di `target_changes`
+        sejak refresh sebelumnya, dan hanya yang milik shard ini.
+        """
+        full = self._change_id is None
+        if tuple(sorted(set(workers))) != self.ring.nodes:
+            self.ring = HashRing(workers, self.ring.vnodes)
+            full = True
+
+        if not full:
+            last_id, keys, complete = self.storage.target_changes(self._change_id)
+            if complete:
+                self._change_id = last_id
+                keys = [key for key in keys if self.ring.owner(key) == self.worker_id]
+                return self._apply_targets(self.storage.load_poll_targets(keys) if keys else [], keys)
+        # id diambil sebelum memuat: perubahan selama memuat ikut terbaca lagi nanti
+        self._change_id = self.storage.last_target_change()
+        return self._apply_targets(self.storage.load_poll_targets(), None)
+
+    def _apply_targets(self, rows, keys: Optional[List[ProductKey]]) -> Tuple[int, int]:
+        """Terapkan baris load_poll_targets; keys None = baris itu seluruh isi DB."""
+        owned: Dict[ProductKey, dict] = {}
+        for shop_id, item_id, available, subscribers, urgency in rows:
+            key = (shop_id, item_id)
+            if self.ring.owner(key) != self.worker_id:
+                continue
+            product = self.products.get(key)
+            if product is None:
+                # status dari DB hanya dipakai sampai poll pertama di worker ini
+                product = {"shop_id": shop_id, "item_id": item_id, "available": bool(available)}
+            product["subscribers"] = subscribers
+            product["urgency"] = urgency
+            owned[key] = product
+
+        added = [key for key in owned if key not in self.products]
+        candidates = self.products if keys is None else [key for key in keys if key in self.products]
+        removed = [key for key in candidates if key not in owned]
+        if added:
+            for key, snapshot in self.storage.load_snapshots(added).items():
+                self.detector.seed(key, snapshot)
+        for key in removed:
+            self.detector.forget(key)
+            del self.products[key]
+        self.products.update(owned)
+        if added or removed:
+            self.version += 1
+        return len(added), len(removed)
+
+    def poll_weight(self, key: ProductKey) -> float:
+        product = self.products.get(key) or {}
+        return poll_weight(product.get("subscribers", 0), product.get("urgency", 1), product.get("available", False))
+
+    def get_subscribers(self, key: ProductKey) -> Set[int]:
+        return set()
+
+    def update_status(self, key: ProductKey, data: Optional[ProductRecord]):
+        product = self.products.get(key)
+        if product is None or not data or is_error_marker(data):
+            return False, []
+        changed, _ = self.detector.diff(key, data)
+        if changed:
+            product["available"] = data.available
+            self._results.append((key[0], key[1], json.dumps(data.pack()), time.time()))
+        # event dihitung ulang di front-end
+        return changed, []
+
+    def flush(self):
+        if self._results:
+            results, self._results = self._results, []
+            with metrics.time("persist"):
+                self.storage.push_results(results)
+            self.reported += len(results)
+
+
+class ShardWorker:
+    """Satu proses worker: heartbeat, rebalance, dan RestockPoller adaptif untuk shard-nya."""
+
+    def __init__(
+        self,
+        worker_id: str = WORKER_ID,
+        storage: Optional[SQLiteStorage] = None,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        timeout: float = WORKER_TIMEOUT,
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.storage = storage or SQLiteStorage()
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = timeout
+        self.view = ShardView(self.storage, self.worker_id)
+        self.started_at = time.time()
+        self._next_trim = 0.0
+
+    def _tick(self):
+        self.storage.heartbeat(self.worker_id, os.getpid(), self.started_at)
+        workers = self.storage.live_workers(self.timeout)
+        if self.worker_id not in workers:
+            workers.append(self.worker_id)
+        nodes = self.view.ring.nodes
+        added, removed = self.view.refresh(workers)
+        if time.time() >= self._next_trim:
+            self._next_trim = time.time() + TARGET_CHANGES_KEEP / 10
+            self.storage.trim_target_changes(time.time() - TARGET_CHANGES_KEEP)
+        if self.view.ring.nodes != nodes or added or removed:
+            logger.info(
+                "🧩 [%s] %s worker, shard %s item (+%s / -%s)",
+                self.worker_id, len(workers), len(self.view.products), added, removed,
+            )
+
+    async def run(self):
+        from src.poller import RestockPoller
+
+        self._tick()
+        poller = RestockPoller(self.view, notifier=None, mode="adaptive")
+        poller.start()
+        metrics.gauge_fn("tracked_items", lambda: len(self.view.products))
+        server = MetricsServer()
+        try:
+            if await server.start():
+                logger.info("📊 [%s] metrics di http://%s:%s/metrics", self.worker_id, server.host, server.port)
+        except OSError as e:
+            # beberapa worker di satu host: set METRICS_PORT beda per worker
+            logger.warning("⚠️ [%s] endpoint metrics tidak bisa dibuka: %s", self.worker_id, e)
+        try:
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                self._tick()
+        finally:
+            poller.stop()
+            await server.stop()
+            self.view.flush()
+            self.storage.leave(self.worker_id)
+            logger.info("👋 [%s] keluar, %s hasil dikirim", self.worker_id, self.view.reported)
+
+
+def run_worker():
+    async def main():
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, task.cancel)
+        await ShardWorker().run()
+
+    try:
+        asyncio.run(main())
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,312 @@
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.setting import CREDENTIAL_QUARANTINE_AFTER, CREDENTIAL_QUARANTINE_SECONDS, CURL_DIR
+from src.ratelimit import BLOCKED, OK, HostRateLimiters
+
+logger = logging.getLogger(__name__)
+
+CURL_FILE = os.path.join(os.path.dirname(__file__), "..", "curl.txt")
+CREDENTIAL_CHECK_INTERVAL = 1.0  # detik antar cek mtime capture curl / env cookie
+ENV_COOKIE = "SHOPEE_COOKIE"
+
+
+def load_headers_and_cookies_from_curl(curl_file: str = CURL_FILE) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Parse a 'curl' string saved in curl.txt into headers and cookies dicts.
+    Works with cURL lines like: -H 'key: value' and -H 'cookie: a=b; c=d'
+    """
+    headers: Dict[str, str] = {}
+    cookies: Dict[str, str] = {}
+
+    if not os.path.isfile(curl_file):
+        return headers, cookies
+
+    text = open(curl_file, "r", encoding="utf-8").read()
+
+    # Find all -H 'Key: value' or --header 'Key: value'
+    for m in re.finditer(r"-H\s+'([^:]+):\s*(.*?)'", text):
+        key = m.group(1).strip()
+        val = m.group(2).strip()
+        if key.lower() == "cookie":
+            # parse cookies
+            for c in val.split(";"):
+                if "=" in c:
+                    k, v = c.strip().split("=", 1)
+                    cookies[k] = v
+        else:
+            headers[key] = val
+
+    # Also try to capture -b '...' / --cookie "..." (Chrome "Copy as cURL" uses -b)
+    for m in re.finditer(r"(?<!\S)(?:-b|--cookie)\s+(?:'([^']*)'|\"([^\"]*)\"|(\S+))", text):
+        raw = next(g for g in m.groups() if g is not None).strip()
+        for c in raw.split(";"):
+            if "=" in c:
+                k, v = c.strip().split("=", 1)
+                cookies[k] = v
+
+    return headers, cookies
+
+
+def load_cookies_from_env(env_var="SHOPEE_COOKIE") -> Dict[str, str]:
+    """
+    Fallback: read cookies from environment variable (format: 'a=1; b=2; ...').
+    """
+    raw = os.getenv(env_var, "")
+    cookies = {}
+    if raw:
+        for c in raw.split(";"):
+            if "=" in c:
+                k, v = c.strip().split("=", 1)
+                cookies[k] = v
+    return cookies
+
+
+def build_default_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Minimal headers if curl.txt not present or missing keys.
+    Values from curl.txt win over the defaults. The per-item referer is
+    added at request time.
+    """
+    default_headers = {
+        "accept": "application/json, text/plain, */*",
+        "accept-language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7",
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                      "AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/120.0.0.0 Safari/537.36",
+        "x-api-source": "pc",
+        "x-requested-with": "XMLHttpRequest",
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-origin",
+    }
+    merged = {**default_headers, **headers}
+    # header rusak dari capture lama; If-None-Match yang benar diisi per item dari cache
+    for key in list(merged):
+        if key.lower() in ("if-none-match-", "if-none-match"):
+            del merged[key]
+    return merged
+
+
+def product_referer(shop_id: str, item_id: str) -> str:
+    return f"https://shopee.co.id/product-i.{shop_id}.{item_id}"
+
+
+def load_credentials(curl_file: str = CURL_FILE) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Headers + cookies from curl.txt, falling back to SHOPEE_COOKIE for cookies.
+    """
+    headers, cookies = load_headers_and_cookies_from_curl(curl_file)
+    if not cookies:
+        cookies = load_cookies_from_env()
+    return headers, cookies
+
+
+def cookie_header(cookies: Dict[str, str]) -> str:
+    return "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+
+class Credential:
+    """Satu sesi Shopee (headers + cookies) beserta limiter dan catatan kesehatannya."""
+
+    def __init__(self, name: str, headers: Dict[str, str], cookies: Dict[str, str], stamp=None):
+        self.name = name
+        self.headers = build_default_headers(headers)
+        self.cookies = cookies
+        self.cookie_header = cookie_header(cookies)
+        self.stamp = stamp
+        # rate limit per sesi: throughput total naik sesuai jumlah sesi sehat
+        self.limiters = HostRateLimiters()
+
+        self.last_used = 0.0
+        self.requests = 0
+        self.successes = 0
+        self.blocks = 0
+        self.consecutive_blocks = 0
+        self.quarantines = 0
+        self.quarantined_until = 0.0
+
+    def request_headers(self, shop_id: str, item_id: str) -> Dict[str, str]:
+        headers = dict(self.headers)
+        headers["referer"] = product_referer(shop_id, item_id)
+        if self.cookie_header:
+            headers["cookie"] = self.cookie_header
+        return headers
+
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        return (now or time.monotonic()) >= self.quarantined_until
+
+    def adopt_stats(self, old: "Credential"):
+        """Capture yang di-reload tetap membawa statistik lamanya."""
+        for attr in ("last_used", "requests", "successes", "blocks", "consecutive_blocks",
+                     "quarantines", "quarantined_until", "limiters"):
+            setattr(self, attr, getattr(old, attr))
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.is_healthy(),
+            "requests": self.requests,
+            "successes": self.successes,
+            "blocks": self.blocks,
+            "quarantines": self.quarantines,
+            "quarantine_left": round(max(0.0, self.quarantined_until - time.monotonic()), 1),
+            "limiters": self.limiters.status(),
+        }
+
+
+class CredentialPool:
+    """
+    Kumpulan sesi Shopee dari:
+      - curl.txt (cookie fallback ke SHOPEE_COOKIE seperti sebelumnya)
+      - setiap *.txt di CURL_DIR (satu capture "Copy as cURL" per file)
+      - env SHOPEE_COOKIE_<apa saja> (cookie saja, header default)
+
+    Request memakai sesi sehat yang paling lama tidak dipakai (LRU).
+    Sesi yang kena blok CREDENTIAL_QUARANTINE_AFTER kali beruntun
+    dikarantina, durasinya dobel tiap karantina berikutnya.
+    Sumber dicek ulang (mtime / nilai env) paling sering sekali per detik.
+    """
+
+    def __init__(
+        self,
+        curl_file: str = CURL_FILE,
+        curl_dir: str = CURL_DIR,
+        quarantine_after: int = CREDENTIAL_QUARANTINE_AFTER,
+        quarantine_seconds: float = CREDENTIAL_QUARANTINE_SECONDS,
+        max_quarantine: float = 6 * 3600,
+    ):
+        self.curl_file = curl_file
+        self.curl_dir = curl_dir
+        self.quarantine_after = quarantine_after
+        self.quarantine_seconds = quarantine_seconds
+        self.max_quarantine = max_quarantine
+
+        self.credentials: Dict[str, Credential] = {}
+        self._stamps: Optional[Dict[str, object]] = None
+        self._next_check = 0.0
+
+    # --- sources -----------------------------------------------------------
+
+    def _sources(self) -> Dict[str, object]:
+        """name -> stamp (mtime file / nilai env) untuk semua sumber yang ada."""
+        sources: Dict[str, object] = {}
+
+        def add_file(path: str):
+            try:
+                sources[path] = ("file", os.stat(path).st_mtime_ns)
+            except OSError:
+                pass
+
+        add_file(self.curl_file)
+        if self.curl_dir and os.path.isdir(self.curl_dir):
+            for entry in sorted(os.listdir(self.curl_dir)):
+                if entry.endswith(".txt"):
+                    add_file(os.path.join(self.curl_dir, entry))
+
+        base_cookie = os.getenv(ENV_COOKIE, "")
+        if self.curl_file in sources:
+            # cookie fallback curl.txt ikut menentukan isi sesinya
+            sources[self.curl_file] += (base_cookie,)
+        elif base_cookie:
+            sources[f"env:{ENV_COOKIE}"] = ("env", base_cookie)
+
+        for var, value in sorted(os.environ.items()):
+            if var.startswith(ENV_COOKIE + "_") and value:
+                sources[f"env:{var}"] = ("env", value)
+        return sources
+
+    def _load(self, name: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        if name.startswith("env:"):
+            return {}, load_cookies_from_env(name[4:])
+        if name == self.curl_file:
+            return load_credentials(name)
+        return load_headers_and_cookies_from_curl(name)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload sumber yang berubah. Return True kalau ada yang berubah."""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + CREDENTIAL_CHECK_INTERVAL
+
+        sources = self._sources()
+        if not force and sources == self._stamps:
+            return False
+
+        credentials: Dict[str, Credential] = {}
+        for name, stamp in sources.items():
+            old = self.credentials.get(name)
+            if old is not None and old.stamp == stamp:
+                credentials[name] = old
+                continue
+            headers, cookies = self._load(name)
+            credential = Credential(name, headers, cookies, stamp)
+            if old is not None:
+                # capture baru = kesempatan baru, tapi statistik tetap
+                credential.adopt_stats(old)
+                credential.consecutive_blocks = 0
+                credential.quarantined_until = 0.0
+            credentials[name] = credential
+
+        if not credentials:
+            # tanpa capture sama sekali: tetap jalan tanpa cookie
+            credentials["anonymous"] = self.credentials.get("anonymous") or Credential("anonymous", {}, {})
+
+        if set(credentials) != set(self.credentials):
+            logger.info(
+                "🔑 Credential pool: %s sesi (%s)",
+                len(credentials), ", ".join(os.path.basename(n) for n in credentials),
+            )
+        self.credentials = credentials
+        self._stamps = sources
+        return True
+
+    # --- selection ---------------------------------------------------------
+
+    def acquire(self, include_quarantined: bool = False) -> Optional[Credential]:
+        """
+        Sesi sehat yang paling lama tidak dipakai. None kalau semua dikarantina,
+        kecuali include_quarantined (untuk probe circuit breaker) -> sesi yang
+        karantinanya paling cepat selesai.
+        """
+        self.refresh()
+        now = time.monotonic()
+        healthy = [c for c in self.credentials.values() if c.is_healthy(now)]
+        if healthy:
+            credential = min(healthy, key=lambda c: c.last_used)
+        elif include_quarantined and self.credentials:
+            credential = min(self.credentials.values(), key=lambda c: c.quarantined_until)
+        else:
+            return None
+        credential.last_used = now
+        credential.requests += 1
+        return credential
+
+    def report(self, credential: Credential, outcome: str):
+        if outcome == OK:
+            credential.successes += 1
+            credential.consecutive_blocks = 0
+            if not credential.is_healthy():
+                # probe lewat sesi karantina berhasil
+                credential.quarantined_until = 0.0
+        elif outcome == BLOCKED:
+            credential.blocks += 1
+            credential.consecutive_blocks += 1
+            if credential.consecutive_blocks >= self.quarantine_after and credential.is_healthy():
+                credential.quarantines += 1
+                duration = min(self.max_quarantine, self.quarantine_seconds * 2 ** (credential.quarantines - 1))
+                credential.quarantined_until = time.monotonic() + duration
+                logger.warning("🚫 Sesi %s dikarantina %.0fs", os.path.basename(credential.name), duration)
+
+    def healthy_count(self) -> int:
+        self.refresh()
+        now = time.monotonic()
+        return sum(1 for c in self.credentials.values() if c.is_healthy(now))
+
+    def status(self) -> List[dict]:
+        self.refresh()
+        return [c.status() for c in self.credentials.values()]
@@ -0,0 +1,171 @@
+"""
+Deteksi perubahan per variasi antar poll.
+
+Tiap item disimpan sebagai snapshot ringkas: tuple (model_id, stock, price)
+per variasi (item tanpa variasi = satu variasi dengan model_id None).
+Poll berikutnya dibandingkan dengan snapshot itu dan hanya perubahan yang
+berarti yang jadi event:
+
+  restock    : stok variasi 0 -> > 0
+  sellout    : stok variasi > 0 -> 0
+  price_drop : harga turun minimal PRICE_DROP_MIN_PERCENT persen
+  low_stock  : stok turun melewati LOW_STOCK_THRESHOLD (tapi belum habis)
+  new_variant: variasi yang belum ada di snapshot lama muncul dengan stok
+               (variasi baru yang stoknya 0 cuma jadi baseline)
+  price_low  : harga terendah dalam HISTORY_ALERT_DAYS (dibuat ProductMonitor
+               dari riwayat, lihat src/history.py)
+
+Snapshot yang sama persis dicek dengan satu perbandingan tuple, jadi item
+yang tidak berubah hampir tanpa biaya dan tidak ditulis ulang ke storage.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from config.setting import LOW_STOCK_THRESHOLD, PRICE_DROP_MIN_PERCENT
+from src.parser import ProductRecord
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+VariantState = Tuple[Optional[int], Optional[int], Optional[int]]  # (model_id, stock, price)
+Snapshot = Tuple[VariantState, ...]
+
+RESTOCK = "restock"
+SELLOUT = "sellout"
+PRICE_DROP = "price_drop"
+LOW_STOCK = "low_stock"
+PRICE_LOW = "price_low"
+NEW_VARIANT = "new_variant"
+
+EVENT_KINDS = (RESTOCK, SELLOUT, PRICE_DROP, LOW_STOCK, PRICE_LOW, NEW_VARIANT)
+
+
+class ChangeEvent:
+    """Satu perubahan berarti pada satu variasi."""
+
+    __slots__ = ("kind", "key", "model_id", "variant", "old_stock", "new_stock", "old_price", "new_price")
+
+    def __init__(
+        self,
+        kind: str,
+        key: ProductKey,
+        model_id: Optional[int],
+        variant: str,
+        old_stock: Optional[int],
+        new_stock: Optional[int],
+        old_price: Optional[int],
+        new_price: Optional[int],
+    ):
+        self.kind = kind
+        self.key = key
+        self.model_id = model_id
+        self.variant = variant
+        self.old_stock = old_stock
+        self.new_stock = new_stock
+        self.old_price = old_price
+        self.new_price = new_price
+
+    def __repr__(self):
+        return (
+            f"ChangeEvent({self.kind!r}, {self.key!r}, {self.variant!r}, "
+            f"stock={self.old_stock!r}->{self.new_stock!r}, price={self.old_price!r}->{self.new_price!r})"
+        )
+
+
+def snapshot_of(record: ProductRecord) -> Snapshot:
+    """Snapshot ringkas dari hasil parse."""
+    if record.variants:
+        return tuple((v.model_id, v.stock, v.price) for v in record.variants)
+    return ((None, record.stock, record.price),)
+
+
+def _aggregate(snapshot: Snapshot) -> Snapshot:
+    """Gabung semua variasi jadi satu (total stok, harga termurah)."""
+    stocks = [s for _, s, _ in snapshot if s is not None]
+    prices = [p for _, _, p in snapshot if p is not None]
+    return ((None, sum(stocks) if stocks else None, min(prices) if prices else None),)
+
+
+class ChangeDetector:
+    """
+    Simpan snapshot terakhir tiap item dan hitung event saat ada poll baru.
+
+    low_stock=0 mematikan event low_stock; price_drop_percent=0 berarti
+    penurunan harga sekecil apapun jadi event.
+    """
+
+    def __init__(self, low_stock: int = LOW_STOCK_THRESHOLD, price_drop_percent: float = PRICE_DROP_MIN_PERCENT):
+        self.low_stock = low_stock
+        self.price_drop_percent = price_drop_percent
+        self.snapshots: Dict[ProductKey, Snapshot] = {}
+
+        self.diffs = 0
+        self.unchanged = 0
+        self.events = 0
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def seed(self, key: ProductKey, snapshot: Snapshot):
+        """Isi snapshot awal (mis. dari storage) tanpa menghasilkan event."""
+        self.snapshots[key] = snapshot
+
+    def forget(self, key: ProductKey):
+        self.snapshots.pop(key, None)
+
+    def diff(self, key: ProductKey, record: ProductRecord) -> Tuple[bool, List[ChangeEvent]]:
+        """
+        Bandingkan record baru dengan snapshot lama lalu simpan yang baru.
+        Return (snapshot berubah?, event). Poll pertama suatu item hanya
+        jadi baseline (berubah, tanpa event).
+        """
+        self.diffs += 1
+        new = snapshot_of(record)
+        old = self.snapshots.get(key)
+        if old == new:
+            self.unchanged += 1
+            return False, []
+        self.snapshots[key] = new
+        if old is None:
+            return True, []
+
+        names = {v.model_id: v.name for v in record.variants}
+        # baseline lama tanpa variasi (mis. data JSON lama) vs item bervariasi:
+        # bandingkan di level item supaya tidak dianggap variasi baru semua
+        old_by_model = dict(((m, (s, p)) for m, s, p in old))
+        if (None in old_by_model) != (new[0][0] is None):
+            old_by_model = {None: _aggregate(old)[0][1:]}
+            new = _aggregate(new)
+
+        events = []
+        for model_id, stock, price in new:
+            prev = old_by_model.get(model_id)
+            if prev is None:
+                # variasi baru: tidak ada stok/harga lama untuk dibandingkan, jadi bukan restock
+                if stock:
+                    variant = names.get(model_id, "")
+                    events.append(ChangeEvent(NEW_VARIANT, key, model_id, variant, None, stock, None, price))
+                continue
+            self._compare(events, key, model_id, names.get(model_id, ""), prev[0], stock, prev[1], price)
+
+        self.events += len(events)
+        return True, events
+
+    def _compare(self, events: list, key, model_id, variant, old_stock, stock, old_price, price):
+        if old_stock is not None and stock is not None:
+            if old_stock <= 0 < stock:
+                events.append(ChangeEvent(RESTOCK, key, model_id, variant, old_stock, stock, old_price, price))
+            elif stock <= 0 < old_stock:
+                events.append(ChangeEvent(SELLOUT, key, model_id, variant, old_stock, stock, old_price, price))
+            elif 0 < stock < self.low_stock <= old_stock:
+                events.append(ChangeEvent(LOW_STOCK, key, model_id, variant, old_stock, stock, old_price, price))
+
+        if old_price and price is not None and price < old_price:
+            if (old_price - price) * 100 >= old_price * self.price_drop_percent:
+                events.append(ChangeEvent(PRICE_DROP, key, model_id, variant, old_stock, stock, old_price, price))
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self.snapshots),
+            "variants": sum(len(s) for s in self.snapshots.values()),
+            "diffs": self.diffs,
+            "unchanged": self.unchanged,
+            "events": self.events,
+        }
@@ -0,0 +1,403 @@
+"""
+Riwayat harga & stok per variasi (time series, append-only).
+
+Layout di HISTORY_DIR:
+
+    series.txt        satu baris "shop_id<TAB>item_id<TAB>model_id" per series;
+                      nomor baris (mulai 0) = series id
+    history.wal       sample terbaru yang belum masuk segment (varint, di-replay saat start)
+    L<level>-<seq>.seg segment immutable berisi block per series
+
+Block = header (series id, jumlah sample, ts pertama, ts terakhir, panjang
+payload) + payload kolumnar: kolom ts, kolom harga, kolom stok, masing-masing
+delta dari sample sebelumnya, di-zigzag lalu varint. Harga/stok yang tidak
+berubah antar poll jadi 1 byte, ts selisih ~5 menit jadi 2 byte.
+
+Alur tulis: append() -> head di memori (array per series) + buffer WAL;
+flush() menulis WAL; kalau WAL > HISTORY_WAL_LIMIT, checkpoint() menulis semua
+head sebagai satu segment level 0 lalu WAL dikosongkan. Tiap ada FANOUT
+segment di satu level, segment itu digabung jadi satu segment level berikutnya
+(size-tiered), sekalian membuang sample lebih tua dari retensi. Block kecil
+hasil checkpoint jadi block besar, dan tiap sample hanya ditulis ulang
+O(log n) kali.
+"""
+import os
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.setting import HISTORY_DIR, HISTORY_RETENTION_DAYS, HISTORY_WAL_LIMIT
+from src.parser import ProductRecord
+
+SeriesKey = Tuple[str, str, int]  # (shop_id, item_id, model_id; 0 = item tanpa variasi)
+Sample = Tuple[int, Optional[int], Optional[int]]  # (ts detik, harga, stok)
+
+FANOUT = 4
+MAX_BLOCK_SAMPLES = 4096
+_NONE = -1  # harga/stok tidak diketahui
+
+
+def _zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _unzigzag(z: int) -> int:
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+
+def _put_varint(buf: bytearray, n: int):
+    while n > 0x7F:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _get_varint(data, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _encode_block(series_id: int, samples: List[Sample]) -> bytes:
+    payload = bytearray()
+    for column in range(3):
+        prev = samples[0][0] if column == 0 else 0
+        for sample in samples:
+            value = sample[column]
+            value = _NONE if value is None else value
+            _put_varint(payload, _zigzag(value - prev))
+            prev = value
+    header = bytearray()
+    for n in (series_id, len(samples), samples[0][0], samples[-1][0], len(payload)):
+        _put_varint(header, n)
+    return bytes(header + payload)
+
+
+def _decode_payload(data: bytes, count: int, first_ts: int) -> List[Sample]:
+    columns = []
+    pos = 0
+    for column in range(3):
+        values = []
+        prev = first_ts if column == 0 else 0
+        for _ in range(count):
+            z, pos = _get_varint(data, pos)
+            prev += _unzigzag(z)
+            values.append(prev)
+        columns.append(values)
+    ts, prices, stocks = columns
+    return [
+        (t, None if p == _NONE else p, None if s == _NONE else s)
+        for t, p, s in zip(ts, prices, stocks)
+    ]
+
+
+class Segment:
+    """Satu file segment immutable + index block-nya."""
+
+    __slots__ = ("path", "level", "seq", "blocks", "size", "samples", "fd")
+
+    def __init__(self, path: str, level: int, seq: int):
+        self.path = path
+        self.level = level
+        self.seq = seq
+        # series id -> [(offset payload, panjang, ts pertama, ts terakhir, jumlah)]
+        self.blocks: Dict[int, List[Tuple[int, int, int, int, int]]] = {}
+        self.size = 0
+        self.samples = 0
+        self.fd: Optional[int] = None
+
+    @classmethod
+    def open(cls, path: str) -> "Segment":
+        level, seq = os.path.basename(path)[1:-4].split("-")
+        segment = cls(path, int(level), int(seq))
+        with open(path, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            series_id, pos = _get_varint(data, pos)
+            count, pos = _get_varint(data, pos)
+            first_ts, pos = _get_varint(data, pos)
+            last_ts, pos = _get_varint(data, pos)
+            length, pos = _get_varint(data, pos)
+            segment.blocks.setdefault(series_id, []).append((pos, length, first_ts, last_ts, count))
+            segment.samples += count
+            pos += length
+        segment.size = len(data)
+        segment.fd = os.open(path, os.O_RDONLY)
+        return segment
+
+    def read(self, series_id: int, start: int, end: int) -> List[Sample]:
+        samples = []
+        for offset, length, first_ts, last_ts, count in self.blocks.get(series_id, ()):
+            if last_ts < start or first_ts > end:
+                continue
+            samples.extend(_decode_payload(os.pread(self.fd, length, offset), count, first_ts))
+        return samples
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        directory: str = HISTORY_DIR,
+        retention_days: float = HISTORY_RETENTION_DAYS,
+        wal_limit: int = HISTORY_WAL_LIMIT,
+    ):
+        self.directory = directory
+        self.retention = retention_days * 86400
+        self.wal_limit = wal_limit
+        os.makedirs(directory, exist_ok=True)
+
+        self.series: Dict[SeriesKey, int] = {}
+        self.names: List[SeriesKey] = []
+        self.items: Dict[Tuple[str, str], List[int]] = {}  # (shop_id, item_id) -> model_id
+        self.heads: Dict[int, array] = {}  # series id -> [ts, harga, stok, ts, ...]
+        self.segments: List[Segment] = []
+        self._new_series: List[SeriesKey] = []
+        self._wal_buffer = bytearray()
+        self._seq = 0
+
+        self.checkpoints = 0
+        self.compactions = 0
+        self._load()
+
+    # --- file ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        path = self._path("series.txt")
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    shop_id, item_id, model_id = line.rstrip("\n").split("\t")
+                    self._register((shop_id, item_id, int(model_id)))
+
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".seg"):
+                segment = Segment.open(self._path(name))
+                self.segments.append(segment)
+                self._seq = max(self._seq, segment.seq)
+            elif name.endswith(".tmp"):
+                os.remove(self._path(name))  # sisa compaction yang terputus
+        self.segments.sort(key=lambda s: s.seq)
+
+        path = self._path("history.wal")
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            pos = 0
+            try:
+                while pos < len(data):
+                    series_id, pos = _get_varint(data, pos)
+                    ts, pos = _get_varint(data, pos)
+                    price, pos = _get_varint(data, pos)
+                    stock, pos = _get_varint(data, pos)
+                    if series_id < len(self.names):
+                        self.heads.setdefault(series_id, array("q")).extend((ts, _unzigzag(price), _unzigzag(stock)))
+            except IndexError:
+                pass  # record terakhir terpotong (crash saat menulis)
+
+    def _register(self, key: SeriesKey) -> int:
+        series_id = len(self.names)
+        self.series[key] = series_id
+        self.names.append(key)
+        self.items.setdefault(key[:2], []).append(key[2])
+        return series_id
+
+    # --- tulis ---
+
+    def append(self, key: SeriesKey, ts: int, price: Optional[int], stock: Optional[int]):
+        series_id = self.series.get(key)
+        if series_id is None:
+            series_id = self._register(key)
+            self._new_series.append(key)
+        price = _NONE if price is None else price
+        stock = _NONE if stock is None else stock
+        self.heads.setdefault(series_id, array("q")).extend((ts, price, stock))
+        buf = self._wal_buffer
+        _put_varint(buf, series_id)
+        _put_varint(buf, ts)
+        _put_varint(buf, _zigzag(price))
+        _put_varint(buf, _zigzag(stock))
+
+    def record(self, shop_id: str, item_id: str, record: ProductRecord, ts: Optional[float] = None):
+        """Satu sample per variasi (item tanpa variasi = model_id 0)."""
+        ts = int(time.time() if ts is None else ts)
+        if record.variants:
+            for v in record.variants:
+                self.append((shop_id, item_id, v.model_id or 0), ts, v.price, v.stock)
+        else:
+            self.append((shop_id, item_id, 0), ts, record.price, record.stock)
+
+    def flush(self):
+        """Tulis series baru & WAL; checkpoint kalau WAL sudah besar."""
+        # series dulu, supaya id di WAL selalu punya nama setelah crash
+        self._flush_series()
+        if self._wal_buffer:
+            with open(self._path("history.wal"), "ab") as f:
+                f.write(self._wal_buffer)
+            self._wal_buffer = bytearray()
+        wal = self._path("history.wal")
+        if os.path.isfile(wal) and os.path.getsize(wal) > self.wal_limit:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Pindahkan semua head ke segment level 0, kosongkan WAL, lalu compaction."""
+        self._flush_series()
+        if self.heads:
+            def series_samples():
+                for series_id in sorted(self.heads):
+                    head = self.heads[series_id]
+                    yield series_id, [
+                        (head[i], None if head[i + 1] == _NONE else head[i + 1], None if head[i + 2] == _NONE else head[i + 2])
+                        for i in range(0, len(head), 3)
+                    ]
+            self._write_segment(0, series_samples())
+            self.heads = {}
+        self._wal_buffer = bytearray()
+        open(self._path("history.wal"), "wb").close()
+        self.checkpoints += 1
+        self.compact()
+
+    def _flush_series(self):
+        if self._new_series:
+            with open(self._path("series.txt"), "a", encoding="utf-8") as f:
+                f.writelines(f"{s}\t{i}\t{m}\n" for s, i, m in self._new_series)
+            self._new_series = []
+
+    def _write_segment(self, level: int, series_samples: Iterable[Tuple[int, List[Sample]]]) -> Optional[Segment]:
+        self._seq += 1
+        path = self._path(f"L{level}-{self._seq:08d}.seg")
+        tmp = path + ".tmp"
+        written = False
+        with open(tmp, "wb") as f:
+            for series_id, samples in series_samples:
+                for start in range(0, len(samples), MAX_BLOCK_SAMPLES):
+                    f.write(_encode_block(series_id, samples[start:start + MAX_BLOCK_SAMPLES]))
+                    written = True
+            f.flush()
+            os.fsync(f.fileno())
+        if not written:
+            os.remove(tmp)
+            return None
+        os.replace(tmp, path)
+        segment = Segment.open(path)
+        self.segments.append(segment)
+        return segment
+
+    def compact(self):
+        """Size-tiered: FANOUT segment di satu level -> satu segment di level berikutnya."""
+        while True:
+            levels: Dict[int, List[Segment]] = {}
+            for segment in self.segments:
+                levels.setdefault(segment.level, []).append(segment)
+            level = next((lvl for lvl in sorted(levels) if len(levels[lvl]) >= FANOUT), None)
+            if level is None:
+                return
+            self._merge(levels[level][:FANOUT], level + 1)
+
+    def _merge(self, segments: List[Segment], level: int):
+        cutoff = int(time.time() - self.retention) if self.retention > 0 else 0
+        series_ids = sorted(set().union(*(s.blocks for s in segments)))
+
+        def series_samples():
+            for series_id in series_ids:
+                samples = []
+                for segment in segments:
+                    samples.extend(segment.read(series_id, cutoff, 1 << 62))
+                samples = sorted((s for s in samples if s[0] >= cutoff), key=lambda s: s[0])
+                if samples:
+                    yield series_id, samples
+
+        self._write_segment(level, series_samples())
+        for segment in segments:
+            self.segments.remove(segment)
+            segment.close()
+            os.remove(segment.path)
+        self.compactions += 1
+
+    def close(self):
+        self.flush()
+        self.checkpoint()
+        for segment in self.segments:
+            segment.close()
+
+    # --- baca ---
+
+    def query(self, key: SeriesKey, start: int = 0, end: Optional[int] = None) -> List[Sample]:
+        """Semua sample series `key` dengan start <= ts <= end, urut waktu."""
+        series_id = self.series.get(key)
+        if series_id is None:
+            return []
+        end = int(time.time()) + 1 if end is None else end
+        samples = []
+        for segment in self.segments:
+            samples.extend(segment.read(series_id, start, end))
+        head = self.heads.get(series_id)
+        if head:
+            for i in range(0, len(head), 3):
+                if start <= head[i] <= end:
+                    samples.append((
+                        head[i],
+                        None if head[i + 1] == _NONE else head[i + 1],
+                        None if head[i + 2] == _NONE else head[i + 2],
+                    ))
+        samples.sort(key=lambda s: s[0])
+        return [s for s in samples if start <= s[0] <= end]
+
+    def window_stats(self, key: SeriesKey, start: int, end: Optional[int] = None) -> Optional[dict]:
+        """
+        min/max/rata-rata harga dalam window. Rata-rata ditimbang lama harga
+        berlaku (sample sampai sample berikutnya), jadi hasilnya sama apakah
+        tiap poll dicatat atau hanya perubahan.
+        """
+        end = int(time.time()) if end is None else end
+        samples = [s for s in self.query(key, start, end) if s[1] is not None]
+        if not samples:
+            return None
+        prices = [p for _, p, _ in samples]
+        weighted = total = 0
+        for (ts, price, _), next_ts in zip(samples, [s[0] for s in samples[1:]] + [end]):
+            duration = max(1, next_ts - ts)
+            weighted += price * duration
+            total += duration
+        return {
+            "min": min(prices),
+            "max": max(prices),
+            "avg": weighted / total,
+            "last": prices[-1],
+            "stock": samples[-1][2],
+            "samples": len(samples),
+            "since": samples[0][0],
+        }
+
+    def item_series(self, shop_id: str, item_id: str) -> List[SeriesKey]:
+        return [(shop_id, item_id, model_id) for model_id in self.items.get((shop_id, item_id), ())]
+
+    def stats(self) -> dict:
+        head_samples = sum(len(h) // 3 for h in self.heads.values())
+        samples = sum(s.samples for s in self.segments) + head_samples
+        disk = sum(s.size for s in self.segments)
+        for name in ("series.txt", "history.wal"):
+            path = self._path(name)
+            if os.path.isfile(path):
+                disk += os.path.getsize(path)
+        return {
+            "series": len(self.names),
+            "samples": samples,
+            "head_samples": head_samples,
+            "segments": len(self.segments),
+            "disk_bytes": disk,
+            "bytes_per_sample": round(disk / samples, 2) if samples else 0.0,
+        }
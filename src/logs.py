@@ -0,0 +1,62 @@
+"""
+Logging berlevel lewat antrian.
+
+Modul memakai `logging.getLogger(__name__)` seperti biasa; setup_logging()
+memasang satu QueueHandler di root logger, jadi pemanggil hanya menaruh
+record ke antrian. Tulis ke console dan ke LOG_FILE (WARNING ke atas,
+pengganti shopee_error.log lama) dikerjakan thread QueueListener.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+from config.setting import LOG_FILE, LOG_LEVEL
+
+FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+# library yang cerewet di level INFO (httpx: satu baris per request)
+QUIET_LOGGERS = ("httpx", "httpcore", "apscheduler", "telegram")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: str = LOG_FILE) -> logging.handlers.QueueListener:
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level_no = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    if not isinstance(level_no, int):
+        level_no = logging.INFO
+
+    formatter = logging.Formatter(FORMAT)
+    console = logging.StreamHandler()
+    console.setLevel(level_no)
+    console.setFormatter(formatter)
+    handlers = [console]
+    if log_file:
+        errors = logging.FileHandler(log_file, encoding="utf-8", delay=True)
+        errors.setLevel(logging.WARNING)
+        errors.setFormatter(formatter)
+        handlers.append(errors)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(records)]
+    root.setLevel(min(level_no, logging.WARNING))
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(level_no, logging.WARNING))
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Kosongkan antrian log (dipanggil otomatis saat exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
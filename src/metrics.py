@@ -0,0 +1,253 @@
+"""
+Metrics ringan untuk pipeline fetch -> decode -> parse -> simpan -> notifikasi.
+
+Semua disimpan di memori proses (satu registry `metrics`):
+
+- counter  : shopee_http_responses_total{status}, shopee_api_errors_total{code}, ...
+- gauge    : shopee_poll_lag_seconds, shopee_tracked_items, ...
+- histogram: shopee_stage_seconds{stage} untuk tiap tahap pipeline
+             (credential, ratelimit = antri token limiter, http, decode,
+             parse, persist, rules = evaluasi /rule per batch, notify)
+
+Update cukup satu lookup dict + penjumlahan, aman dipanggil di hot path.
+Dibaca lewat /stats di Telegram atau endpoint Prometheus lokal
+(METRICS_PORT, lihat MetricsServer).
+"""
+import asyncio
+import bisect
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.setting import METRICS_HOST, METRICS_PORT
+
+PREFIX = "shopee_"
+# batas atas bucket histogram (detik)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGES = ("credential", "ratelimit", "http", "decode", "parse", "persist", "rules", "notify")
+
+Labels = Tuple[Tuple[str, str], ...]
+MetricKey = Tuple[str, Labels]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # bucket terakhir = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Perkiraan kuantil: interpolasi linear di dalam bucket tempat kuantil itu jatuh."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.counters: Dict[MetricKey, float] = {}
+        self.gauges: Dict[MetricKey, float] = {}
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        # gauge yang dihitung saat dibaca (mis. panjang antrian)
+        self.callbacks: Dict[str, Callable[[], float]] = {}
+        self.help: Dict[str, str] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self.gauges[(name, _labels(labels))] = value
+
+    def gauge_fn(self, name: str, fn: Callable[[], float]):
+        self.callbacks[name] = fn
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def observe(self, name: str, value: float, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def time(self, stage: str) -> _Timer:
+        """`with metrics.time("http"): ...` -> shopee_stage_seconds{stage="http"}."""
+        return _Timer(self.histogram("stage_seconds", stage=stage))
+
+    def by_label(self, name: str, label: str) -> Dict[str, float]:
+        """Counter `name` dijumlah per nilai satu label, mis. status HTTP."""
+        totals: Dict[str, float] = {}
+        for (metric, labels), value in self.counters.items():
+            if metric == name:
+                for k, v in labels:
+                    if k == label:
+                        totals[v] = totals.get(v, 0) + value
+        return totals
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+        self.started = time.time()
+
+    # --- export ---
+
+    def _gauges(self) -> Dict[MetricKey, float]:
+        gauges = dict(self.gauges)
+        for name, fn in self.callbacks.items():
+            try:
+                gauges[(name, ())] = float(fn())
+            except Exception:
+                pass
+        gauges[("uptime_seconds", ())] = time.time() - self.started
+        return gauges
+
+    def render(self) -> str:
+        """Format teks Prometheus (exposition format 0.0.4)."""
+        lines: List[str] = []
+
+        def fmt(labels: Labels, extra: Labels = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        def family(metrics: dict, kind: str):
+            seen = set()
+            for name, labels in sorted(metrics, key=lambda k: (k[0], k[1])):
+                if name not in seen:
+                    seen.add(name)
+                    if name in self.help:
+                        lines.append(f"# HELP {PREFIX}{name} {self.help[name]}")
+                    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                yield name, labels
+
+        for name, labels in family(self.counters, "counter"):
+            lines.append(f"{PREFIX}{name}{fmt(labels)} {self.counters[(name, labels)]:g}")
+        gauges = self._gauges()
+        for name, labels in family(gauges, "gauge"):
+            lines.append(f"{PREFIX}{name}{fmt(labels)} {gauges[(name, labels)]:g}")
+        for name, labels in family(self.histograms, "histogram"):
+            h = self.histograms[(name, labels)]
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{PREFIX}{name}_bucket{fmt(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{fmt(labels)} {h.sum:.6f}")
+            lines.append(f"{PREFIX}{name}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def stages(self) -> Dict[str, dict]:
+        """Ringkasan tiap tahap pipeline untuk /stats."""
+        result = {}
+        for stage in STAGES:
+            h = self.histograms.get(("stage_seconds", (("stage", stage),)))
+            if h is not None and h.count:
+                result[stage] = {
+                    "count": h.count,
+                    "avg": h.sum / h.count,
+                    "p50": h.quantile(0.5),
+                    "p99": h.quantile(0.99),
+                    "max": h.max,
+                }
+        return result
+
+
+metrics = Metrics()
+metrics.help.update({
+    "stage_seconds": "Durasi tiap tahap pipeline fetch",
+    "http_responses_total": "Response Shopee per status HTTP",
+    "api_errors_total": "Response Shopee dengan kode error",
+    "fetch_errors_total": "Fetch gagal sebelum ada response (timeout, koneksi, JSON rusak)",
+    "poll_lag_seconds": "Keterlambatan check terakhir dari jadwalnya",
+    "poll_delay_seconds": "Keterlambatan tiap check adaptif dari jadwalnya",
+    "poll_cycle_seconds": "Durasi satu cycle poll mode fixed",
+    "notifications_total": "Notifikasi Telegram per hasil",
+    "short_links_total": "Link pendek per sumber hasil resolve (memory, db, network, failed)",
+})
+
+
+class MetricsServer:
+    """
+    Endpoint HTTP minimal di event loop yang sama: GET /metrics -> format
+    Prometheus. Hanya bind ke METRICS_HOST (default 127.0.0.1); port 0 = mati.
+    """
+
+    def __init__(self, registry: Metrics = metrics, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> bool:
+        if not self.port:
+            return False
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return True
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            # buang sisa header
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -1,48 +1,440 @@
-from src.shopee import fetch_product as get_product_status
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from config.setting import HISTORY_ALERT_DAYS, IMPORT_CHUNK, LOAD_CHUNK, OUT_OF_STOCK_WEIGHT
+
+from src.batcher import ProductBatcher, get_batcher
+from src.diff import PRICE_DROP, PRICE_LOW, ChangeDetector, ChangeEvent, snapshot_of
+from src.history import HistoryStore
+from src.metrics import metrics
+from src.parser import ProductRecord
+from src.resolver import ShortLinkResolver
+from src.rules import AlertRule, AlertRules
+from src.shopee import is_error_marker
+from src.storage import MemoryStorage, SQLiteStorage, Storage, import_legacy_json
+from src.urls import is_short_link, parse_product_url, product_url
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shopee_url(url: str) -> Optional[Tuple[str, str]]:
+    """Ambil (shop_id, item_id) dari URL produk Shopee, None kalau gagal (lihat src/urls.py)."""
+    ids = parse_product_url(url)
+    if ids is None:
+        logger.info("❌ URL invalid (tidak mengandung i.<shop_id>.<item_id>): %s", url[:100])
+    return ids
+
+
+def build_status(record: ProductRecord) -> dict:
+    """Ringkasan status produk yang disimpan sebagai last_status."""
+    return {
+        "available": record.available,
+        "stock": "N/A" if record.stock is None else record.stock,
+        "price": "N/A" if record.price is None else record.price,
+    }
+
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+
+def poll_weight(subscribers: int, urgency: int, available: bool) -> float:
+    """
+    Bobot item untuk scheduler adaptif: jumlah pelanggan x urgensi
+    tertinggi (level 2 = 4x, level 3 = 16x -> interval 1/2, 1/4) x
+    OUT_OF_STOCK_WEIGHT kalau sedang habis.
+    """
+    weight = float(max(1, subscribers)) * 4 ** (max(1, urgency) - 1)
+    return weight if available else weight * OUT_OF_STOCK_WEIGHT
+
 
 class ProductMonitor:
-    def __init__(self):
-        self.products = {}
+    """
+    Index produk & langganan.
+
+    products     : (shop_id, item_id) -> info produk (satu entry per item unik)
+    subscribers  : (shop_id, item_id) -> set chat_id yang memantau item itu
+    chat_items   : chat_id -> item yang dipantau chat itu (dict = ordered set,
+                   urutannya dipakai untuk nomor di /list dan /remove)
+    urgency      : (shop_id, item_id) -> {chat_id: level} untuk level > 1 (/urgent)
+    rules        : aturan alert per langganan (/rule), lihat src/rules.py
 
-    def add_product(self, url: str):
+    Jadi satu item cukup di-fetch sekali per cycle berapapun pelanggannya,
+    dan /list, /remove cuma menyentuh langganan chat yang bersangkutan.
+
+    Index di atas dimuat dari `storage` saat start (lazy=True: bertahap lewat
+    load_async, tunggu `loaded`); perubahan langganan
+    langsung ditulis, hasil poll dikumpulkan lalu ditulis sekaligus lewat flush().
+    Hasil poll yang sama dengan snapshot sebelumnya (lihat `detector`) tidak
+    ditulis ulang. Kalau ada `history`, tiap poll juga dicatat per variasi.
+    """
+
+    fetched_on_add = True  # add_product sudah fetch itemnya; poll pertama boleh satu interval lagi
+
+    def __init__(
+        self,
+        storage: Optional[Storage] = None,
+        batcher: Optional[ProductBatcher] = None,
+        detector: Optional[ChangeDetector] = None,
+        history: Optional[HistoryStore] = None,
+        lazy: bool = False,
+    ):
+        self.storage = storage or MemoryStorage()
+        self._batcher = batcher
+        self._resolver: Optional[ShortLinkResolver] = None
+        self.detector = detector or ChangeDetector()
+        self.history = history
+        self.products: Dict[ProductKey, dict] = {}
+        self.subscribers: Dict[ProductKey, Set[int]] = {}
+        self.chat_items: Dict[int, Dict[ProductKey, None]] = {}
+        self.urgency: Dict[ProductKey, Dict[int, int]] = {}
+        self.rules = AlertRules()
+        self._dirty: Dict[ProductKey, None] = {}
+        self.version = 0  # naik tiap ada produk ditambah/dihapus
+        # lazy=True: index masih kosong sampai load_async() selesai
+        self.loaded = asyncio.Event()
+        if not lazy:
+            self.load()
+
+    @property
+    def batcher(self) -> ProductBatcher:
+        if self._batcher is None:
+            self._batcher = get_batcher()
+        return self._batcher
+
+    @property
+    def resolver(self) -> ShortLinkResolver:
+        """Resolver link pendek shp.ee, cache-nya di storage yang sama."""
+        if self._resolver is None:
+            self._resolver = ShortLinkResolver(self.storage)
+        return self._resolver
+
+    def load(self):
+        for _ in self._load_steps(LOAD_CHUNK):
+            pass
+
+    async def load_async(self, chunk: int = LOAD_CHUNK):
+        """
+        Muat index dari storage per `chunk` baris, gantian dengan task lain di
+        event loop (handler Telegram tetap jalan). `loaded` diset di akhir.
+        """
+        started = time.perf_counter()
+        for _ in self._load_steps(chunk):
+            await asyncio.sleep(0)
+        logger.info(
+            "📦 %s produk, %s langganan dimuat dalam %.2fs",
+            len(self.products), sum(len(s) for s in self.subscribers.values()), time.perf_counter() - started,
+        )
+
+    def _load_steps(self, chunk: int) -> Iterator[None]:
+        chunk = max(1, chunk)
+        for n, (product, snapshot) in enumerate(self.storage.iter_products(), 1):
+            key = (product["shop_id"], product["item_id"])
+            self.products[key] = product
+            if snapshot is None:
+                # data lama tanpa snapshot variasi: baseline dari last_status
+                status = product.get("last_status") or {}
+                stock, price = status.get("stock"), status.get("price")
+                snapshot = ((None, stock if isinstance(stock, int) else None, price if isinstance(price, int) else None),)
+            self.detector.seed(key, snapshot)
+            if n % chunk == 0:
+                yield
+        for n, (chat_id, shop_id, item_id, urgency) in enumerate(self.storage.iter_subscriptions(), 1):
+            key = (shop_id, item_id)
+            if key in self.products:
+                self.subscribers.setdefault(key, set()).add(chat_id)
+                self.chat_items.setdefault(chat_id, {})[key] = None
+                if urgency and urgency > 1:
+                    self.urgency.setdefault(key, {})[chat_id] = urgency
+            if n % chunk == 0:
+                yield
+        for n, (chat_id, shop_id, item_id, rule) in enumerate(self.storage.load_rules(), 1):
+            key = (shop_id, item_id)
+            if chat_id in self.subscribers.get(key, ()):
+                self.rules.set(key, chat_id, AlertRule.from_dict(rule))
+            if n % chunk == 0:
+                yield
+        self.version += 1
+        self.loaded.set()
+
+    async def add_product(self, url: str, chat_id: Optional[int] = None):
         try:
-            # ambil shop_id & item_id dari URL
-            if "-i." in url:
-                parts = url.split("-i.")
-            elif "i." in url:
-                parts = url.split("i.")
+            # ambil shop_id & item_id dari URL (link pendek: ikuti redirect-nya, di-cache)
+            if is_short_link(url):
+                ids = await self.resolver.resolve(url)
+                url = product_url(ids) if ids else url
             else:
-                print("❌ URL invalid (tidak mengandung i.<shop_id>.<item_id>)")
+                ids = parse_shopee_url(url)
+            if not ids:
                 return False, None
 
-            ids_part = parts[1].split("?")[0]  # buang query string
-            ids = ids_part.split(".")
-            if len(ids) < 2:
-                print("❌ URL invalid (gagal parsing shop_id & item_id)")
-                return False, None
+            key = ids
+            shop_id, item_id = key
 
-            shop_id, item_id = ids[0], ids[1]
+            product_info = self.products.get(key)
+            if product_info is None:
+                logger.debug("➡️ Parsed shop_id=%s, item_id=%s", shop_id, item_id)
+                # /add bersamaan untuk item yang sama cuma jadi satu request
+                data = await self.batcher.get(shop_id, item_id)
 
-            print(f"➡️ Parsed shop_id={shop_id}, item_id={item_id}")
-            data = get_product_status(shop_id, item_id)
+                if not data:
+                    logger.warning("❌ Gagal fetch Shopee API")
+                    return False, None
+                if is_error_marker(data):
+                    # ErrorCode-<n> jangan sampai tersimpan sebagai produk
+                    logger.warning("❌ Shopee API error %s untuk item %s", data.error, item_id)
+                    return False, None
 
-            if not data:
-                print("❌ Gagal fetch Shopee API")
-                return False, None
+                # simpan ke cache + storage
+                product_info = self._track(key, url, data)
+                self.storage.save_product(product_info)
+                self.storage.save_snapshots({key: self.detector.snapshots[key]})
+                self.version += 1
 
-            product_info = {
-                "name": data.get("name", "Unknown"),
-                "stock": data.get("stock", "N/A"),
-                "price": data.get("price", "N/A"),
-                "item_id": item_id,
-                "shop_id": shop_id,
-                "url": url,
-            }
-
-            # simpan ke cache
-            self.products[item_id] = product_info
+            # item sudah dipantau chat lain -> cukup tambah langganan, tanpa fetch
+            self.subscribe(chat_id, key)
             return True, product_info
 
         except Exception as e:
-            print(f"❌ add_product error: {e}")
+            logger.error("❌ add_product error: %s", e)
             return False, None
+
+    def _track(self, key: ProductKey, url: str, data: ProductRecord) -> dict:
+        """Masukkan produk baru ke index + detector (+ riwayat); belum ditulis ke storage."""
+        status = build_status(data)
+        product_info = {
+            "name": data.name,
+            "stock": status["stock"],
+            "price": status["price"],
+            "item_id": key[1],
+            "shop_id": key[0],
+            "url": url,
+            "last_status": status,
+        }
+        self.products[key] = product_info
+        self.detector.seed(key, snapshot_of(data))
+        if self.history is not None:
+            self.history.record(key[0], key[1], data)
+        return product_info
+
+    async def add_many(
+        self,
+        items: Dict[ProductKey, str],
+        chat_id: Optional[int] = None,
+        progress: Optional[Callable[[dict], Awaitable[None]]] = None,
+        chunk: int = IMPORT_CHUNK,
+    ) -> dict:
+        """
+        Tambah banyak produk sekaligus (/import). `items`: (shop_id, item_id) -> url,
+        sudah unik. Per potongan `chunk` item: produk yang belum dipantau di-fetch
+        paralel lewat batcher, lalu produk + langganan ditulis dalam satu
+        transaksi dan `progress(hasil)` dipanggil. Return hitungan hasil:
+        added (produk baru), subscribed (produk sudah dipantau chat lain),
+        already (sudah ada di daftar chat ini), failed + failed_urls.
+        """
+        result = {"total": len(items), "done": 0, "added": 0, "subscribed": 0, "already": 0, "failed": 0, "failed_urls": []}
+        keys = list(items)
+        for start in range(0, len(keys), max(1, chunk)):
+            part = keys[start:start + chunk]
+            mine = self.chat_items.get(chat_id, {})
+            todo = [key for key in part if key not in mine]
+            result["already"] += len(part) - len(todo)
+
+            fresh = [key for key in todo if key not in self.products]
+            fetched = await self.batcher.get_many(fresh) if fresh else {}
+            new_products, subscribe = [], []
+            for key in todo:
+                if key not in self.products:
+                    data = fetched.get(key)
+                    if not data or is_error_marker(data):
+                        result["failed"] += 1
+                        result["failed_urls"].append(items[key])
+                        continue
+                    new_products.append(self._track(key, items[key], data))
+                    result["added"] += 1
+                else:
+                    result["subscribed"] += 1
+                subscribe.append(key)
+                self.subscribers.setdefault(key, set()).add(chat_id)
+                self.chat_items.setdefault(chat_id, {})[key] = None
+
+            snapshots = self.detector.snapshots
+            self.storage.save_statuses(
+                new_products, {(p["shop_id"], p["item_id"]): snapshots[(p["shop_id"], p["item_id"])] for p in new_products}
+            )
+            self.storage.add_subscriptions(chat_id, subscribe)
+            if new_products:
+                self.version += 1
+            result["done"] += len(part)
+            if progress is not None:
+                await progress(result)
+        return result
+
+    def subscribe(self, chat_id: Optional[int], key: ProductKey):
+        subs = self.subscribers.setdefault(key, set())
+        if chat_id in subs:
+            return
+        subs.add(chat_id)
+        self.chat_items.setdefault(chat_id, {})[key] = None
+        self.storage.add_subscription(chat_id, key)
+
+    def unsubscribe(self, chat_id: Optional[int], key: ProductKey) -> Optional[dict]:
+        """Hapus langganan; produknya ikut dibuang kalau sudah tidak ada pelanggan."""
+        items = self.chat_items.get(chat_id)
+        if not items or key not in items:
+            return None
+        del items[key]
+        if not items:
+            del self.chat_items[chat_id]
+        self.storage.remove_subscription(chat_id, key)
+        levels = self.urgency.get(key)
+        if levels is not None:
+            levels.pop(chat_id, None)
+            if not levels:
+                del self.urgency[key]
+        self.rules.remove(key, chat_id)
+
+        subs = self.subscribers.get(key)
+        if subs is not None:
+            subs.discard(chat_id)
+            if not subs:
+                del self.subscribers[key]
+                self._dirty.pop(key, None)
+                self.detector.forget(key)
+                self.storage.delete_product(key)
+                self.version += 1
+                return self.products.pop(key, None)
+        return self.products.get(key)
+
+    def list_products(self, chat_id: Optional[int]) -> List[dict]:
+        """Produk yang dipantau satu chat, sesuai urutan penambahan."""
+        return [self.products[key] for key in self.chat_items.get(chat_id, ())]
+
+    def remove_product(self, chat_id: Optional[int], index: int) -> Optional[dict]:
+        """Hapus produk nomor `index` (mulai 0) dari daftar chat."""
+        keys = list(self.chat_items.get(chat_id, ()))
+        if not 0 <= index < len(keys):
+            return None
+        return self.unsubscribe(chat_id, keys[index])
+
+    def get_subscribers(self, key: ProductKey) -> Set[int]:
+        return self.subscribers.get(key, set())
+
+    def set_urgency(self, chat_id: Optional[int], index: int, level: int) -> Optional[dict]:
+        """Set urgensi (1 = normal) produk nomor `index` (mulai 0) milik chat."""
+        keys = list(self.chat_items.get(chat_id, ()))
+        if not 0 <= index < len(keys):
+            return None
+        key = keys[index]
+        if level > 1:
+            self.urgency.setdefault(key, {})[chat_id] = level
+        elif key in self.urgency:
+            self.urgency[key].pop(chat_id, None)
+            if not self.urgency[key]:
+                del self.urgency[key]
+        self.storage.set_urgency(chat_id, key, level)
+        return self.products[key]
+
+    def set_rule(self, chat_id: Optional[int], index: int, rule: Optional[AlertRule]) -> Optional[dict]:
+        """Pasang (atau hapus, rule None) aturan alert produk nomor `index` (mulai 0) milik chat."""
+        keys = list(self.chat_items.get(chat_id, ()))
+        if not 0 <= index < len(keys):
+            return None
+        key = keys[index]
+        self.rules.set(key, chat_id, rule)
+        self.storage.set_rule(chat_id, key, rule.to_dict() if rule else None)
+        return self.products[key]
+
+    def get_rule(self, chat_id: Optional[int], key: ProductKey) -> Optional[AlertRule]:
+        return self.rules.get(key, chat_id)
+
+    def get_urgency(self, chat_id: Optional[int], key: ProductKey) -> int:
+        return self.urgency.get(key, {}).get(chat_id, 1)
+
+    def poll_weight(self, key: ProductKey) -> float:
+        levels = self.urgency.get(key)
+        product = self.products.get(key) or {}
+        return poll_weight(
+            len(self.subscribers.get(key, ())),
+            max(levels.values()) if levels else 1,
+            bool((product.get("last_status") or {}).get("available")),
+        )
+
+    def update_status(self, key: ProductKey, data: Optional[ProductRecord]) -> Tuple[bool, List[ChangeEvent]]:
+        """
+        Simpan hasil poll terbaru. Return (snapshot berubah?, event perubahan
+        per variasi: restock, sellout, price_drop, low_stock, price_low). Fetch gagal /
+        error code Shopee tidak mengubah apa-apa; hasil yang sama persis juga
+        tidak menandai produk untuk ditulis ulang. Item yang berubah dicatat
+        ke `rules` untuk dievaluasi per batch (RestockPoller).
+        """
+        product = self.products.get(key)
+        if product is None or not data or is_error_marker(data):
+            return False, []
+
+        old = self.detector.snapshots.get(key)
+        changed, events = self.detector.diff(key, data)
+        if self.history is not None:
+            now = time.time()
+            events += self._price_low_events(key, events, now)
+            self.history.record(key[0], key[1], data, now)
+        if not changed:
+            return False, []
+
+        new_status = build_status(data)
+        product["stock"] = new_status["stock"]
+        product["price"] = new_status["price"]
+        product["last_status"] = new_status
+        self._dirty[key] = None
+        if old is not None:
+            self.rules.observe(key, old, data)
+        return True, events
+
+    def _price_low_events(self, key: ProductKey, events: List[ChangeEvent], now: float) -> List[ChangeEvent]:
+        """Harga turun ke bawah minimum HISTORY_ALERT_DAYS terakhir (riwayat minimal 1 hari)."""
+        window = HISTORY_ALERT_DAYS * 86400
+        lows = []
+        for e in events:
+            if e.kind != PRICE_DROP:
+                continue
+            stats = self.history.window_stats((key[0], key[1], e.model_id or 0), int(now - window), int(now))
+            if stats and stats["since"] <= now - min(window, 86400) and e.new_price < stats["min"]:
+                lows.append(ChangeEvent(
+                    PRICE_LOW, key, e.model_id, e.variant, e.old_stock, e.new_stock, stats["min"], e.new_price,
+                ))
+        return lows
+
+    def flush(self):
+        """Tulis semua hasil poll yang belum disimpan dalam satu batch."""
+        with metrics.time("persist"):
+            if self.history is not None:
+                self.history.flush()
+            if not self._dirty:
+                return
+            keys = [key for key in self._dirty if key in self.products]
+            self._dirty = {}
+            snapshots = self.detector.snapshots
+            self.storage.save_statuses(
+                [self.products[key] for key in keys],
+                {key: snapshots[key] for key in keys if key in snapshots},
+            )
+
+    def close(self):
+        """Flush terakhir sebelum shutdown; riwayat di-checkpoint ke segment."""
+        self.flush()
+        if self.history is not None:
+            self.history.close()
+
+
+_monitor: Optional[ProductMonitor] = None
+
+
+def get_monitor(lazy: bool = False) -> ProductMonitor:
+    """ProductMonitor bersama untuk seluruh handler bot (lazy: lihat load_async)."""
+    global _monitor
+    if _monitor is None:
+        storage = SQLiteStorage()
+        import_legacy_json(storage)
+        _monitor = ProductMonitor(storage, history=HistoryStore(), lazy=lazy)
+    return _monitor
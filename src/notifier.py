@@ -0,0 +1,336 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter
+
+from config.setting import (
+    NOTIFY_CHAT_INTERVAL,
+    NOTIFY_CONCURRENCY,
+    NOTIFY_DIGEST_WINDOW,
+    NOTIFY_GROUP_INTERVAL,
+    NOTIFY_MAX_ATTEMPTS,
+    NOTIFY_RATE,
+)
+from src.metrics import metrics
+from src.ratelimit import AdaptiveRateLimiter
+from src.storage import MemoryStorage, Storage
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096  # batas teks send_message Telegram
+DIGEST_SEPARATOR = "\n\n— — —\n\n"
+
+
+class Notification:
+    __slots__ = ("id", "chat_id", "text", "created_at", "attempts", "not_before")
+
+    def __init__(self, id: Optional[int], chat_id: int, text: str, created_at: float, attempts: int = 0):
+        self.id = id
+        self.chat_id = chat_id
+        self.text = text
+        self.created_at = created_at
+        self.attempts = attempts
+        self.not_before = 0.0  # monotonic; ditahan sampai saat ini (jam tenang /rule)
+
+
+class NotificationDispatcher:
+    """
+    Antrian notifikasi keluar ke Telegram.
+
+    - Global: token bucket NOTIFY_RATE pesan/detik (AIMD, dipotong saat 429).
+    - Per chat: minimal NOTIFY_CHAT_INTERVAL detik antar pesan (grup
+      NOTIFY_GROUP_INTERVAL), dan hanya satu send in-flight per chat.
+    - Notifikasi yang menumpuk untuk satu chat selama menunggu giliran
+      (minimal NOTIFY_DIGEST_WINDOW) digabung jadi satu pesan digest.
+    - RetryAfter: semua pengiriman dipause sesuai retry_after lalu diulang.
+    - Tiap notifikasi ditulis ke tabel outbox saat masuk dan dihapus setelah
+      terkirim, jadi yang belum terkirim dikirim ulang setelah restart.
+    - enqueue(..., delay) menahan notifikasi (jam tenang); yang lain untuk
+      chat yang sama tetap jalan. Penahanan tidak ikut disimpan: setelah
+      restart notifikasi dari outbox langsung dikirim.
+    """
+
+    def __init__(
+        self,
+        bot,
+        storage: Optional[Storage] = None,
+        rate: float = NOTIFY_RATE,
+        chat_interval: float = NOTIFY_CHAT_INTERVAL,
+        group_interval: float = NOTIFY_GROUP_INTERVAL,
+        digest_window: float = NOTIFY_DIGEST_WINDOW,
+        max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+        concurrency: int = NOTIFY_CONCURRENCY,
+    ):
+        self.bot = bot
+        self.storage = storage or MemoryStorage()
+        # burst kecil: batas Telegram dihitung per detik, bukan rata-rata.
+        # RetryAfter sudah memberi tahu lama pause-nya, jadi potong rate sedikit
+        # saja dan pulihkan cepat (~rate/5 per detik).
+        self.limiter = AdaptiveRateLimiter(
+            rate=rate, min_rate=min(1.0, rate), max_rate=rate,
+            increase=rate / 5, decrease=0.8, max_burst=1,
+        )
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.digest_window = digest_window
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+        self._pending: Dict[int, List[Notification]] = {}
+        self._queue: List[Tuple[float, int, int]] = []  # heap (ready_at, seq, chat_id)
+        self._scheduled: Dict[int, float] = {}  # chat_id -> ready_at entry heap yang berlaku
+        self._inflight: Set[int] = set()
+        self._last_sent: Dict[int, float] = {}
+        self._seq = 0
+        self._paused_until = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+        self.enqueued = 0
+        self.delivered = 0  # notifikasi sampai
+        self.sent = 0       # pesan Telegram terkirim
+        self.digests = 0    # pesan yang berisi >1 notifikasi
+        self.retries = 0    # RetryAfter dari Telegram
+        self.failures = 0   # error lain (timeout, network...)
+        self.dropped = 0
+        self.latencies = deque(maxlen=10000)  # detik dari enqueue sampai terkirim
+
+    def start(self):
+        """Harus dipanggil dari dalam event loop yang sedang jalan (mis. post_init)."""
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        restored = 0
+        for id, chat_id, text, created_at, attempts in self.storage.load_outbox():
+            self._add(Notification(id, chat_id, text, created_at, attempts))
+            restored += 1
+        if restored:
+            logger.info("📬 %s notifikasi belum terkirim dimuat dari outbox", restored)
+        metrics.gauge_fn("notify_pending", lambda: self.pending)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop worker; notifikasi yang belum terkirim tetap ada di outbox."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def enqueue(self, chat_id: int, text: str, delay: float = 0.0):
+        self.enqueue_many([chat_id], text, delay)
+
+    def enqueue_many(self, chat_ids: Iterable[int], text: str, delay: float = 0.0):
+        """Teks yang sama ke banyak chat (mis. semua pelanggan satu item), satu transaksi outbox."""
+        now = time.time()
+        chat_ids = list(chat_ids)
+        ids = self.storage.add_outbox([(chat_id, text, now) for chat_id in chat_ids])
+        for id, chat_id in zip(ids, chat_ids):
+            notification = Notification(id, chat_id, text, now)
+            if delay > 0:
+                notification.not_before = time.monotonic() + delay
+            self._add(notification)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(n) for n in self._pending.values())
+
+    def _interval(self, chat_id: int) -> float:
+        # id grup/channel Telegram negatif
+        return self.group_interval if isinstance(chat_id, int) and chat_id < 0 else self.chat_interval
+
+    def _add(self, notification: Notification):
+        self.enqueued += 1
+        self._pending.setdefault(notification.chat_id, []).append(notification)
+        self._schedule(notification.chat_id, max(notification.not_before, time.monotonic() + self.digest_window))
+
+    def _schedule(self, chat_id: int, not_before: float):
+        if chat_id in self._inflight or chat_id not in self._pending:
+            return
+        ready_at = max(not_before, self._last_sent.get(chat_id, 0.0) + self._interval(chat_id))
+        if self._scheduled.get(chat_id, float("inf")) <= ready_at:
+            return
+        # chat yang sedang menunggu notifikasi ditahan bisa dimajukan; entry lama jadi basi
+        self._seq += 1
+        heapq.heappush(self._queue, (ready_at, self._seq, chat_id))
+        self._scheduled[chat_id] = ready_at
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _sleep(self, timeout: Optional[float]):
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _paused(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            while self._queue and self._scheduled.get(self._queue[0][2]) != self._queue[0][0]:
+                heapq.heappop(self._queue)  # entry basi: chat-nya sudah dijadwal ulang lebih awal
+            if not self._queue:
+                await self._sleep(None)
+                continue
+            wait = max(self._queue[0][0], self._paused_until) - time.monotonic()
+            if wait > 0:
+                await self._sleep(wait)
+                continue
+
+            await self._slots.acquire()
+            if not await self.limiter.acquire(self._paused):
+                self._slots.release()
+                continue
+
+            if not self._queue or self._queue[0][0] > time.monotonic():
+                # heap berubah selama menunggu token
+                self._slots.release()
+                continue
+            ready_at, _, chat_id = heapq.heappop(self._queue)
+            if self._scheduled.get(chat_id) != ready_at:
+                self._slots.release()
+                continue
+            del self._scheduled[chat_id]
+            batch = self._pending.pop(chat_id, None)
+            if batch:
+                batch = self._hold(chat_id, batch, time.monotonic())
+            if not batch:
+                self._slots.release()
+                continue
+
+            self._inflight.add(chat_id)
+            task = loop.create_task(self._send(chat_id, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _hold(self, chat_id: int, batch: List[Notification], now: float) -> List[Notification]:
+        """Kembalikan notifikasi yang masih ditahan ke antrian; return yang siap dikirim."""
+        if not any(n.not_before > now for n in batch):
+            return batch
+        ready = [n for n in batch if n.not_before <= now]
+        held = [n for n in batch if n.not_before > now]
+        if held:
+            self._pending[chat_id] = held
+            if not ready:
+                self._schedule(chat_id, min(n.not_before for n in held))
+        return ready
+
+    def _digest(self, batch: List[Notification]) -> List[Tuple[str, List[Notification]]]:
+        """Gabung notifikasi satu chat jadi pesan <= MAX_MESSAGE_LENGTH."""
+        if len(batch) == 1:
+            return [(batch[0].text[:MAX_MESSAGE_LENGTH], batch)]
+
+        chunks = []
+        texts, group, size = [], [], 0
+        for n in batch:
+            text = n.text[:MAX_MESSAGE_LENGTH - 64]
+            if group and size + len(DIGEST_SEPARATOR) + len(text) > MAX_MESSAGE_LENGTH - 64:
+                chunks.append((texts, group))
+                texts, group, size = [], [], 0
+            texts.append(text)
+            group.append(n)
+            size += len(DIGEST_SEPARATOR) + len(text)
+        chunks.append((texts, group))
+
+        return [
+            (f"📬 {len(g)} notifikasi:\n\n" + DIGEST_SEPARATOR.join(t) if len(g) > 1 else t[0], g)
+            for t, g in chunks
+        ]
+
+    async def _send(self, chat_id: int, batch: List[Notification]):
+        remaining = list(batch)
+        retry_delay = 0.0
+        try:
+            for n, (text, group) in enumerate(self._digest(batch)):
+                if n and not await self.limiter.acquire(self._paused):
+                    break
+                try:
+                    with metrics.time("notify"):
+                        await self.bot.send_message(chat_id=chat_id, text=text)
+                except RetryAfter as e:
+                    self.retries += 1
+                    metrics.inc("notifications_total", result="retry_after")
+                    self.limiter.on_block()
+                    self._paused_until = max(self._paused_until, time.monotonic() + float(e.retry_after))
+                    logger.warning("⏳ Telegram flood limit, pause notifikasi %ss", e.retry_after)
+                    break
+                except ChatMigrated as e:
+                    # grup di-upgrade jadi supergroup: kirim ulang ke id baru
+                    for item in remaining:
+                        item.chat_id = e.new_chat_id
+                    self._pending.setdefault(e.new_chat_id, [])[:0] = remaining
+                    self._schedule(e.new_chat_id, 0.0)
+                    remaining = []
+                    break
+                except (Forbidden, BadRequest) as e:
+                    # bot diblok / chat tidak ada: tidak akan berhasil kalau diulang
+                    self._drop(group, f"chat {chat_id}: {e}")
+                except Exception as e:
+                    self.failures += 1
+                    metrics.inc("notifications_total", result="failed")
+                    logger.warning("❌ Gagal kirim notifikasi ke %s: %s", chat_id, e)
+                    retry_delay = self._fail(remaining)
+                    break
+                else:
+                    now = time.time()
+                    self.limiter.on_success()
+                    self.sent += 1
+                    self.delivered += len(group)
+                    metrics.inc("notifications_total", len(group), result="delivered")
+                    if len(group) > 1:
+                        self.digests += 1
+                    self.latencies.extend(now - item.created_at for item in group)
+                    self.storage.delete_outbox(item.id for item in group)
+                    self._last_sent[chat_id] = time.monotonic()
+                remaining = remaining[len(group):]
+        finally:
+            self._inflight.discard(chat_id)
+            self._slots.release()
+            if remaining:
+                # taruh lagi di depan supaya urutan tetap
+                self._pending.setdefault(chat_id, [])[:0] = remaining
+            self._schedule(chat_id, time.monotonic() + retry_delay)
+
+    def _fail(self, remaining: List[Notification]) -> float:
+        """Naikkan attempts; buang yang sudah max_attempts. Return jeda retry."""
+        for item in remaining:
+            item.attempts += 1
+        self.storage.bump_outbox_attempts(item.id for item in remaining)
+        expired = [item for item in remaining if item.attempts >= self.max_attempts]
+        if expired:
+            self._drop(expired, f"gagal {self.max_attempts}x")
+            remaining[:] = [item for item in remaining if item.attempts < self.max_attempts]
+        attempts = max((item.attempts for item in remaining), default=1)
+        return min(60.0, 2.0 ** attempts)
+
+    def _drop(self, items: List[Notification], reason: str):
+        self.dropped += len(items)
+        metrics.inc("notifications_total", len(items), result="dropped")
+        self.storage.delete_outbox(item.id for item in items)
+        logger.warning("🗑️ %s notifikasi dibuang (%s)", len(items), reason)
+
+    def status(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "pending": self.pending,
+            "chats": len(self._pending),
+            "inflight": len(self._inflight),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "sent": self.sent,
+            "digests": self.digests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "rate": round(self.limiter.rate, 2),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "p50": latencies[len(latencies) // 2] if latencies else None,
+        }
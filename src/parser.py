@@ -0,0 +1,223 @@
+"""
+Parser payload produk Shopee -> record kecil bertipe.
+
+Satu tempat untuk semua bentuk payload yang kita temui:
+  - PDP v4 (/api/v4/pdp/get_pc): data.item.{title,status,models|model_list}
+  - bentuk lama/flat: data.{name,stock,price}
+  - item dari endpoint batch: {itemid, shopid, name, stock, price, models}
+  - halaman daftar item toko (/api/v4/shop/search_items): items[].item_basic
+Harga mentah Shopee dikali 100000, di sini sudah dibagi jadi rupiah.
+
+Payload PDP besar (gambar, deskripsi, info toko...) tetap di-decode utuh
+oleh resp.json(), jadi puncak memori per request masih sebesar payload.
+Yang disimpan (cache, snapshot, hasil worker) cuma record berisi field yang
+dipakai bot; dict hasil decode dibuang setelah diparse.
+"""
+from typing import List, Optional, Tuple
+
+PRICE_SCALE = 100000
+
+
+def safe_int(value) -> Optional[int]:
+    """Convert value ke int, None kalau None atau error"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def scale_price(value) -> Optional[int]:
+    price = safe_int(value)
+    return None if price is None else price // PRICE_SCALE
+
+
+class VariantRecord:
+    """Satu model/variasi produk."""
+
+    __slots__ = ("model_id", "name", "price", "stock")
+
+    def __init__(self, model_id: Optional[int], name: str, price: Optional[int], stock: Optional[int]):
+        self.model_id = model_id
+        self.name = name
+        self.price = price
+        self.stock = stock
+
+    @property
+    def available(self) -> bool:
+        return bool(self.stock and self.stock > 0)
+
+    def as_dict(self) -> dict:
+        return {"model_id": self.model_id, "model": self.name, "price": self.price, "stock": self.stock, "available": self.available}
+
+    def __repr__(self):
+        return f"VariantRecord({self.model_id!r}, {self.name!r}, price={self.price!r}, stock={self.stock!r})"
+
+
+class ProductRecord:
+    """
+    Ringkasan satu produk. `stock` = total stok semua variasi, `price` = harga
+    variasi termurah (atau harga item kalau tidak ada variasi).
+    `error` terisi kalau Shopee menjawab dengan error code.
+    """
+
+    __slots__ = ("shop_id", "item_id", "name", "status", "price", "stock", "variants", "error")
+
+    def __init__(
+        self,
+        shop_id: Optional[str],
+        item_id: Optional[str],
+        name: str,
+        status: Optional[int] = None,
+        price: Optional[int] = None,
+        stock: Optional[int] = None,
+        variants: Tuple[VariantRecord, ...] = (),
+        error: Optional[int] = None,
+    ):
+        self.shop_id = shop_id
+        self.item_id = item_id
+        self.name = name
+        self.status = status
+        self.price = price
+        self.stock = stock
+        self.variants = variants
+        self.error = error
+
+    @classmethod
+    def error_marker(cls, code, shop_id: Optional[str] = None, item_id: Optional[str] = None) -> "ProductRecord":
+        error = safe_int(code)
+        return cls(shop_id, item_id, f"ErrorCode-{code}", error=-1 if error is None else error)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.stock and self.stock > 0)
+
+    def as_dict(self) -> dict:
+        """Bentuk dict lama (name/stock/price) + status & daftar variasi."""
+        return {
+            "name": self.name,
+            "stock": "N/A" if self.stock is None else self.stock,
+            "price": "N/A" if self.price is None else self.price,
+            "status": self.status,
+            "available": self.available,
+            "products": [v.as_dict() for v in self.variants],
+        }
+
+    def pack(self) -> list:
+        """Bentuk list ringkas (JSON-able) untuk dikirim antar proses, lihat unpack()."""
+        return [
+            self.shop_id, self.item_id, self.name, self.status, self.price, self.stock,
+            [[v.model_id, v.name, v.price, v.stock] for v in self.variants], self.error,
+        ]
+
+    @classmethod
+    def unpack(cls, packed: list) -> "ProductRecord":
+        shop_id, item_id, name, status, price, stock, variants, error = packed
+        return cls(shop_id, item_id, name, status, price, stock, tuple(VariantRecord(*v) for v in variants), error)
+
+    def __repr__(self):
+        return (
+            f"ProductRecord({self.shop_id!r}, {self.item_id!r}, {self.name!r}, price={self.price!r}, "
+            f"stock={self.stock!r}, variants={len(self.variants)}, error={self.error!r})"
+        )
+
+
+def parse_item(item: dict, shop_id: Optional[str] = None, item_id: Optional[str] = None) -> ProductRecord:
+    """Parse satu objek item (PDP data.item, data flat, atau item batch)."""
+    get = item.get
+    shop_id = str(get("shop_id") or get("shopid") or shop_id or "") or None
+    item_id = str(get("item_id") or get("itemid") or item_id or "") or None
+    name = get("title") or get("name") or "Unknown"
+
+    variants = []
+    for m in get("models") or get("model_list") or ():
+        stock = safe_int(m.get("stock"))
+        if stock is None:
+            stock = safe_int(m.get("normal_stock"))
+        variants.append(VariantRecord(
+            safe_int(m.get("model_id") or m.get("modelid")),
+            m.get("name") or "",
+            scale_price(m.get("price")),
+            stock,
+        ))
+
+    if variants:
+        prices = [v.price for v in variants if v.price is not None]
+        stocks = [v.stock for v in variants if v.stock is not None]
+        price = min(prices) if prices else None
+        stock = sum(stocks) if stocks else None
+    else:
+        price = scale_price(get("price") if get("price") is not None else get("price_min"))
+        stock = safe_int(get("stock"))
+        if stock is None:
+            stock = safe_int(get("normal_stock"))
+
+    return ProductRecord(shop_id, item_id, name, safe_int(get("status")), price, stock, tuple(variants))
+
+
+def parse_product(payload, shop_id: Optional[str] = None, item_id: Optional[str] = None) -> Optional[ProductRecord]:
+    """
+    Parse response JSON (sudah di-decode). Return None kalau tidak ada data
+    produk; error code Shopee jadi ProductRecord.error_marker.
+    """
+    if not isinstance(payload, dict):
+        return None
+    data = payload.get("data")
+    if isinstance(data, dict) and data:
+        item = data.get("item")
+        return parse_item(item if isinstance(item, dict) else data, shop_id, item_id)
+    if payload.get("error"):
+        return ProductRecord.error_marker(payload["error"], shop_id, item_id)
+    return None
+
+
+def parse_batch(payload) -> List[ProductRecord]:
+    """Item dari endpoint batch: "data" berupa list atau {"items": [...]}."""
+    if not isinstance(payload, dict):
+        return []
+    items = payload.get("data")
+    if isinstance(items, dict):
+        items = items.get("items")
+    return [parse_item(item) for item in items or () if isinstance(item, dict)]
+
+
+class ListingPage:
+    """
+    Satu halaman daftar item toko. `ctimes[i]` = waktu listing dibuat untuk
+    `records[i]` (0 kalau tidak ada); `more` False di halaman terakhir.
+    """
+
+    __slots__ = ("records", "ctimes", "total", "more")
+
+    def __init__(self, records: List[ProductRecord], ctimes: List[int], total: Optional[int], more: bool):
+        self.records = records
+        self.ctimes = ctimes
+        self.total = total
+        self.more = more
+
+    def __len__(self):
+        return len(self.records)
+
+
+def parse_listing(payload, limit: int) -> Optional[ListingPage]:
+    """
+    Halaman /api/v4/shop/search_items (items di root atau di bawah "data").
+    Tiap item berupa {item_basic: {...}} atau langsung objek item-nya.
+    None kalau payload bukan daftar item (mis. error code).
+    """
+    if not isinstance(payload, dict):
+        return None
+    data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    items = data.get("items")
+    if items is None and "total_count" not in data:
+        return None
+
+    records, ctimes = [], []
+    for entry in items or ():
+        if not isinstance(entry, dict):
+            continue
+        item = entry.get("item_basic") if isinstance(entry.get("item_basic"), dict) else entry
+        records.append(parse_item(item, entry.get("shopid"), entry.get("itemid")))
+        ctimes.append(safe_int(item.get("ctime")) or 0)
+    total = safe_int(data.get("total_count"))
+    more = not data.get("nomore") and len(records) >= limit
+    return ListingPage(records, ctimes, total, more)
@@ -0,0 +1,412 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, List, Optional
+
+from config.setting import (
+    CHECK_INTERVAL,
+    FETCH_CONCURRENCY,
+    NOTIFY_EVENTS,
+    POLL_BUDGET,
+    POLL_MODE,
+    TELEGRAM_CHAT_ID,
+)
+from src.batcher import ProductBatcher, get_batcher
+from src.diff import LOW_STOCK, NEW_VARIANT, PRICE_DROP, PRICE_LOW, RESTOCK, SELLOUT, ChangeEvent
+from src.metrics import metrics
+from src.monitor import ProductMonitor
+from src.notifier import NotificationDispatcher
+from src.parser import ProductRecord
+from src.rules import RuleHit
+from src.scheduler import AdaptiveScheduler
+from src.shopee import is_error_marker
+
+if TYPE_CHECKING:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+logger = logging.getLogger(__name__)
+
+FLUSH_EVERY = 5.0  # detik, mode adaptif: tulis hasil poll ke storage berkala
+RESULTS_POLL_INTERVAL = 1.0  # detik, mode remote: cek antrian hasil dari worker
+RESULTS_BATCH = 1000
+
+
+class RestockPoller:
+    """
+    Cek ulang produk di event loop bot.
+
+    mode "fixed"   : (default) semua item tiap CHECK_INTERVAL detik, request
+                     satu cycle disebar merata sepanjang interval (bukan
+                     burst sekaligus).
+    mode "adaptive": tiap item punya jadwal sendiri dari AdaptiveScheduler
+                     (volatility, pelanggan, stok habis, /urgent) dengan total
+                     POLL_BUDGET request/detik (default: sama dengan mode fixed).
+                     Opt-in lewat POLL_MODE=adaptive; worker cluster selalu
+                     memakai mode ini.
+    mode "remote"  : tidak fetch sendiri; hasil poll datang dari worker
+                     (src/cluster.py) lewat tabel results.
+
+    Tiap item unik di-fetch sekali, dan notifikasi dikirim ke semua pelanggannya
+    hanya saat ada event perubahan variasi (lihat src/diff.py) yang jenisnya
+    ada di NOTIFY_EVENTS — satu pesan per item berapapun variasi yang berubah.
+    Pelanggan yang punya aturan /rule (src/rules.py) dikabari sesuai aturannya:
+    aturan dievaluasi per batch tiap kali hasil poll di-flush.
+    """
+
+    EVENT_LABELS = {
+        RESTOCK: "🔔 Restock",
+        SELLOUT: "❌ Habis",
+        PRICE_DROP: "💸 Harga turun",
+        LOW_STOCK: "⚠️ Stok menipis",
+        PRICE_LOW: "📉 Harga terendah",
+        NEW_VARIANT: "🆕 Variasi baru",
+    }
+
+    def __init__(
+        self,
+        monitor: ProductMonitor,
+        notifier: Optional[NotificationDispatcher],
+        interval: int = CHECK_INTERVAL,
+        batcher: Optional[ProductBatcher] = None,
+        concurrency: int = FETCH_CONCURRENCY,
+        notify_events: str = NOTIFY_EVENTS,
+        mode: str = POLL_MODE,
+        budget: float = POLL_BUDGET,
+    ):
+        self.monitor = monitor
+        self.notifier = notifier
+        self.interval = interval
+        self.batcher = batcher or get_batcher()
+        self.concurrency = concurrency
+        self.notify_events = {e.strip() for e in notify_events.split(",") if e.strip()}
+        self.scheduler: Optional["AsyncIOScheduler"] = None
+        self.mode = mode
+        self.budget = budget
+        self.adaptive: Optional[AdaptiveScheduler] = None
+        self._task: Optional[asyncio.Task] = None
+        self._synced_version = None
+        self._tasks = set()
+
+        self.cycles = 0
+        self.checks = 0
+        self.last_cycle = {}
+
+    def start(self):
+        """Harus dipanggil dari dalam event loop yang sedang jalan (mis. post_init)."""
+        if self.mode == "remote":
+            self._task = asyncio.get_running_loop().create_task(self._run_remote())
+            logger.info("⏱️ Restock poller remote: menunggu hasil dari worker")
+            return
+        if self.mode == "adaptive":
+            self.adaptive = AdaptiveScheduler(self._budget())
+            self._task = asyncio.get_running_loop().create_task(self._run_adaptive())
+            logger.info("⏱️ Restock poller adaptif aktif, budget %.2f request/s", self.adaptive.budget)
+            return
+
+        # APScheduler cuma dipakai mode fixed
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+        self.scheduler = AsyncIOScheduler()
+        self.scheduler.add_job(
+            self.run_cycle,
+            "interval",
+            seconds=self.interval,
+            max_instances=1,
+            coalesce=True,
+            id="restock_poll",
+        )
+        self.scheduler.start()
+        logger.info("⏱️ Restock poller aktif, interval %ss", self.interval)
+
+    def stop(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.flush()
+
+    def _budget(self) -> float:
+        if self.budget > 0:
+            return self.budget
+        return max(1, len(self.monitor.products)) / self.interval
+
+    def _sync(self, now: float):
+        """Samakan isi scheduler dengan produk di monitor (hanya kalau ada yang ditambah/dihapus)."""
+        if self._synced_version == self.monitor.version:
+            return
+        startup = self._synced_version is None
+        self._synced_version = self.monitor.version
+
+        adaptive = self.adaptive
+        adaptive.budget = self._budget()
+        products = self.monitor.products
+        for key in [key for key in adaptive.items if key not in products]:
+            adaptive.remove(key)
+        for key in products:
+            if key not in adaptive:
+                # saat start, check pertama disebar sepanjang interval; item
+                # yang masuk belakangan langsung dicek kalau belum pernah di-fetch
+                if startup:
+                    offset = random.uniform(0, self.interval)
+                else:
+                    offset = None if self.monitor.fetched_on_add else 0.0
+                adaptive.add(key, now, self.monitor.poll_weight(key), offset)
+
+    async def _run_adaptive(self):
+        loop = asyncio.get_running_loop()
+        adaptive = self.adaptive
+        breaker = self.batcher.client.breaker
+        slots = asyncio.Semaphore(self.concurrency)
+        next_slot = loop.time()
+        last_flush = loop.time()
+
+        while True:
+            now = loop.time()
+            self._sync(now)
+            if now - last_flush >= FLUSH_EVERY:
+                self.flush()
+                last_flush = now
+
+            # cookie diblok: satu probe, sisanya menunggu breaker
+            if breaker.state != breaker.CLOSED:
+                key = adaptive.pop_due(float("inf"))
+                if key is not None:
+                    await self._poll(key, None)
+                if breaker.state != breaker.CLOSED:
+                    logger.warning("⏸️ Polling dipause (circuit %s), cek lagi %.0fs", breaker.state, breaker.retry_in())
+                    await asyncio.sleep(min(60.0, max(1.0, breaker.retry_in())))
+                continue
+
+            due = adaptive.next_due()
+            wait = max(1.0 if due is None else due - now, next_slot - now)
+            if wait > 0:
+                # maksimal 1 detik supaya produk baru cepat masuk jadwal
+                await asyncio.sleep(min(1.0, wait))
+                continue
+
+            # budget global: satu request per 1/budget detik (boleh kejar ketinggalan 1 detik)
+            next_slot = max(next_slot, now - 1.0) + 1.0 / max(adaptive.budget, 1e-6)
+            key = adaptive.pop_due(now)
+            # lag = seberapa telat check ini dari jadwalnya (budget/concurrency kurang)
+            lag = now - due
+            metrics.set("poll_lag_seconds", lag)
+            metrics.observe("poll_delay_seconds", lag)
+            await slots.acquire()
+            task = loop.create_task(self._poll(key, slots))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_remote(self):
+        storage = self.monitor.storage
+        last_id = 0
+        while True:
+            try:
+                rows = storage.fetch_results(last_id, RESULTS_BATCH)
+            except Exception as e:
+                logger.error("❌ Gagal baca hasil worker: %s", e)
+                rows = []
+            for last_id, shop_id, item_id, payload, _ in rows:
+                key = (shop_id, item_id)
+                product = self.monitor.products.get(key)
+                if product is None:
+                    continue
+                try:
+                    self._apply(key, product, ProductRecord.unpack(json.loads(payload)))
+                except Exception as e:
+                    logger.error("❌ result error %s: %s", item_id, e)
+            if rows:
+                # umur hasil worker tertua yang baru diproses
+                metrics.set("poll_lag_seconds", max(0.0, time.time() - (rows[0][4] or time.time())))
+                storage.ack_results(last_id)
+                self.flush()
+                self.checks += len(rows)
+            if len(rows) < RESULTS_BATCH:
+                await asyncio.sleep(RESULTS_POLL_INTERVAL)
+
+    async def _poll(self, key, slots: Optional[asyncio.Semaphore]):
+        """Satu check mode adaptif, lalu jadwalkan ulang item-nya."""
+        loop = asyncio.get_running_loop()
+        try:
+            product = self.monitor.products.get(key)
+            if product is None:
+                return
+            data = await self.batcher.get(*key, fresh=True)
+            if not data or is_error_marker(data):
+                self.adaptive.retry(key, loop.time())
+                return
+            changed = self._apply(key, product, data)
+            self.adaptive.observe(key, loop.time(), changed, self.monitor.poll_weight(key))
+        except Exception as e:
+            logger.error("❌ poll error %s: %s", key[1], e)
+            self.adaptive.retry(key, loop.time())
+        finally:
+            self.checks += 1
+            if slots is not None:
+                slots.release()
+
+    async def run_cycle(self):
+        loop = asyncio.get_running_loop()
+        products = list(self.monitor.products.items())
+        total = len(products)
+        if not total:
+            return
+
+        # cookie diblok: cycle dipause sampai satu probe berhasil
+        breaker = self.batcher.client.breaker
+        if breaker.state != breaker.CLOSED:
+            key, product = products[0]
+            await self._check(key, product, None)
+            if breaker.state != breaker.CLOSED:
+                self.last_cycle = {"finished_at": time.time(), "items": total, "paused": True}
+                logger.warning("⏸️ Polling dipause (circuit %s), cek lagi %.0fs", breaker.state, breaker.retry_in())
+                return
+
+        # dengan endpoint batch, satu slot = satu batch item
+        group = self.batcher.group_size
+        started = loop.time()
+        deadline = started + self.interval
+        spacing = self.interval / -(-total // group)
+        slots = asyncio.Semaphore(max(self.concurrency, group))
+        tasks = []
+        missed = 0
+
+        for n, first in enumerate(range(0, total, group)):
+            delay = started + n * spacing - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if loop.time() >= deadline:
+                # sisa item tidak sempat dicek di cycle ini
+                missed = total - first
+                break
+
+            for key, product in products[first:first + group]:
+                await slots.acquire()
+                tasks.append(asyncio.create_task(self._check(key, product, slots)))
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.flush()
+
+        duration = loop.time() - started
+        self.cycles += 1
+        metrics.set("poll_lag_seconds", max(0.0, duration - self.interval))
+        metrics.set("poll_missed_items", missed)
+        metrics.observe("poll_cycle_seconds", duration)
+        self.last_cycle = {
+            "finished_at": time.time(),
+            "items": total,
+            "checked": len(tasks),
+            "missed": missed,
+            "duration": duration,
+        }
+        if duration > self.interval or missed:
+            logger.warning(
+                "⚠️ Poll cycle overrun: %.1fs (interval %ss), %s/%s item terlewat",
+                duration, self.interval, missed, total,
+            )
+        else:
+            logger.info("🔁 Poll cycle selesai: %s item dalam %.1fs", len(tasks), duration)
+
+    async def _check(self, key, product: dict, slots: asyncio.Semaphore):
+        try:
+            data = await self.batcher.get(*key, fresh=True)
+            self._apply(key, product, data)
+        except Exception as e:
+            logger.error("❌ poll error %s: %s", product.get('item_id'), e)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    def _apply(self, key, product: dict, data) -> bool:
+        """Simpan hasil poll & kirim notifikasi; return True kalau ada perubahan."""
+        changed, events = self.monitor.update_status(key, data)
+        metrics.inc("polls_total", changed="yes" if changed else "no")
+        for e in events:
+            metrics.inc("events_total", kind=e.kind)
+        events = [e for e in events if e.kind in self.notify_events]
+        if events:
+            chat_ids = self.monitor.get_subscribers(key)
+            rules = self.monitor.rules.of(key)
+            if rules:
+                # aturan dengan syarat dikabari lewat flush(); jam tenang saja = pesan biasa ditahan
+                chat_ids = [chat_id for chat_id in chat_ids if chat_id not in rules]
+                for chat_id, rule in rules.items():
+                    if not rule.conditional:
+                        self.notify_changes([chat_id], product, events, rule.quiet_delay())
+            self.notify_changes(chat_ids, product, events)
+        return changed
+
+    def flush(self):
+        """Evaluasi aturan /rule untuk semua perubahan sejak flush sebelumnya, lalu simpan hasil poll."""
+        with metrics.time("rules"):
+            hits = self.monitor.rules.evaluate()
+        if hits:
+            metrics.inc("events_total", len(hits), kind="rule")
+            self.notify_rules(hits)
+        self.monitor.flush()
+
+    def status(self) -> dict:
+        if self.mode == "remote":
+            return {"mode": self.mode, "checks": self.checks}
+        if self.adaptive is None:
+            return {"mode": self.mode, "last_cycle": self.last_cycle}
+        stats = self.adaptive.stats(asyncio.get_running_loop().time())
+        stats.update(mode=self.mode, checks=self.checks)
+        return stats
+
+    def format_changes(self, product: dict, events: List[ChangeEvent]) -> str:
+        lines = [f"🛒 {product['name']}", ""]
+        for e in events:
+            label = self.EVENT_LABELS.get(e.kind, e.kind)
+            variant = f" [{e.variant}]" if e.variant else ""
+            if e.kind == PRICE_DROP:
+                lines.append(f"{label}{variant}: Rp {e.old_price:,} → Rp {e.new_price:,}")
+            elif e.kind == PRICE_LOW:
+                lines.append(f"{label}{variant}: Rp {e.new_price:,} (min sebelumnya Rp {e.old_price:,})")
+            elif e.kind == NEW_VARIANT:
+                price = f", Rp {e.new_price:,}" if e.new_price is not None else ""
+                lines.append(f"{label}{variant}: stok {e.new_stock}{price}")
+            else:
+                lines.append(f"{label}{variant}: stok {e.old_stock} → {e.new_stock}")
+        lines += ["", f"💰 Harga: {product['price']}", f"🔗 {product['url']}"]
+        return "\n".join(lines)
+
+    def notify_changes(self, chat_ids, product: dict, events: List[ChangeEvent], delay: float = 0.0):
+        """Masukkan ke antrian notifier; pengiriman & rate limit diurus notifier."""
+        if self.notifier is None:
+            # worker (src/cluster.py): notifikasi dikirim bot front-end
+            return
+        chat_ids = [chat_id or TELEGRAM_CHAT_ID for chat_id in chat_ids]
+        if chat_ids:
+            self.notifier.enqueue_many(chat_ids, self.format_changes(product, events), delay)
+
+    @staticmethod
+    def format_rule_hit(product: dict, hit: RuleHit) -> str:
+        variant = f" [{hit.variant}]" if hit.variant else ""
+        price = f"Rp {hit.price:,}" if hit.price is not None else "-"
+        return "\n".join([
+            f"🎯 Aturan terpenuhi: {product['name']}",
+            "",
+            f"💰 {price}{variant} | 📦 stok {hit.stock}",
+            f"📋 Aturan: {hit.rule.describe()}",
+            f"🔗 {product['url']}",
+        ])
+
+    def notify_rules(self, hits: List[RuleHit]):
+        """Satu enqueue per teks + jeda yang sama (chat dengan target sama digabung)."""
+        if self.notifier is None:
+            return
+        groups = {}
+        for hit in hits:
+            product = self.monitor.products.get(hit.key)
+            if product is None:
+                continue
+            text = self.format_rule_hit(product, hit)
+            groups.setdefault((text, hit.rule.quiet_delay()), []).append(hit.chat_id or TELEGRAM_CHAT_ID)
+        for (text, delay), chat_ids in groups.items():
+            self.notifier.enqueue_many(chat_ids, text, delay)
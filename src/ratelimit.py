@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from config.setting import (
+    BREAKER_COOLDOWN,
+    BREAKER_THRESHOLD,
+    RATE_LIMIT,
+    RATE_LIMIT_MAX,
+    RATE_LIMIT_MIN,
+)
+
+logger = logging.getLogger(__name__)
+
+# Error code Shopee yang artinya request kita dianggap bot / diblok
+BLOCK_ERROR_CODES = {90309999, 90309998, 90309997}
+
+OK = "ok"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+def classify_response(status_code: int, data) -> str:
+    """ok / blocked (403, 429, error code anti-bot) / failed (lainnya)."""
+    if status_code in (403, 429):
+        return BLOCKED
+    if status_code != 200 or not isinstance(data, dict):
+        return FAILED
+    if data.get("error") in BLOCK_ERROR_CODES:
+        return BLOCKED
+    if data.get("data"):
+        return OK
+    return FAILED
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket dengan rate yang menyesuaikan diri (AIMD).
+
+    Tiap sukses menaikkan rate sedikit (kira-kira +increase req/s per detik
+    sukses beruntun), tiap blok memotong rate jadi `decrease` kalinya dan
+    mengosongkan bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        min_rate: float = RATE_LIMIT_MIN,
+        max_rate: float = RATE_LIMIT_MAX,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        max_burst: Optional[float] = None,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.max_burst = max_burst
+        self.tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.successes = 0
+        self.blocks = 0
+
+    @property
+    def burst(self) -> float:
+        burst = max(1.0, self.rate)
+        return burst if self.max_burst is None else min(burst, max(1.0, self.max_burst))
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, should_abort: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Tunggu sampai dapat token. Return False (tanpa memakai token) kalau
+        `should_abort()` jadi True selama menunggu, mis. circuit breaker trip.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # lock = antrian FIFO, jadi waiter tidak saling rebut token
+        async with self._lock:
+            while True:
+                if should_abort is not None and should_abort():
+                    return False
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                await asyncio.sleep(min(1.0, (1 - self.tokens) / self.rate))
+
+    def on_success(self):
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_block(self):
+        self.blocks += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+
+    def status(self) -> dict:
+        return {"rate": round(self.rate, 2), "successes": self.successes, "blocks": self.blocks}
+
+
+class CircuitBreaker:
+    """
+    closed   : request jalan normal
+    open     : `threshold` blok beruntun -> semua request ditahan selama cooldown
+    half_open: cooldown habis -> satu request probe boleh lewat;
+               sukses = closed lagi, gagal = open lagi dengan cooldown 2x
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN, max_cooldown: float = 3600):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.consecutive_blocks = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # half open: hanya satu probe
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record(self, outcome: str):
+        if outcome == OK:
+            if self.state != self.CLOSED:
+                logger.info("✅ Circuit breaker closed, polling lanjut")
+            self.state = self.CLOSED
+            self.consecutive_blocks = 0
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+        elif outcome == BLOCKED:
+            self.consecutive_blocks += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._trip()
+            elif self.state == self.CLOSED and self.consecutive_blocks >= self.threshold:
+                self._trip()
+        elif self.state == self.HALF_OPEN:
+            # probe gagal bukan karena blok (timeout dsb) -> coba probe lagi nanti
+            self._probe_in_flight = False
+
+    def trip_soon(self):
+        """Blok berikutnya langsung membuka breaker (mis. semua sesi sudah dikarantina)."""
+        self.consecutive_blocks = max(self.consecutive_blocks, self.threshold - 1)
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.trips += 1
+        logger.warning("⛔ Circuit breaker open: %s blok beruntun, pause %.0fs", self.consecutive_blocks, self.cooldown)
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def retry_in(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_blocks": self.consecutive_blocks,
+            "trips": self.trips,
+            "retry_in": round(self.retry_in(), 1),
+        }
+
+
+class HostRateLimiters:
+    """Satu AdaptiveRateLimiter per host."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+    def for_url(self, url: str) -> AdaptiveRateLimiter:
+        host = urlsplit(url).netloc
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = self.limiters[host] = AdaptiveRateLimiter(**self.kwargs)
+        return limiter
+
+    def status(self) -> Dict[str, dict]:
+        return {host: limiter.status() for host, limiter in self.limiters.items()}
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urljoin
+
+import httpx
+
+from config.setting import RESOLVE_CONCURRENCY, RESOLVE_MAX_REDIRECTS, RESOLVE_TIMEOUT
+from src.metrics import metrics
+from src.storage import Storage
+from src.urls import parse_product_url, short_link_key
+
+logger = logging.getLogger(__name__)
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class ShortLinkResolver:
+    """
+    Resolve link pendek (shp.ee / id.shp.ee) ke (shop_id, item_id).
+
+    - Redirect diikuti manual pakai HEAD (body tidak diunduh) dan berhenti
+      di hop pertama yang URL-nya sudah memuat id produk; server yang
+      menolak HEAD dicoba sekali dengan GET tanpa membaca body.
+    - Hasil di-memo di dict proses ini dan disimpan ke tabel short_links,
+      jadi link yang sama (juga setelah restart) tidak butuh request lagi.
+      Link yang gagal tidak disimpan, bisa dicoba lagi nanti.
+    - Link yang sama diminta bersamaan cuma di-resolve sekali; request
+      in-flight dibatasi `concurrency`.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        concurrency: int = RESOLVE_CONCURRENCY,
+        timeout: float = RESOLVE_TIMEOUT,
+        max_redirects: int = RESOLVE_MAX_REDIRECTS,
+    ):
+        self.storage = storage
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.memo: Dict[str, ProductKey] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.requests = 0  # request HTTP yang benar-benar dikirim
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # sama seperti ShopeeClient: pool httpx terikat ke event loop pembuatnya
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self._client = httpx.AsyncClient(
+                limits=limits, timeout=self.timeout, headers={"user-agent": USER_AGENT}, follow_redirects=False
+            )
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def resolve(self, url: str) -> Optional[ProductKey]:
+        return (await self.resolve_many([url]))[url]
+
+    async def resolve_many(self, urls: Iterable[str]) -> Dict[str, Optional[ProductKey]]:
+        """url -> (shop_id, item_id) atau None; cache dulu, sisanya paralel lewat jaringan."""
+        urls = list(dict.fromkeys(urls))
+        links = {url: short_link_key(url) for url in urls}
+        missing = [link for link in dict.fromkeys(links.values()) if link not in self.memo]
+        if missing:
+            stored = self.storage.get_short_links(missing)
+            self.memo.update(stored)
+            metrics.inc("short_links_total", len(stored), source="db")
+            missing = [link for link in missing if link not in stored]
+        metrics.inc("short_links_total", len(links) - len(missing), source="memory")
+
+        if missing:
+            results = await asyncio.gather(*(self._resolve_one(link, url) for link, url in self._first_urls(links, missing)))
+            resolved = {link: key for link, key in zip(missing, results) if key is not None}
+            self.memo.update(resolved)
+            self.storage.save_short_links(resolved)
+        return {url: self.memo.get(links[url]) for url in urls}
+
+    @staticmethod
+    def _first_urls(links: Dict[str, str], missing):
+        """Satu URL asli per link normal (skema/host asli dipakai untuk request)."""
+        first = {}
+        for url, link in links.items():
+            first.setdefault(link, url)
+        return [(link, first[link]) for link in missing]
+
+    async def _resolve_one(self, link: str, url: str) -> Optional[ProductKey]:
+        future = self._inflight.get(link)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._inflight[link] = asyncio.get_running_loop().create_future()
+        key = None
+        try:
+            key = await self._follow(url if "://" in url else f"https://{url}")
+        except Exception as e:
+            # URL aneh (httpx.InvalidURL, UnicodeError...) cukup gagal sendiri, jangan bawa satu batch
+            logger.warning("⚠️ Gagal resolve %s: %r", url, e)
+        finally:
+            del self._inflight[link]
+            future.set_result(key)
+        metrics.inc("short_links_total", source="network" if key else "failed")
+        return key
+
+    async def _follow(self, url: str) -> Optional[ProductKey]:
+        client = self.client
+        async with self._slots:
+            for _ in range(self.max_redirects + 1):
+                self.requests += 1
+                resp = await client.head(url)
+                if resp.status_code in (405, 501):
+                    self.requests += 1
+                    async with client.stream("GET", url) as resp:
+                        pass
+                location = resp.headers.get("location")
+                if not resp.is_redirect or not location:
+                    key = parse_product_url(str(resp.url))
+                    if key is None:
+                        logger.info("❌ %s berakhir di %s tanpa id produk", url, resp.status_code)
+                    return key
+                url = urljoin(url, location)
+                key = parse_product_url(url)
+                if key is not None:
+                    return key
+        logger.info("❌ Terlalu banyak redirect: %s", url)
+        return None
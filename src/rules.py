@@ -0,0 +1,275 @@
+"""
+Aturan alert per langganan (/rule): harga target, stok minimal, nama variasi,
+jam tenang.
+
+Aturan dengan syarat (harga/stok/variasi) menggantikan notifikasi bawaan
+untuk langganan itu: chat hanya dikabari saat syaratnya *baru* terpenuhi,
+yaitu ada variasi yang cocok dengan stok >= minimal dan harga <= target,
+padahal di snapshot sebelumnya belum. Aturan yang cuma berisi jam tenang
+tetap memakai notifikasi bawaan, hanya pengirimannya ditahan sampai jam
+tenang selesai.
+
+Evaluasi dibuat per batch (sekali per cycle poll / flush, lihat
+RestockPoller), bukan per aturan:
+
+- aturan di-compile per item, dikelompokkan per (variasi, stok minimal);
+  dalam satu kelompok target harga diurutkan;
+- tiap item yang berubah sejak batch sebelumnya dihitung sekali harga
+  termurah yang memenuhi syarat kelompok, sebelum dan sesudah;
+- aturan yang baru terpenuhi = target di rentang [harga sekarang, harga
+  sebelumnya), cukup dua bisect ke list yang sudah urut.
+
+Jadi biayanya O(item berubah x kelompok x variasi + log aturan + hit),
+tidak tergantung jumlah aturan yang tidak kena.
+"""
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from config.setting import RULE_UTC_OFFSET
+from src.diff import Snapshot, snapshot_of
+from src.parser import ProductRecord
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+NO_LIMIT = 2 ** 62  # "tanpa target harga"; juga harga variasi yang tidak diketahui
+
+RULE_RE = re.compile(
+    r"(harga|stok|variasi|sepi)\s*(?:<=|>=|=|:)\s*(.+?)(?=\s+(?:harga|stok|variasi|sepi)\s*(?:<=|>=|=|:)|$)",
+    re.IGNORECASE,
+)
+PRICE_RE = re.compile(r"^(\d+(?:[.,]\d+)*)\s*(rb|ribu|k|jt|juta)?$", re.IGNORECASE)
+QUIET_RE = re.compile(r"^(\d{1,2})(?:[:.](\d{2}))?\s*-\s*(\d{1,2})(?:[:.](\d{2}))?$")
+MULTIPLIER = {"rb": 1000, "ribu": 1000, "k": 1000, "jt": 1000000, "juta": 1000000}
+
+
+def parse_price(text: str) -> int:
+    """Harga dari teks: 150000, 150.000, 150rb, 1,5jt -> rupiah."""
+    match = PRICE_RE.match(text.strip())
+    if match is None:
+        raise ValueError(f"harga tidak valid: {text}")
+    number, suffix = match.groups()
+    if suffix:
+        # dengan satuan, titik/koma = desimal: 1,5jt
+        return int(float(number.replace(",", ".")) * MULTIPLIER[suffix.lower()])
+    return int(number.replace(".", "").replace(",", ""))
+
+
+class AlertRule:
+    """Aturan satu langganan. quiet = (menit mulai, menit selesai) waktu lokal."""
+
+    __slots__ = ("max_price", "min_stock", "variant", "quiet")
+
+    def __init__(
+        self,
+        max_price: Optional[int] = None,
+        min_stock: Optional[int] = None,
+        variant: str = "",
+        quiet: Optional[Tuple[int, int]] = None,
+    ):
+        self.max_price = max_price
+        self.min_stock = min_stock
+        self.variant = variant.lower()
+        self.quiet = quiet
+
+    @property
+    def conditional(self) -> bool:
+        """Punya syarat sendiri (bukan cuma jam tenang)."""
+        return self.max_price is not None or self.min_stock is not None or bool(self.variant)
+
+    def __bool__(self):
+        return self.conditional or self.quiet is not None
+
+    def to_dict(self) -> dict:
+        data = {"price": self.max_price, "stock": self.min_stock, "variant": self.variant or None, "quiet": self.quiet}
+        return {k: v for k, v in data.items() if v is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AlertRule":
+        quiet = data.get("quiet")
+        return cls(data.get("price"), data.get("stock"), data.get("variant") or "", tuple(quiet) if quiet else None)
+
+    def quiet_delay(self, now: Optional[float] = None, utc_offset: float = RULE_UTC_OFFSET) -> float:
+        """Detik sampai jam tenang selesai; 0 kalau sekarang bukan jam tenang."""
+        if self.quiet is None:
+            return 0.0
+        start, end = (m * 60 for m in self.quiet)
+        second = ((now if now is not None else time.time()) + utc_offset * 3600) % 86400
+        inside = start <= second < end if start <= end else second >= start or second < end
+        return (end - second) % 86400 if inside else 0.0
+
+    def describe(self) -> str:
+        parts = []
+        if self.max_price is not None:
+            parts.append(f"harga ≤ Rp {self.max_price:,}")
+        if self.min_stock is not None:
+            parts.append(f"stok ≥ {self.min_stock}")
+        if self.variant:
+            parts.append(f"variasi \"{self.variant}\"")
+        if self.quiet is not None:
+            parts.append("sepi {:02d}:{:02d}-{:02d}:{:02d}".format(*divmod(self.quiet[0], 60), *divmod(self.quiet[1], 60)))
+        return ", ".join(parts) or "-"
+
+
+def parse_rule(text: str) -> AlertRule:
+    """
+    "harga=150rb stok=3 variasi=merah xl sepi=22-07" -> AlertRule.
+    ValueError (pesan siap ditampilkan) kalau ada bagian yang tidak dikenal.
+    """
+    rest = RULE_RE.sub("", text).strip()
+    if rest:
+        raise ValueError(f"bagian aturan tidak dikenal: {rest}")
+    rule = AlertRule()
+    for match in RULE_RE.finditer(text.strip()):
+        name, value = match.group(1).lower(), match.group(2).strip()
+        if name == "harga":
+            rule.max_price = parse_price(value)
+        elif name == "stok":
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"stok minimal harus angka >= 1: {value}")
+            rule.min_stock = int(value)
+        elif name == "variasi":
+            rule.variant = value.strip("\"'").lower()
+        else:
+            quiet = QUIET_RE.match(value)
+            if quiet is None:
+                raise ValueError(f"jam tenang harus seperti 22-07 atau 22:30-06:00: {value}")
+            h1, m1, h2, m2 = (int(g or 0) for g in quiet.groups())
+            start, end = h1 * 60 + m1, (h2 * 60 + m2) % 1440
+            if h1 > 23 or h2 > 24 or m1 > 59 or m2 > 59 or start == end:
+                raise ValueError(f"jam tenang tidak valid: {value}")
+            rule.quiet = (start, end)
+    if not rule:
+        raise ValueError("aturan kosong")
+    return rule
+
+
+def best_variant(snapshot: Snapshot, names: Dict[Optional[int], str], variant: str, min_stock: int):
+    """(harga, stok, model_id) termurah yang memenuhi syarat, None kalau tidak ada."""
+    best = None
+    for model_id, stock, price in snapshot:
+        if stock is None or stock < min_stock:
+            continue
+        if variant and variant not in names.get(model_id, ""):
+            continue
+        price = NO_LIMIT if price is None else price
+        if best is None or price < best[0]:
+            best = (price, stock, model_id)
+    return best
+
+
+class _RuleGroup:
+    """Aturan satu item dengan (variasi, stok minimal) sama, urut target harga."""
+
+    __slots__ = ("variant", "min_stock", "thresholds", "chats")
+
+    def __init__(self, variant: str, min_stock: int, entries: List[Tuple[int, Optional[int]]]):
+        entries.sort(key=lambda e: e[0])
+        self.variant = variant
+        self.min_stock = min_stock
+        self.thresholds = [threshold for threshold, _ in entries]
+        self.chats = [chat_id for _, chat_id in entries]
+
+
+class RuleHit:
+    __slots__ = ("key", "chat_id", "rule", "price", "stock", "variant")
+
+    def __init__(self, key: ProductKey, chat_id: Optional[int], rule: AlertRule, price, stock, variant: str):
+        self.key = key
+        self.chat_id = chat_id
+        self.rule = rule
+        self.price = price
+        self.stock = stock
+        self.variant = variant
+
+
+class AlertRules:
+    """
+    Index aturan: rules[(shop_id, item_id)][chat_id] = AlertRule, plus versi
+    compile per item (dibuat ulang hanya untuk item yang aturannya berubah).
+    """
+
+    def __init__(self):
+        self.rules: Dict[ProductKey, Dict[Optional[int], AlertRule]] = {}
+        self._compiled: Dict[ProductKey, List[_RuleGroup]] = {}
+        self._pending: Dict[ProductKey, list] = {}  # key -> [snapshot awal batch, record terbaru]
+        self.evaluated = 0
+        self.hits = 0
+
+    def __len__(self):
+        return sum(len(r) for r in self.rules.values())
+
+    def get(self, key: ProductKey, chat_id: Optional[int]) -> Optional[AlertRule]:
+        return self.rules.get(key, {}).get(chat_id)
+
+    def of(self, key: ProductKey) -> Optional[Dict[Optional[int], AlertRule]]:
+        return self.rules.get(key)
+
+    def set(self, key: ProductKey, chat_id: Optional[int], rule: Optional[AlertRule]):
+        if rule:
+            self.rules.setdefault(key, {})[chat_id] = rule
+        else:
+            self.remove(key, chat_id)
+            return
+        self._compiled.pop(key, None)
+
+    def remove(self, key: ProductKey, chat_id: Optional[int]):
+        rules = self.rules.get(key)
+        if rules is None or chat_id not in rules:
+            return
+        del rules[chat_id]
+        if not rules:
+            del self.rules[key]
+            self._pending.pop(key, None)
+        self._compiled.pop(key, None)
+
+    def observe(self, key: ProductKey, old: Snapshot, record: ProductRecord):
+        """Catat perubahan item untuk batch berikutnya (snapshot awal dipertahankan)."""
+        if key not in self.rules:
+            return
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [old, record]
+        else:
+            pending[1] = record
+
+    def _groups(self, key: ProductKey) -> List[_RuleGroup]:
+        groups = self._compiled.get(key)
+        if groups is None:
+            entries: Dict[Tuple[str, int], list] = {}
+            for chat_id, rule in self.rules.get(key, {}).items():
+                if rule.conditional:
+                    threshold = NO_LIMIT if rule.max_price is None else rule.max_price
+                    entries.setdefault((rule.variant, rule.min_stock or 1), []).append((threshold, chat_id))
+            groups = self._compiled[key] = [_RuleGroup(v, s, e) for (v, s), e in entries.items()]
+        return groups
+
+    def evaluate(self) -> List[RuleHit]:
+        """Semua aturan yang baru terpenuhi oleh perubahan sejak evaluate() sebelumnya."""
+        pending, self._pending = self._pending, {}
+        hits = []
+        for key, (old, record) in pending.items():
+            groups = self._groups(key)
+            if not groups:
+                continue
+            self.evaluated += 1
+            new = snapshot_of(record)
+            labels = {v.model_id: v.name for v in record.variants}
+            names = {model_id: name.lower() for model_id, name in labels.items()}
+            rules = self.rules[key]
+            for group in groups:
+                now = best_variant(new, names, group.variant, group.min_stock)
+                if now is None:
+                    continue
+                before = best_variant(old, names, group.variant, group.min_stock)
+                lo = bisect_left(group.thresholds, now[0])
+                hi = bisect_left(group.thresholds, before[0]) if before is not None else len(group.thresholds)
+                price = None if now[0] == NO_LIMIT else now[0]
+                for chat_id in group.chats[lo:hi]:
+                    hits.append(RuleHit(key, chat_id, rules[chat_id], price, now[1], labels.get(now[2], "")))
+        self.hits += len(hits)
+        return hits
+
+    def stats(self) -> dict:
+        return {"rules": len(self), "items": len(self.rules), "evaluated": self.evaluated, "hits": self.hits}
@@ -0,0 +1,166 @@
+"""
+Penjadwal poll adaptif berbasis priority queue.
+
+Tiap item punya skor = perkiraan laju perubahan (volatility) x bobot
+(jumlah pelanggan x urgensi x faktor stok habis). Dengan budget B request/detik,
+rata-rata latency deteksi tertimbang paling kecil kalau interval item
+sebanding dengan 1/sqrt(skor):
+
+    interval_i = sum_j sqrt(skor_j) / (B * sqrt(skor_i))
+
+(minimalkan sum skor_i * interval_i / 2 dengan syarat sum 1/interval_i = B).
+Item yang sering berubah / banyak pelanggan / ditunggu restock dicek lebih
+sering, item yang tidak pernah berubah jarang dicek, total request tetap B.
+
+Laju perubahan diperkirakan dari hasil poll sendiri: jumlah poll yang
+berubah dibagi lama observasi, keduanya meluruh dengan half-life, plus prior
+supaya item baru tidak langsung dianggap mati.
+
+Kelas ini tidak tahu soal asyncio / HTTP; waktu selalu dikirim caller,
+jadi bisa dipakai apa adanya di simulasi (bench/sim_scheduler.py).
+"""
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+from config.setting import POLL_MAX_INTERVAL, POLL_MIN_INTERVAL, VOLATILITY_HALFLIFE
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+# prior: anggap tiap item berubah sekali per 6 jam sampai terbukti lain
+PRIOR_CHANGES = 1.0
+PRIOR_SECONDS = 6 * 3600.0
+
+
+class ItemState:
+    __slots__ = ("changes", "exposure", "last_check", "weight", "sqrt_score", "due", "seq")
+
+    def __init__(self, weight: float, now: float):
+        self.changes = 0.0
+        self.exposure = 0.0
+        self.last_check = now
+        self.weight = weight
+        self.sqrt_score = 0.0
+        self.due = now
+        self.seq = 0
+
+    @property
+    def change_rate(self) -> float:
+        """Perkiraan perubahan per detik."""
+        return (self.changes + PRIOR_CHANGES) / (self.exposure + PRIOR_SECONDS)
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        budget: float,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        halflife: float = VOLATILITY_HALFLIFE,
+    ):
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.halflife = halflife
+        self.items: Dict[ProductKey, ItemState] = {}
+        self._heap: List[Tuple[float, int, ProductKey]] = []
+        self._seq = 0
+        self._sum_sqrt = 0.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key: ProductKey):
+        return key in self.items
+
+    def _set_score(self, state: ItemState):
+        sqrt_score = math.sqrt(state.change_rate * max(state.weight, 1e-9))
+        self._sum_sqrt += sqrt_score - state.sqrt_score
+        state.sqrt_score = sqrt_score
+
+    def interval(self, key: ProductKey) -> float:
+        state = self.items[key]
+        if self.budget <= 0 or state.sqrt_score <= 0:
+            return self.max_interval
+        ideal = self._sum_sqrt / (self.budget * state.sqrt_score)
+        return min(self.max_interval, max(self.min_interval, ideal))
+
+    def _push(self, key: ProductKey, state: ItemState, due: float):
+        self._seq += 1
+        state.due = due
+        state.seq = self._seq
+        heapq.heappush(self._heap, (due, self._seq, key))
+
+    def add(self, key: ProductKey, now: float, weight: float = 1.0, offset: Optional[float] = None):
+        """
+        Daftarkan item. Check pertama `offset` detik lagi (default satu
+        interval penuh, untuk item yang baru saja di-fetch; offset 0 untuk
+        item yang belum pernah di-fetch).
+        """
+        if key in self.items:
+            return
+        state = self.items[key] = ItemState(weight, now)
+        self._set_score(state)
+        self._push(key, state, now + (self.interval(key) if offset is None else offset))
+
+    def remove(self, key: ProductKey):
+        state = self.items.pop(key, None)
+        if state is not None:
+            # entry di heap dibuang saat di-pop (lazy)
+            self._sum_sqrt -= state.sqrt_score
+
+    def next_due(self) -> Optional[float]:
+        heap = self._heap
+        while heap:
+            due, seq, key = heap[0]
+            state = self.items.get(key)
+            if state is not None and state.seq == seq:
+                return due
+            heapq.heappop(heap)
+        return None
+
+    def pop_due(self, now: float) -> Optional[ProductKey]:
+        """Item paling telat yang sudah jatuh tempo, None kalau belum ada."""
+        due = self.next_due()
+        if due is None or due > now:
+            return None
+        _, _, key = heapq.heappop(self._heap)
+        self.items[key].seq = -1  # sedang dicek, belum ada jadwal
+        return key
+
+    def observe(self, key: ProductKey, now: float, changed: bool, weight: Optional[float] = None) -> Optional[float]:
+        """Catat hasil check lalu jadwalkan ulang. Return waktu check berikutnya."""
+        state = self.items.get(key)
+        if state is None:
+            return None
+        dt = max(0.0, now - state.last_check)
+        decay = 0.5 ** (dt / self.halflife) if self.halflife > 0 else 1.0
+        state.changes = state.changes * decay + (1.0 if changed else 0.0)
+        state.exposure = state.exposure * decay + dt
+        state.last_check = now
+        if weight is not None:
+            state.weight = weight
+        self._set_score(state)
+        due = now + self.interval(key)
+        self._push(key, state, due)
+        return due
+
+    def retry(self, key: ProductKey, now: float, delay: Optional[float] = None):
+        """Check gagal (fetch error): jadwalkan ulang tanpa mengubah statistik."""
+        state = self.items.get(key)
+        if state is not None:
+            self._push(key, state, now + (self.min_interval if delay is None else delay))
+
+    def stats(self, now: float) -> dict:
+        if not self.items:
+            return {"items": 0, "budget": self.budget}
+        intervals = sorted(self.interval(key) for key in self.items)
+        overdue = sum(1 for s in self.items.values() if 0 < s.seq and s.due <= now)
+        return {
+            "items": len(self.items),
+            "budget": round(self.budget, 3),
+            "min_interval": round(intervals[0], 1),
+            "median_interval": round(intervals[len(intervals) // 2], 1),
+            "max_interval": round(intervals[-1], 1),
+            "overdue": overdue,
+        }
@@ -1,177 +1,534 @@
 # src/shopee.py
-import re
 import json
+import logging
 import os
-import requests
-from typing import Tuple, Dict, Optional
+import asyncio
+import httpx
+from typing import TYPE_CHECKING, Tuple, Dict, Optional, Iterable, List
+from urllib.parse import quote
 
-CURL_FILE = os.path.join(os.path.dirname(__file__), "..", "curl.txt")
-ERROR_LOG = os.path.join(os.path.dirname(__file__), "..", "shopee_error.log")
+from config.setting import FETCH_CONCURRENCY, SHOPEE_BATCH_URL
+from src.cache import ProductCache
+from src.metrics import metrics
+from src.parser import ListingPage, ProductRecord, parse_batch, parse_listing, parse_product
+from src.credentials import (  # noqa: F401 (re-exported for older imports)
+    CURL_FILE,
+    Credential,
+    CredentialPool,
+    build_default_headers,
+    cookie_header,
+    load_cookies_from_env,
+    load_credentials,
+    load_headers_and_cookies_from_curl,
+    product_referer,
+)
+from src.ratelimit import BLOCKED, FAILED, OK, CircuitBreaker, classify_response
 
+if TYPE_CHECKING:
+    import requests
 
-def load_headers_and_cookies_from_curl(curl_file: str = CURL_FILE) -> Tuple[Dict[str, str], Dict[str, str]]:
-    """
-    Parse a 'curl' string saved in curl.txt into headers and cookies dicts.
-    Works with cURL lines like: -H 'key: value' and -H 'cookie: a=b; c=d'
-    """
-    headers: Dict[str, str] = {}
-    cookies: Dict[str, str] = {}
-
-    if not os.path.isfile(curl_file):
-        return headers, cookies
-
-    text = open(curl_file, "r", encoding="utf-8").read()
-
-    # Find all -H 'Key: value' or --header 'Key: value'
-    for m in re.finditer(r"-H\s+'([^:]+):\s*(.*?)'", text):
-        key = m.group(1).strip()
-        val = m.group(2).strip()
-        if key.lower() == "cookie":
-            # parse cookies
-            for c in val.split(";"):
-                if "=" in c:
-                    k, v = c.strip().split("=", 1)
-                    cookies[k] = v
-        else:
-            headers[key] = val
-
-    # Also try to capture a --cookie "..." or --header "cookie: ..."
-    for m in re.finditer(r"--cookie\s+['\"]?(.*?)['\"]?(?:\s|$)", text):
-        raw = m.group(1).strip()
-        for c in raw.split(";"):
-            if "=" in c:
-                k, v = c.strip().split("=", 1)
-                cookies[k] = v
-
-    return headers, cookies
-
-
-def load_cookies_from_env(env_var="SHOPEE_COOKIE") -> Dict[str, str]:
+logger = logging.getLogger(__name__)
+
+BASE_URL = os.getenv("SHOPEE_BASE_URL", "https://shopee.co.id")
+REQUEST_TIMEOUT = 15
+
+
+def build_product_url(shop_id: str, item_id: str, base_url: str = BASE_URL) -> str:
+    # Use tz_offset_minutes (correct param)
+    return (
+        f"{base_url.rstrip('/')}/api/v4/pdp/get_pc"
+        f"?item_id={item_id}&shop_id={shop_id}&tz_offset_minutes=420&detail_level=0"
+    )
+
+
+def build_listing_url(shop_id: str, offset: int, limit: int, keyword: str = "", base_url: str = BASE_URL) -> str:
+    """Daftar item toko, terbaru dulu (urutan stabil untuk crawl per halaman)."""
+    url = (
+        f"{base_url.rstrip('/')}/api/v4/shop/search_items"
+        f"?filter_sold_out=0&limit={limit}&offset={offset}&order=desc&shopid={shop_id}&sort_by=ctime&use_case=1"
+    )
+    if keyword:
+        url += f"&keyword={quote(keyword)}"
+    return url
+
+
+def parse_product_response(status_code: int, data, shop_id: str, item_id: str) -> Optional[ProductRecord]:
     """
-    Fallback: read cookies from environment variable (format: 'a=1; b=2; ...').
+    Turn an HTTP status + decoded JSON body into a ProductRecord.
+    `data` is None when the body could not be decoded.
+    Returns None when the response is unusable.
     """
-    raw = os.getenv(env_var, "")
-    cookies = {}
-    if raw:
-        for c in raw.split(";"):
-            if "=" in c:
-                k, v = c.strip().split("=", 1)
-                cookies[k] = v
-    return cookies
+    if status_code == 403:
+        logger.warning("❌ 403 Forbidden for item %s shop %s — cookies/headers likely invalid or blocked.", item_id, shop_id)
+        return None
+
+    if status_code != 200:
+        logger.warning("❌ HTTP %s for item %s shop %s", status_code, item_id, shop_id)
+        return None
+
+    if data is None:
+        return None
 
+    with metrics.time("parse"):
+        record = parse_product(data, shop_id, item_id)
 
-def log_error(msg: str):
+    # Normal path
+    if record is not None and record.error is None:
+        return record
+
+    # explicit Shopee error code handling
+    if record is not None:
+        err = data.get("error")
+        metrics.inc("api_errors_total", code=err)
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "⚠️ Item %s Shop %s returned error %s | raw_head: %s",
+                item_id, shop_id, err, json.dumps(dict(list(data.items())[:8])),
+            )
+        # return a marker so monitor can store something (optional)
+        return record
+
+    # Unknown response
     try:
-        with open(ERROR_LOG, "a", encoding="utf-8") as f:
-            f.write(msg + "\n")
+        head = json.dumps(dict(list(data.items())[:8]), indent=2)
     except Exception:
-        pass
+        head = str(data)[:400]
+    metrics.inc("api_errors_total", code="invalid")
+    logger.warning("❌ Invalid response (no data field) for %s@%s | head: %s", item_id, shop_id, head)
+    return None
 
 
-def fetch_product(shop_id: str, item_id: str, curl_file: str = CURL_FILE) -> Optional[dict]:
+class ShopeeClient:
     """
-    Fetch product detail using headers + cookies parsed from curl.txt (or env).
-    Returns a dict with name/stock/price or None if fail.
+    Long-lived Shopee API client.
+
+    Owns the connection pools (a requests.Session for blocking callers and an
+    httpx.AsyncClient for the bot's event loop) and the credential pool.
+    Captures are parsed once and only re-read when a file's mtime or an env
+    value changes; each request picks the least recently used healthy session.
     """
-    try:
-        # Use tz_offset_minutes (correct param)
-        url = (
-            "https://shopee.co.id/api/v4/pdp/get_pc"
-            f"?item_id={item_id}&shop_id={shop_id}&tz_offset_minutes=420&detail_level=0"
-        )
-
-        # Load headers + cookies from curl.txt
-        headers, cookies = load_headers_and_cookies_from_curl(curl_file)
-
-        # Minimal headers if curl.txt not present or missing keys
-        default_headers = {
-            "accept": "application/json, text/plain, */*",
-            "accept-language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7",
-            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/120.0.0.0 Safari/537.36",
-            "referer": f"https://shopee.co.id/product-i.{shop_id}.{item_id}",
-            "x-api-source": "pc",
-            "x-requested-with": "XMLHttpRequest",
-            "if-none-match-": "*",
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-        }
-        # merge - prefer values from curl.txt
-        merged_headers = {**default_headers, **headers}
-
-        # If no cookies parsed from curl.txt try env
-        if not cookies:
-            cookies = load_cookies_from_env()
-
-        # If still no cookies, leave cookies empty (requests will send none)
-        s = requests.Session()
-        s.headers.update(merged_headers)
-        if cookies:
-            s.cookies.update(cookies)
-
-        print("\n=== DEBUG: Shopee Request ===")
-        print("API URL:", url)
-        print("Headers sample:", list(merged_headers.keys())[:10])
-        print("Cookies keys:", list(s.cookies.keys()))
-        print("=============================\n")
-
-        # request
-        resp = s.get(url, timeout=15)
-        print("Response status:", resp.status_code)
-
-        if resp.status_code == 403:
-            msg = f"403 Forbidden for item {item_id} shop {shop_id} — cookies/headers likely invalid or blocked."
-            print("❌ Shopee API error: 403")
-            log_error(msg)
+
+    def __init__(
+        self,
+        curl_file: str = CURL_FILE,
+        base_url: str = BASE_URL,
+        concurrency: int = FETCH_CONCURRENCY,
+        pool: Optional[CredentialPool] = None,
+        cache: Optional[ProductCache] = None,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        self.curl_file = curl_file
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.pool = pool or CredentialPool(curl_file=curl_file)
+        # diisi tiap fetch sukses; ETag-nya dipakai untuk If-None-Match
+        self.cache = cache if cache is not None else ProductCache()
+
+        self._session: Optional["requests.Session"] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # pause semua polling kalau seluruh sesi mati
+        self.breaker = CircuitBreaker()
+
+    def acquire_credential(self) -> Optional[Credential]:
+        # probe half-open boleh memakai sesi yang sedang dikarantina
+        return self.pool.acquire(include_quarantined=self.breaker.state == self.breaker.HALF_OPEN)
+
+    async def _reserve(self, url: str):
+        """
+        Pilih sesi lalu tunggu token dari limiter-nya.
+        Kalau sesi itu dikarantina selagi antri, pindah ke sesi lain.
+        Return (credential, limiter) atau (None, None) kalau tidak ada sesi /
+        breaker terbuka.
+        """
+        probing = self.breaker.state == self.breaker.HALF_OPEN
+        for _ in range(max(1, len(self.pool.credentials))):
+            with metrics.time("credential"):
+                credential = self.acquire_credential()
+            if credential is None:
+                break
+            limiter = credential.limiters.for_url(url)
+
+            def abort(credential=credential):
+                return self.breaker.is_open() or (not probing and not credential.is_healthy())
+
+            with metrics.time("ratelimit"):
+                acquired = await limiter.acquire(abort)
+            if acquired:
+                return credential, limiter
+            if self.breaker.is_open():
+                break
+
+        if probing:
+            # probe tidak jadi dikirim, biarkan request berikutnya mencoba lagi
+            self.breaker.record(FAILED)
+        return None, None
+
+    # --- pools -------------------------------------------------------------
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            # requests cuma untuk caller blocking; jangan bebani start bot
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Keep-alive client sized for the worker pool: one pooled connection per worker.
+        httpx pools are bound to the event loop that created them, so a new
+        one is made if we're running under a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self._async_client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            self._async_loop = loop
+            # caps in-flight requests across all callers (poller, /add, batches)
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._async_client
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+            self._slots = None
+
+    # --- fetch -------------------------------------------------------------
+
+    def fetch(self, shop_id: str, item_id: str) -> Optional[ProductRecord]:
+        """
+        Blocking fetch over the shared requests.Session.
+        Don't call this from the bot's event loop, use fetch_async there.
+        """
+        with metrics.time("credential"):
+            credential = self.acquire_credential()
+        if credential is None:
+            logger.error("❌ Semua sesi Shopee sedang dikarantina")
             return None
+        try:
+            url = build_product_url(shop_id, item_id, self.base_url)
+            session = self.session
+            # cookie dikirim per request lewat header, jar session jangan ikut campur
+            session.cookies.clear()
 
-        if resp.status_code != 200:
-            msg = f"HTTP {resp.status_code} for item {item_id} shop {shop_id}"
-            print("❌ Shopee API error:", resp.status_code)
-            log_error(msg)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Shopee request %s | session %s | headers %s | cookies %s",
+                    url, os.path.basename(credential.name),
+                    list(credential.headers.keys())[:10], list(credential.cookies.keys()),
+                )
+
+            with metrics.time("http"):
+                resp = session.get(url, headers=credential.request_headers(shop_id, item_id), timeout=self.timeout)
+            metrics.inc("http_responses_total", status=resp.status_code)
+            logger.debug("Response status: %s", resp.status_code)
+
+            data = self._decode(resp)
+            if resp.status_code == 200 and data is None:
+                return None
+
+            self.pool.report(credential, classify_response(resp.status_code, data))
+            return parse_product_response(resp.status_code, data, shop_id, item_id)
+
+        except Exception as e:
+            metrics.inc("fetch_errors_total", kind=type(e).__name__)
+            logger.warning("❌ fetch_product error %s@%s: %r", item_id, shop_id, e)
+            return None
+
+    async def fetch_async(self, shop_id: str, item_id: str) -> Optional[ProductRecord]:
+        """
+        Non-blocking fetch over the pooled keep-alive httpx client.
+        Goes through the circuit breaker and the per-host rate limiter;
+        returns None straight away while the breaker is open.
+        """
+        if not self.breaker.allow():
+            return None
+
+        url = build_product_url(shop_id, item_id, self.base_url)
+        http = self.async_client
+        credential, limiter = await self._reserve(url)
+        if credential is None:
+            return None
+
+        key = (str(shop_id), str(item_id))
+        headers = credential.request_headers(shop_id, item_id)
+        etag = self.cache.etag(key)
+        if etag:
+            headers["if-none-match"] = etag
+
+        outcome = FAILED
+        try:
+            async with self._slots:
+                with metrics.time("http"):
+                    resp = await http.get(url, headers=headers)
+            metrics.inc("http_responses_total", status=resp.status_code)
+
+            if resp.status_code == 304:
+                cached = self.cache.revalidated(key)
+                if cached is not None:
+                    outcome = OK
+                    return cached
+                # entry dibuang (LRU) sejak ETag dikirim: ambil ulang tanpa If-None-Match
+                metrics.inc("cache_revalidation_misses_total")
+                headers.pop("if-none-match", None)
+                with metrics.time("ratelimit"):
+                    if not await limiter.acquire(self.breaker.is_open):
+                        return None
+                async with self._slots:
+                    with metrics.time("http"):
+                        resp = await http.get(url, headers=headers)
+                metrics.inc("http_responses_total", status=resp.status_code)
+
+            data = self._decode(resp)
+            if resp.status_code == 200 and data is None:
+                return None
+
+            outcome = classify_response(resp.status_code, data)
+            result = parse_product_response(resp.status_code, data, shop_id, item_id)
+            if outcome == OK and result is not None:
+                self.cache.put(key, result, resp.headers.get("etag"))
+            return result
+
+        except Exception as e:
+            metrics.inc("fetch_errors_total", kind=type(e).__name__)
+            logger.warning("❌ fetch_product_async error %s@%s: %r", item_id, shop_id, e)
+            return None
+
+        finally:
+            self.record_outcome(credential, limiter, outcome)
+
+    async def fetch_listing(
+        self, shop_id: str, offset: int, limit: int, keyword: str = ""
+    ) -> Optional[ListingPage]:
+        """
+        Satu halaman daftar item toko (lihat src/catalog.py). Lewat breaker,
+        sesi & rate limiter yang sama dengan fetch produk; tanpa cache/ETag.
+        """
+        if not self.breaker.allow():
+            return None
+
+        url = build_listing_url(shop_id, offset, limit, keyword, self.base_url)
+        http = self.async_client
+        credential, limiter = await self._reserve(url)
+        if credential is None:
             return None
 
+        outcome = FAILED
         try:
-            data = resp.json()
+            headers = credential.request_headers(shop_id, "")
+            headers["referer"] = f"{self.base_url.rstrip('/')}/shop/{shop_id}"
+            async with self._slots:
+                with metrics.time("http"):
+                    resp = await http.get(url, headers=headers)
+            metrics.inc("http_responses_total", status=resp.status_code)
+
+            data = self._decode(resp)
+            outcome = classify_response(resp.status_code, data)
+            if data is None:
+                if resp.status_code != 200:
+                    logger.warning("❌ HTTP %s daftar item toko %s", resp.status_code, shop_id)
+                return None
+            with metrics.time("parse"):
+                page = parse_listing(data, limit)
+            if page is None:
+                metrics.inc("api_errors_total", code=data.get("error", "invalid"))
+                logger.warning("⚠️ Daftar item toko %s offset %s: error %s", shop_id, offset, data.get("error"))
+                return None
+            if outcome == FAILED:
+                # items di root, bukan di "data": tetap sukses
+                outcome = OK
+            return page
+
         except Exception as e:
-            print("❌ Failed to decode JSON:", e)
-            log_error(f"JSON decode error: {e} | resp_text_snippet: {resp.text[:300]}")
+            metrics.inc("fetch_errors_total", kind=type(e).__name__)
+            logger.warning("❌ fetch_listing error shop %s offset %s: %r", shop_id, offset, e)
             return None
 
-        # Normal path
-        if isinstance(data, dict) and "data" in data and data["data"]:
-            pdata = data["data"]
-            return {
-                "name": pdata.get("name", "Unknown"),
-                "stock": pdata.get("stock", "N/A"),
-                "price": pdata.get("price", "N/A"),
-            }
-
-        # explicit Shopee error code handling
-        if isinstance(data, dict) and "error" in data:
-            err = data.get("error")
-            print(f"⚠️ Shopee returned error code: {err}")
-            log_error(f"Item {item_id} Shop {shop_id} returned error {err} | raw_head: {json.dumps(dict(list(data.items())[:8]))}")
-            # return a marker so monitor can store something (optional)
-            return {
-                "name": f"ErrorCode-{err}",
-                "stock": "N/A",
-                "price": "N/A",
-            }
-
-        # Unknown response
-        print("❌ Invalid response (no data field). JSON head:")
+        finally:
+            self.record_outcome(credential, limiter, outcome)
+
+    @staticmethod
+    def _decode(resp):
+        """JSON body dari response 200; None kalau bukan 200 atau rusak."""
+        if resp.status_code != 200:
+            return None
         try:
-            head = json.dumps(dict(list(data.items())[:8]), indent=2)
-        except Exception:
-            head = str(data)[:400]
-        print(head)
-        log_error(f"Invalid response for {item_id}@{shop_id} | head: {head}")
-        return None
+            with metrics.time("decode"):
+                return resp.json()
+        except Exception as e:
+            metrics.inc("fetch_errors_total", kind="json")
+            logger.warning("❌ JSON decode error: %s | resp_text_snippet: %s", e, resp.text[:300])
+            return None
 
-    except Exception as e:
-        print("❌ fetch_product error:", e)
-        log_error(f"Exception fetch_product: {e}")
-        return None
+    def record_outcome(self, credential: Credential, limiter, outcome: Optional[str]):
+        if outcome is None:
+            return
+        if outcome == BLOCKED:
+            limiter.on_block()
+        elif outcome != FAILED:
+            limiter.on_success()
+        self.pool.report(credential, outcome)
+        if outcome == BLOCKED and self.breaker.state == self.breaker.CLOSED:
+            if self.pool.healthy_count():
+                # masih ada sesi sehat: satu sesi diblok belum berarti set cookie mati
+                outcome = FAILED
+            else:
+                # semua sesi dikarantina: langsung pause
+                self.breaker.trip_soon()
+        self.breaker.record(outcome)
+
+    def status(self) -> dict:
+        return {"breaker": self.breaker.status(), "credentials": self.pool.status(), "cache": self.cache.stats()}
+
+    async def fetch_many(
+        self, pairs: Iterable[Tuple[str, str]], concurrency: Optional[int] = None
+    ) -> Dict[Tuple[str, str], Optional[ProductRecord]]:
+        """
+        Fetch many (shop_id, item_id) pairs concurrently.
+
+        A fixed pool of `concurrency` workers pulls from the (deduplicated)
+        pairs, so at most `concurrency` requests are in flight and memory
+        doesn't grow with the size of the watchlist.
+        Returns {(shop_id, item_id): ProductRecord or None}.
+        """
+        unique: List[Tuple[str, str]] = list(dict.fromkeys((str(s), str(i)) for s, i in pairs))
+        results: Dict[Tuple[str, str], Optional[ProductRecord]] = {}
+        if not unique:
+            return results
+
+        pending = iter(unique)
+
+        async def worker():
+            for shop_id, item_id in pending:
+                results[(shop_id, item_id)] = await self.fetch_async(shop_id, item_id)
+
+        workers = max(1, min(concurrency or self.concurrency, self.concurrency, len(unique)))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def fetch_batch(
+        self, pairs: List[Tuple[str, str]], batch_url: str = SHOPEE_BATCH_URL
+    ) -> Dict[Tuple[str, str], Optional[ProductRecord]]:
+        """
+        Fetch several items in one request from a multi-item endpoint.
+
+        POSTs {"shop_item_ids": [{"shopid": .., "itemid": ..}, ...]} to
+        `batch_url` and expects the items back under "data" (either a list or
+        {"items": [...]}), each carrying shopid/itemid. Items missing from the
+        answer come back as None.
+        """
+        results: Dict[Tuple[str, str], Optional[ProductRecord]] = {key: None for key in pairs}
+        if not pairs or not self.breaker.allow():
+            return results
+
+        http = self.async_client
+        credential, limiter = await self._reserve(batch_url)
+        if credential is None:
+            return results
+
+        outcome = FAILED
+        try:
+            headers = credential.request_headers(*pairs[0])
+            body = {"shop_item_ids": [{"shopid": int(s), "itemid": int(i)} for s, i in pairs]}
+            async with self._slots:
+                with metrics.time("http"):
+                    resp = await http.post(batch_url, json=body, headers=headers)
+            metrics.inc("http_responses_total", status=resp.status_code)
+
+            data = self._decode(resp)
+            if resp.status_code == 200 and data is None:
+                return results
+
+            outcome = classify_response(resp.status_code, data)
+            label = f"{len(pairs)} items"
+            if resp.status_code != 200 or not isinstance(data, dict) or not data.get("data"):
+                # 403 / error code / kosong: log sekali untuk seluruh batch
+                marker = parse_product_response(resp.status_code, data, label, "batch")
+                if marker is not None:
+                    results = {key: marker for key in pairs}
+                return results
+
+            with metrics.time("parse"):
+                records = parse_batch(data)
+            for record in records:
+                key = (record.shop_id, record.item_id)
+                if key in results:
+                    results[key] = record
+                    self.cache.put(key, record)
+            return results
+
+        except Exception as e:
+            metrics.inc("fetch_errors_total", kind=type(e).__name__)
+            logger.warning("❌ fetch_batch error (%d items): %r", len(pairs), e)
+            return results
+
+        finally:
+            self.record_outcome(credential, limiter, outcome)
+
+
+_clients: Dict[Tuple[str, str], ShopeeClient] = {}
+
+
+def get_client(curl_file: str = CURL_FILE, base_url: str = BASE_URL) -> ShopeeClient:
+    """Shared ShopeeClient per (curl_file, base_url)."""
+    key = (curl_file, base_url)
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = ShopeeClient(curl_file=curl_file, base_url=base_url)
+    return client
+
+
+def is_error_marker(record: Optional[ProductRecord]) -> bool:
+    """True for the ErrorCode-<n> placeholder returned when Shopee answers with an error code."""
+    return record is not None and record.error is not None
+
+
+def fetch_product(shop_id: str, item_id: str, curl_file: str = CURL_FILE) -> Optional[dict]:
+    """
+    Fetch product detail using headers + cookies parsed from curl.txt (or env).
+    Returns a dict with name/stock/price (plus status and per-model
+    "products") or None if fail.
+    """
+    record = get_client(curl_file).fetch(shop_id, item_id)
+    return record.as_dict() if record is not None else None
+
+
+async def fetch_product_async(
+    shop_id: str,
+    item_id: str,
+    client: Optional[ShopeeClient] = None,
+    curl_file: str = CURL_FILE,
+    base_url: str = BASE_URL,
+) -> Optional[ProductRecord]:
+    """
+    Non-blocking version of fetch_product, returning the ProductRecord. Safe to await from telegram handlers.
+    """
+    client = client or get_client(curl_file, base_url)
+    return await client.fetch_async(str(shop_id), str(item_id))
+
+
+async def fetch_products_async(
+    pairs: Iterable[Tuple[str, str]],
+    concurrency: int = FETCH_CONCURRENCY,
+    client: Optional[ShopeeClient] = None,
+    curl_file: str = CURL_FILE,
+    base_url: str = BASE_URL,
+) -> Dict[Tuple[str, str], Optional[ProductRecord]]:
+    """
+    Fetch many (shop_id, item_id) pairs with at most `concurrency` in flight.
+    See ShopeeClient.fetch_many.
+    """
+    client = client or get_client(curl_file, base_url)
+    return await client.fetch_many(pairs, concurrency)
@@ -0,0 +1,753 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config.setting import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+Snapshot = Tuple[tuple, ...]  # ((model_id, stock, price), ...) lihat src/diff.py
+
+TARGET_CHANGES_KEEP = 3600.0  # detik; worker yang tertinggal lebih lama memuat ulang semua target
+KEY_CHUNK = 400  # (shop_id, item_id) per query; 2 parameter per key, batas lama SQLite 999
+
+LEGACY_JSON_FILES = [
+    os.path.join(os.path.dirname(__file__), "..", "data", "products.json"),
+    os.path.join(os.path.dirname(__file__), "..", "data", "product.json"),
+]
+
+
+class Storage:
+    """
+    Interface penyimpanan produk & langganan untuk ProductMonitor.
+    Implementasi: MemoryStorage (tidak persisten) dan SQLiteStorage.
+    """
+
+    def load_products(self) -> List[dict]:
+        return []
+
+    def load_subscriptions(self) -> List[Tuple[int, str, str, int]]:
+        """List (chat_id, shop_id, item_id, urgency) sesuai urutan penambahan."""
+        return []
+
+    def iter_products(self) -> Iterator[Tuple[dict, Optional[Snapshot]]]:
+        """(produk, snapshot variasinya atau None) satu per satu, untuk muat bertahap."""
+        snapshots = self.load_snapshots()
+        for product in self.load_products():
+            yield product, snapshots.get((product["shop_id"], product["item_id"]))
+
+    def iter_subscriptions(self) -> Iterator[Tuple[int, str, str, int]]:
+        return iter(self.load_subscriptions())
+
+    def save_product(self, product: dict):
+        pass
+
+    def delete_product(self, key: ProductKey):
+        pass
+
+    def add_subscription(self, chat_id: Optional[int], key: ProductKey):
+        pass
+
+    def add_subscriptions(self, chat_id: Optional[int], keys: Iterable[ProductKey]):
+        """Banyak langganan satu chat sekaligus (/import)."""
+        for key in keys:
+            self.add_subscription(chat_id, key)
+
+    def remove_subscription(self, chat_id: Optional[int], key: ProductKey):
+        pass
+
+    def set_urgency(self, chat_id: Optional[int], key: ProductKey, urgency: int):
+        pass
+
+    def load_rules(self) -> Iterator[Tuple[int, str, str, dict]]:
+        """(chat_id, shop_id, item_id, aturan /rule) untuk langganan yang punya aturan."""
+        return iter(())
+
+    def set_rule(self, chat_id: Optional[int], key: ProductKey, rule: Optional[dict]):
+        pass
+
+    def load_snapshots(self, keys: Optional[Iterable[ProductKey]] = None) -> Dict[ProductKey, Snapshot]:
+        """Snapshot variasi terakhir tiap produk / `keys` (baseline deteksi perubahan)."""
+        return {}
+
+    def save_snapshots(self, snapshots: Dict[ProductKey, Snapshot]):
+        pass
+
+    def save_statuses(self, products: Iterable[dict], snapshots: Optional[Dict[ProductKey, Snapshot]] = None):
+        """Upsert hasil poll banyak produk (dan snapshot variasinya) sekaligus."""
+        pass
+
+    def get_short_links(self, links: Iterable[str]) -> Dict[str, ProductKey]:
+        """Hasil resolve link pendek yang sudah tersimpan (lihat src/resolver.py)."""
+        return {}
+
+    def save_short_links(self, resolved: Dict[str, ProductKey]):
+        pass
+
+    def add_outbox(self, rows: List[Tuple[int, str, float]]) -> List[Optional[int]]:
+        """Simpan notifikasi (chat_id, text, created_at) yang belum terkirim; return id-nya."""
+        return [None] * len(rows)
+
+    def load_outbox(self) -> List[Tuple[int, int, str, float, int]]:
+        """(id, chat_id, text, created_at, attempts) sesuai urutan masuk."""
+        return []
+
+    def delete_outbox(self, ids: Iterable[Optional[int]]):
+        pass
+
+    def bump_outbox_attempts(self, ids: Iterable[Optional[int]]):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(Storage):
+    """Tanpa persistensi — semua state hilang saat restart."""
+
+
+class SQLiteStorage(Storage):
+    """
+    SQLite dalam mode WAL.
+
+    Tulis satu produk/langganan = satu statement kecil (bukan rewrite seluruh
+    file seperti JSON), dan hasil poll satu cycle di-upsert dalam satu transaksi.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS products (
+        shop_id    TEXT NOT NULL,
+        item_id    TEXT NOT NULL,
+        name       TEXT,
+        url        TEXT,
+        stock,
+        price,
+        available  INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL,
+        PRIMARY KEY (shop_id, item_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_products_item ON products (item_id);
+
+    CREATE TABLE IF NOT EXISTS subscriptions (
+        chat_id    INTEGER,
+        shop_id    TEXT NOT NULL,
+        item_id    TEXT NOT NULL,
+        created_at REAL,
+        urgency    INTEGER NOT NULL DEFAULT 1,
+        rule       TEXT,
+        PRIMARY KEY (chat_id, shop_id, item_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_subscriptions_item ON subscriptions (shop_id, item_id);
+    CREATE INDEX IF NOT EXISTS idx_subscriptions_created ON subscriptions (created_at);
+
+    CREATE TABLE IF NOT EXISTS variants (
+        shop_id  TEXT NOT NULL,
+        item_id  TEXT NOT NULL,
+        model_id INTEGER,
+        stock    INTEGER,
+        price    INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_variants_item ON variants (shop_id, item_id);
+
+    CREATE TABLE IF NOT EXISTS outbox (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id    INTEGER,
+        text       TEXT NOT NULL,
+        created_at REAL,
+        attempts   INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS workers (
+        worker_id  TEXT PRIMARY KEY,
+        pid        INTEGER,
+        started_at REAL,
+        heartbeat  REAL
+    );
+
+    CREATE TABLE IF NOT EXISTS results (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        shop_id   TEXT NOT NULL,
+        item_id   TEXT NOT NULL,
+        payload   TEXT NOT NULL,
+        polled_at REAL
+    );
+
+    -- target poll yang berubah (produk masuk/keluar, langganan, urgensi), diisi
+    -- trigger; worker cluster membaca dari id terakhirnya (ShardView.refresh)
+    CREATE TABLE IF NOT EXISTS target_changes (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        shop_id    TEXT NOT NULL,
+        item_id    TEXT NOT NULL,
+        changed_at REAL
+    );
+    CREATE TRIGGER IF NOT EXISTS trg_products_insert AFTER INSERT ON products BEGIN
+        INSERT INTO target_changes (shop_id, item_id, changed_at)
+        VALUES (NEW.shop_id, NEW.item_id, (julianday('now') - 2440587.5) * 86400.0);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_products_delete AFTER DELETE ON products BEGIN
+        INSERT INTO target_changes (shop_id, item_id, changed_at)
+        VALUES (OLD.shop_id, OLD.item_id, (julianday('now') - 2440587.5) * 86400.0);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_subscriptions_insert AFTER INSERT ON subscriptions BEGIN
+        INSERT INTO target_changes (shop_id, item_id, changed_at)
+        VALUES (NEW.shop_id, NEW.item_id, (julianday('now') - 2440587.5) * 86400.0);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_subscriptions_delete AFTER DELETE ON subscriptions BEGIN
+        INSERT INTO target_changes (shop_id, item_id, changed_at)
+        VALUES (OLD.shop_id, OLD.item_id, (julianday('now') - 2440587.5) * 86400.0);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_subscriptions_urgency AFTER UPDATE OF urgency ON subscriptions BEGIN
+        INSERT INTO target_changes (shop_id, item_id, changed_at)
+        VALUES (NEW.shop_id, NEW.item_id, (julianday('now') - 2440587.5) * 86400.0);
+    END;
+
+    CREATE TABLE IF NOT EXISTS short_links (
+        link        TEXT PRIMARY KEY,
+        shop_id     TEXT NOT NULL,
+        item_id     TEXT NOT NULL,
+        resolved_at REAL
+    ) WITHOUT ROWID;
+
+    -- pantauan toko / kata kunci di toko (src/catalog.py): satu feed dipakai
+    -- bersama semua chat yang memantaunya, seperti products x subscriptions
+    CREATE TABLE IF NOT EXISTS shop_feeds (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        shop_id    TEXT NOT NULL,
+        keyword    TEXT NOT NULL DEFAULT '',
+        created_at REAL,
+        sweep_page INTEGER NOT NULL DEFAULT 0,
+        baseline   INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (shop_id, keyword)
+    );
+
+    CREATE TABLE IF NOT EXISTS shop_watches (
+        chat_id    INTEGER,
+        feed_id    INTEGER NOT NULL,
+        created_at REAL,
+        PRIMARY KEY (chat_id, feed_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS feed_pages (
+        feed_id    INTEGER NOT NULL,
+        page       INTEGER NOT NULL,
+        checksum   INTEGER NOT NULL,
+        crawled_at REAL,
+        PRIMARY KEY (feed_id, page)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS feed_items (
+        feed_id INTEGER NOT NULL,
+        item_id TEXT NOT NULL,
+        stock   INTEGER,
+        price   INTEGER,
+        PRIMARY KEY (feed_id, item_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # autocommit; transaksi dibuka eksplisit untuk batch
+        self.conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=OFF")
+        self.conn.executescript(self.SCHEMA)
+        self._migrate()
+        # log untuk worker cluster; tanpa worker tidak ada yang membuangnya
+        self.trim_target_changes(time.time() - TARGET_CHANGES_KEEP)
+
+    def _migrate(self):
+        """Tambah kolom baru ke database lama (CREATE IF NOT EXISTS tidak mengubah tabel)."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(subscriptions)")}
+        if "urgency" not in columns:
+            self.conn.execute("ALTER TABLE subscriptions ADD COLUMN urgency INTEGER NOT NULL DEFAULT 1")
+        if "rule" not in columns:
+            self.conn.execute("ALTER TABLE subscriptions ADD COLUMN rule TEXT")
+
+    @staticmethod
+    def _product_dict(row: tuple) -> dict:
+        shop_id, item_id, name, url, stock, price, available = row
+        return {
+            "name": name,
+            "stock": stock,
+            "price": price,
+            "item_id": item_id,
+            "shop_id": shop_id,
+            "url": url,
+            "last_status": {"available": bool(available), "stock": stock, "price": price},
+        }
+
+    def load_products(self) -> List[dict]:
+        rows = self.conn.execute(
+            "SELECT shop_id, item_id, name, url, stock, price, available FROM products"
+        ).fetchall()
+        return [self._product_dict(row) for row in rows]
+
+    def iter_products(self) -> Iterator[Tuple[dict, Optional[Snapshot]]]:
+        """
+        Merge join products x variants, keduanya urut (shop_id, item_id) lewat
+        index: cursor dibaca sambil jalan, tidak ada list/dict sebesar tabel.
+        """
+        products = self.conn.execute(
+            "SELECT shop_id, item_id, name, url, stock, price, available FROM products ORDER BY shop_id, item_id"
+        )
+        variants = self.conn.execute(
+            "SELECT shop_id, item_id, model_id, stock, price FROM variants ORDER BY shop_id, item_id, rowid"
+        )
+        variant = next(variants, None)
+        for row in products:
+            key = (row[0], row[1])
+            # variasi yatim (produknya sudah dihapus) dilewati
+            while variant is not None and (variant[0], variant[1]) < key:
+                variant = next(variants, None)
+            snapshot = []
+            while variant is not None and variant[0] == key[0] and variant[1] == key[1]:
+                snapshot.append(variant[2:])
+                variant = next(variants, None)
+            yield self._product_dict(row), tuple(snapshot) or None
+
+    def load_subscriptions(self) -> List[Tuple[int, str, str, int]]:
+        return self.conn.execute(
+            "SELECT chat_id, shop_id, item_id, urgency FROM subscriptions ORDER BY created_at, rowid"
+        ).fetchall()
+
+    def iter_subscriptions(self) -> Iterator[Tuple[int, str, str, int]]:
+        return self.conn.execute(
+            "SELECT chat_id, shop_id, item_id, urgency FROM subscriptions ORDER BY created_at, rowid"
+        )
+
+    @staticmethod
+    def _product_row(product: dict) -> tuple:
+        status = product.get("last_status") or {}
+        return (
+            product["shop_id"],
+            product["item_id"],
+            product.get("name"),
+            product.get("url"),
+            product.get("stock"),
+            product.get("price"),
+            int(bool(status.get("available"))),
+            time.time(),
+        )
+
+    _UPSERT = """
+        INSERT INTO products (shop_id, item_id, name, url, stock, price, available, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (shop_id, item_id) DO UPDATE SET
+            name = excluded.name,
+            url = COALESCE(excluded.url, products.url),
+            stock = excluded.stock,
+            price = excluded.price,
+            available = excluded.available,
+            updated_at = excluded.updated_at
+    """
+
+    def save_product(self, product: dict):
+        self.conn.execute(self._UPSERT, self._product_row(product))
+
+    def delete_product(self, key: ProductKey):
+        with self.transaction():
+            self.conn.execute("DELETE FROM products WHERE shop_id = ? AND item_id = ?", key)
+            self.conn.execute("DELETE FROM variants WHERE shop_id = ? AND item_id = ?", key)
+
+    def add_subscription(self, chat_id: Optional[int], key: ProductKey):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO subscriptions (chat_id, shop_id, item_id, created_at) VALUES (?, ?, ?, ?)",
+            (chat_id, key[0], key[1], time.time()),
+        )
+
+    def add_subscriptions(self, chat_id: Optional[int], keys: Iterable[ProductKey]):
+        now = time.time()
+        rows = [(chat_id, key[0], key[1], now) for key in keys]
+        if rows:
+            with self.transaction():
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO subscriptions (chat_id, shop_id, item_id, created_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+
+    def remove_subscription(self, chat_id: Optional[int], key: ProductKey):
+        self.conn.execute(
+            "DELETE FROM subscriptions WHERE chat_id IS ? AND shop_id = ? AND item_id = ?",
+            (chat_id, key[0], key[1]),
+        )
+
+    def load_snapshots(self, keys: Optional[Iterable[ProductKey]] = None) -> Dict[ProductKey, Snapshot]:
+        """Snapshot semua produk, atau hanya `keys`."""
+        variants: Dict[ProductKey, list] = {}
+        sql = "SELECT shop_id, item_id, model_id, stock, price FROM variants"
+        for rows in self._select_keys(sql, keys, "ORDER BY rowid"):
+            for shop_id, item_id, model_id, stock, price in rows:
+                variants.setdefault((shop_id, item_id), []).append((model_id, stock, price))
+        return {key: tuple(v) for key, v in variants.items()}
+
+    def _select_keys(self, sql: str, keys: Optional[Iterable[ProductKey]], suffix: str = "", alias: str = ""):
+        """
+        Jalankan `sql` untuk semua baris (keys None) atau per potongan `keys`
+        lewat WHERE (shop_id, item_id) IN (VALUES ...). Yield cursor per potongan.
+        """
+        if keys is None:
+            yield self.conn.execute(f"{sql} {suffix}")
+            return
+        keys = list(keys)
+        column = f"({alias}shop_id, {alias}item_id)"
+        for start in range(0, len(keys), KEY_CHUNK):
+            chunk = keys[start:start + KEY_CHUNK]
+            values = ", ".join("(?, ?)" for _ in chunk)
+            params = [part for key in chunk for part in key]
+            yield self.conn.execute(f"{sql} WHERE {column} IN (VALUES {values}) {suffix}", params)
+
+    def _write_snapshots(self, snapshots: Dict[ProductKey, Snapshot]):
+        self.conn.executemany("DELETE FROM variants WHERE shop_id = ? AND item_id = ?", list(snapshots))
+        self.conn.executemany(
+            "INSERT INTO variants (shop_id, item_id, model_id, stock, price) VALUES (?, ?, ?, ?, ?)",
+            [(key[0], key[1]) + variant for key, snapshot in snapshots.items() for variant in snapshot],
+        )
+
+    def save_snapshots(self, snapshots: Dict[ProductKey, Snapshot]):
+        if snapshots:
+            with self.transaction():
+                self._write_snapshots(snapshots)
+
+    def set_urgency(self, chat_id: Optional[int], key: ProductKey, urgency: int):
+        self.conn.execute(
+            "UPDATE subscriptions SET urgency = ? WHERE chat_id IS ? AND shop_id = ? AND item_id = ?",
+            (urgency, chat_id, key[0], key[1]),
+        )
+
+    def load_rules(self) -> Iterator[Tuple[int, str, str, dict]]:
+        rows = self.conn.execute(
+            "SELECT chat_id, shop_id, item_id, rule FROM subscriptions WHERE rule IS NOT NULL"
+        )
+        for chat_id, shop_id, item_id, rule in rows:
+            yield chat_id, shop_id, item_id, json.loads(rule)
+
+    def set_rule(self, chat_id: Optional[int], key: ProductKey, rule: Optional[dict]):
+        self.conn.execute(
+            "UPDATE subscriptions SET rule = ? WHERE chat_id IS ? AND shop_id = ? AND item_id = ?",
+            (json.dumps(rule) if rule else None, chat_id, key[0], key[1]),
+        )
+
+    def save_statuses(self, products: Iterable[dict], snapshots: Optional[Dict[ProductKey, Snapshot]] = None):
+        rows = [self._product_row(p) for p in products]
+        if not rows and not snapshots:
+            return
+        with self.transaction():
+            self.conn.executemany(self._UPSERT, rows)
+            if snapshots:
+                self._write_snapshots(snapshots)
+
+    def get_short_links(self, links: Iterable[str]) -> Dict[str, ProductKey]:
+        links = list(links)
+        found = {}
+        # batas jumlah parameter SQLite (999 di versi lama)
+        for start in range(0, len(links), 500):
+            part = links[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT link, shop_id, item_id FROM short_links WHERE link IN ({','.join('?' * len(part))})", part
+            )
+            found.update((link, (shop_id, item_id)) for link, shop_id, item_id in rows)
+        return found
+
+    def save_short_links(self, resolved: Dict[str, ProductKey]):
+        if resolved:
+            now = time.time()
+            with self.transaction():
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO short_links (link, shop_id, item_id, resolved_at) VALUES (?, ?, ?, ?)",
+                    [(link, key[0], key[1], now) for link, key in resolved.items()],
+                )
+
+    def add_outbox(self, rows: List[Tuple[int, str, float]]) -> List[Optional[int]]:
+        insert = "INSERT INTO outbox (chat_id, text, created_at) VALUES (?, ?, ?)"
+        with self.transaction():
+            return [self.conn.execute(insert, row).lastrowid for row in rows]
+
+    def load_outbox(self) -> List[Tuple[int, int, str, float, int]]:
+        return self.conn.execute("SELECT id, chat_id, text, created_at, attempts FROM outbox ORDER BY id").fetchall()
+
+    def _execute_ids(self, sql: str, ids: Iterable[Optional[int]]):
+        rows = [(i,) for i in ids if i is not None]
+        if rows:
+            with self.transaction():
+                self.conn.executemany(sql, rows)
+
+    def delete_outbox(self, ids: Iterable[Optional[int]]):
+        self._execute_ids("DELETE FROM outbox WHERE id = ?", ids)
+
+    def bump_outbox_attempts(self, ids: Iterable[Optional[int]]):
+        self._execute_ids("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", ids)
+
+    # --- mode cluster (src/cluster.py): worker poller & antrian hasil ---
+
+    def heartbeat(self, worker_id: str, pid: int, started_at: float):
+        self.conn.execute(
+            "INSERT INTO workers (worker_id, pid, started_at, heartbeat) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (worker_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (worker_id, pid, started_at, time.time()),
+        )
+
+    def leave(self, worker_id: str):
+        self.conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def live_workers(self, timeout: float) -> List[str]:
+        rows = self.conn.execute(
+            "SELECT worker_id FROM workers WHERE heartbeat >= ? ORDER BY worker_id", (time.time() - timeout,)
+        )
+        return [r[0] for r in rows]
+
+    def load_poll_targets(self, keys: Optional[Iterable[ProductKey]] = None) -> List[Tuple[str, str, int, int, int]]:
+        """(shop_id, item_id, available, jumlah pelanggan, urgensi tertinggi) semua produk, atau hanya `keys`."""
+        sql = """
+            SELECT p.shop_id, p.item_id, p.available, COUNT(s.chat_id), COALESCE(MAX(s.urgency), 1)
+            FROM products p
+            LEFT JOIN subscriptions s ON s.shop_id = p.shop_id AND s.item_id = p.item_id
+        """
+        return [row for rows in self._select_keys(sql, keys, "GROUP BY p.shop_id, p.item_id", "p.") for row in rows]
+
+    def target_changes(self, after_id: int) -> Tuple[int, Set[ProductKey], bool]:
+        """
+        Produk yang target poll-nya berubah sejak `after_id`:
+        (id terakhir, keys, lengkap?). lengkap=False kalau log sampai id
+        sesudah `after_id` sudah dibuang (trim_target_changes) -> caller harus
+        muat ulang semuanya.
+        """
+        trimmed = int(self.get_meta("target_changes_trimmed") or 0)
+        rows = self.conn.execute(
+            "SELECT id, shop_id, item_id FROM target_changes WHERE id > ? ORDER BY id", (after_id,)
+        ).fetchall()
+        last = rows[-1][0] if rows else after_id
+        return last, {(shop_id, item_id) for _, shop_id, item_id in rows}, after_id >= trimmed
+
+    def last_target_change(self) -> int:
+        last = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM target_changes").fetchone()[0]
+        return max(last, int(self.get_meta("target_changes_trimmed") or 0))
+
+    def trim_target_changes(self, before: float):
+        """
+        Buang log perubahan sampai entry terakhir yang lebih tua dari `before`;
+        id tertinggi yang dibuang dicatat di meta `target_changes_trimmed`.
+        """
+        with self.transaction():
+            upto = self.conn.execute(
+                "SELECT MAX(id) FROM target_changes WHERE changed_at < ?", (before,)
+            ).fetchone()[0]
+            if upto is None:
+                return
+            self.conn.execute("DELETE FROM target_changes WHERE id <= ?", (upto,))
+            if upto > int(self.get_meta("target_changes_trimmed") or 0):
+                self.set_meta("target_changes_trimmed", str(upto))
+
+    def push_results(self, rows: List[Tuple[str, str, str, float]]):
+        """(shop_id, item_id, payload JSON, polled_at) dari worker ke front-end."""
+        if rows:
+            with self.transaction():
+                self.conn.executemany(
+                    "INSERT INTO results (shop_id, item_id, payload, polled_at) VALUES (?, ?, ?, ?)", rows
+                )
+
+    def fetch_results(self, after_id: int, limit: int = 1000) -> List[Tuple[int, str, str, str, float]]:
+        return self.conn.execute(
+            "SELECT id, shop_id, item_id, payload, polled_at FROM results WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+
+    def ack_results(self, upto_id: int):
+        self.conn.execute("DELETE FROM results WHERE id <= ?", (upto_id,))
+
+    # --- pantauan toko (src/catalog.py) ---
+
+    _FEED_COLUMNS = "f.id, f.shop_id, f.keyword, f.created_at, f.sweep_page, f.baseline"
+
+    @staticmethod
+    def _feed_dict(row: tuple) -> dict:
+        feed_id, shop_id, keyword, created_at, sweep_page, baseline = row[:6]
+        return {
+            "id": feed_id, "shop_id": shop_id, "keyword": keyword, "created_at": created_at,
+            "sweep_page": sweep_page, "baseline": bool(baseline),
+        }
+
+    def add_shop_watch(self, chat_id: Optional[int], shop_id: str, keyword: str = "") -> Tuple[int, bool]:
+        """Return (feed_id, True kalau chat ini baru mulai memantau)."""
+        now = time.time()
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR IGNORE INTO shop_feeds (shop_id, keyword, created_at) VALUES (?, ?, ?)",
+                (shop_id, keyword, now),
+            )
+            feed_id = self.conn.execute(
+                "SELECT id FROM shop_feeds WHERE shop_id = ? AND keyword = ?", (shop_id, keyword)
+            ).fetchone()[0]
+            added = self.conn.execute(
+                "INSERT OR IGNORE INTO shop_watches (chat_id, feed_id, created_at) VALUES (?, ?, ?)",
+                (chat_id, feed_id, now),
+            ).rowcount
+        return feed_id, bool(added)
+
+    def remove_shop_watch(self, chat_id: Optional[int], feed_id: int):
+        """Hapus pantauan; feed & state crawl-nya ikut dibuang kalau tidak ada chat lain."""
+        with self.transaction():
+            self.conn.execute("DELETE FROM shop_watches WHERE chat_id IS ? AND feed_id = ?", (chat_id, feed_id))
+            if self.conn.execute("SELECT 1 FROM shop_watches WHERE feed_id = ? LIMIT 1", (feed_id,)).fetchone():
+                return
+            for table in ("shop_feeds", "feed_pages", "feed_items"):
+                column = "id" if table == "shop_feeds" else "feed_id"
+                self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (feed_id,))
+
+    def load_shop_feeds(self) -> List[dict]:
+        """Semua feed + chat yang memantaunya (`chats`)."""
+        feeds: Dict[int, dict] = {}
+        rows = self.conn.execute(
+            f"SELECT {self._FEED_COLUMNS}, w.chat_id FROM shop_feeds f "
+            "JOIN shop_watches w ON w.feed_id = f.id ORDER BY f.id, w.created_at"
+        )
+        for row in rows:
+            feed = feeds.get(row[0])
+            if feed is None:
+                feed = feeds[row[0]] = dict(self._feed_dict(row), chats=[])
+            feed["chats"].append(row[6])
+        return list(feeds.values())
+
+    def shop_watches_of_chat(self, chat_id: Optional[int]) -> List[dict]:
+        rows = self.conn.execute(
+            f"SELECT {self._FEED_COLUMNS}, (SELECT COUNT(*) FROM feed_items i WHERE i.feed_id = f.id) "
+            "FROM shop_watches w JOIN shop_feeds f ON f.id = w.feed_id WHERE w.chat_id IS ? ORDER BY w.created_at",
+            (chat_id,),
+        )
+        return [dict(self._feed_dict(row), items=row[6]) for row in rows]
+
+    def feed_page_checksum(self, feed_id: int, page: int) -> Optional[int]:
+        row = self.conn.execute(
+            "SELECT checksum FROM feed_pages WHERE feed_id = ? AND page = ?", (feed_id, page)
+        ).fetchone()
+        return row[0] if row else None
+
+    def feed_items(self, feed_id: int, item_ids: List[str]) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+        """item_id -> (stock, price) terakhir, hanya untuk item yang sudah pernah dilihat."""
+        if not item_ids:
+            return {}
+        rows = self.conn.execute(
+            f"SELECT item_id, stock, price FROM feed_items WHERE feed_id = ? AND item_id IN ({','.join('?' * len(item_ids))})",
+            [feed_id, *item_ids],
+        )
+        return {item_id: (stock, price) for item_id, stock, price in rows}
+
+    def save_feed_page(self, feed_id: int, page: int, checksum: int, items: List[Tuple[str, Optional[int], Optional[int]]]):
+        """Checksum halaman + (item_id, stock, price) item yang berubah dalam satu transaksi."""
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO feed_pages (feed_id, page, checksum, crawled_at) VALUES (?, ?, ?, ?)",
+                (feed_id, page, checksum, time.time()),
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO feed_items (feed_id, item_id, stock, price) VALUES (?, ?, ?, ?)",
+                [(feed_id, *item) for item in items],
+            )
+
+    def save_feed_cursor(self, feed_id: int, sweep_page: int, baseline: bool, last_page: Optional[int] = None):
+        """Posisi sweep berikutnya; `last_page` = halaman terakhir listing (checksum sesudahnya dibuang)."""
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE shop_feeds SET sweep_page = ?, baseline = ? WHERE id = ?", (sweep_page, int(baseline), feed_id)
+            )
+            if last_page is not None:
+                self.conn.execute("DELETE FROM feed_pages WHERE feed_id = ? AND page > ?", (feed_id, last_page))
+
+    def transaction(self):
+        return _Transaction(self.conn)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        # IMMEDIATE: ambil lock tulis di awal, jadi proses lain (worker cluster)
+        # menunggu busy timeout alih-alih gagal di tengah transaksi
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def import_legacy_json(storage: SQLiteStorage, paths: Iterable[str] = LEGACY_JSON_FILES) -> int:
+    """
+    Import satu kali dari data/products.json & data/product.json lama.
+    Format yang diterima: list produk atau dict {item_id: produk}; tiap produk
+    minimal punya shop_id+item_id atau url. Return jumlah produk yang diimport.
+    """
+    if storage.get_meta("legacy_json_imported"):
+        return 0
+
+    from src.monitor import parse_shopee_url
+
+    imported = 0
+    with storage.transaction():
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("⚠️ Gagal baca %s: %s", path, e)
+                continue
+
+            entries = raw.values() if isinstance(raw, dict) else raw
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    continue
+                shop_id, item_id = entry.get("shop_id"), entry.get("item_id")
+                if not (shop_id and item_id) and entry.get("url"):
+                    ids = parse_shopee_url(entry["url"])
+                    if ids:
+                        shop_id, item_id = ids
+                if not (shop_id and item_id):
+                    continue
+
+                key = (str(shop_id), str(item_id))
+                product = {
+                    "name": entry.get("name") or entry.get("alias") or "Unknown",
+                    "stock": entry.get("stock", "N/A"),
+                    "price": entry.get("price", "N/A"),
+                    "shop_id": key[0],
+                    "item_id": key[1],
+                    "url": entry.get("url"),
+                }
+                stock = product["stock"]
+                product["last_status"] = entry.get("last_status") or {
+                    "available": isinstance(stock, int) and stock > 0,
+                    "stock": stock,
+                    "price": product["price"],
+                }
+                storage.save_product(product)
+                storage.add_subscription(entry.get("chat_id"), key)
+                imported += 1
+
+        storage.set_meta("legacy_json_imported", str(time.time()))
+
+    if imported:
+        logger.info("📥 %s produk diimport dari JSON lama", imported)
+    return imported
@@ -1,12 +1,84 @@
 from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
-from src.monitor import ProductMonitor
+from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from config.setting import (
+    ADMIN_CHAT_IDS,
+    IMPORT_MAX_BYTES,
+    IMPORT_MAX_ITEMS,
+    LAZY_STARTUP,
+    POLL_MODE,
+    TELEGRAM_API_URL,
+    WORKER_TIMEOUT,
+)
+from src.catalog import CatalogCrawler, feed_label
+from src.metrics import MetricsServer, metrics
+from src.monitor import get_monitor
+from src.notifier import NotificationDispatcher
+from src.poller import RestockPoller
+from src.rules import parse_rule
+from src.urls import is_short_link, parse_shop_id, parse_urls
+import csv
+import functools
+import html
+import io
+import logging
 import os
+import time
 
-monitor = ProductMonitor()
+logger = logging.getLogger(__name__)
+
+monitor = None  # dibuat di post_init (start_poller), bukan saat import
+poller = None
+notifier = None
+metrics_server = None
+crawler = None
+warmup = None  # task muat data + start poller (LAZY_STARTUP)
+admin_chats = {int(c) for c in ADMIN_CHAT_IDS.replace(" ", "").split(",") if c.lstrip("-").isdigit()}
+poll_mode = None  # None = POLL_MODE dari config; "remote" untuk ROLE=bot
+
+def after_load(handler):
+    """
+    Handler yang butuh daftar pantauan. Selama data masih dimuat di background,
+    handler dijalankan sebagai task setelah muat selesai supaya antrian update
+    (mis. /start, /status, /stats) tidak ikut tertahan.
+    """
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if monitor.loaded.is_set():
+            return await handler(update, context)
+
+        async def deferred():
+            await monitor.loaded.wait()
+            await handler(update, context)
+
+        context.application.create_task(deferred(), update=update)
+
+    return wrapper
+
+HELP = (
+    "🤖 Bot Monitor Restock Shopee\n\n"
+    "📋 Perintah:\n"
+    "/add <url> - Pantau produk (link shopee.co.id atau shp.ee)\n"
+    "/list - Produk yang dipantau\n"
+    "/remove <nomor> - Berhenti memantau produk\n"
+    "/urgent <nomor> [1-3] - Cek produk lebih sering\n"
+    "/rule <nomor> [aturan | hapus] - Harga target, stok minimal, variasi, jam tenang\n"
+    "/history <nomor> [hari] - Riwayat harga & stok\n"
+    "/import - Tambah banyak link sekaligus (teks atau file)\n"
+    "/export - Simpan daftar produk ke CSV\n"
+    "/watchshop <link toko> [kata kunci] - Pantau listing baru & restock satu toko\n"
+    "/shops - Toko yang dipantau, /unwatchshop <nomor> untuk berhenti\n"
+    "/status - Kondisi koneksi ke Shopee\n\n"
+    "🎯 Contoh aturan:\n"
+    "/rule 2 harga=150rb stok=3 variasi=merah sepi=22-07\n"
+    "Produk nomor 2 (lihat /list) cuma dikabari saat ada variasi merah dengan harga ≤ Rp 150.000 "
+    "dan stok ≥ 3; jam 22.00-07.00 WIB notifikasi ditahan."
+)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🚀 Kirim link produk Shopee pakai /add <url>")
+    await update.message.reply_text("🚀 Kirim link produk Shopee pakai /add <url>\nDaftar perintah: /help")
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(HELP)
 
 async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
@@ -14,7 +86,7 @@ async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     url = context.args[0]
-    success, product_info = monitor.add_product(url)
+    success, product_info = await monitor.add_product(url, chat_id=update.effective_chat.id)
 
     if success:
         msg = (
@@ -28,14 +100,494 @@ async def add_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await update.message.reply_text("❌ Gagal tambah produk (URL salah / API error).")
 
-def run_bot():
+async def _import_text(update: Update) -> str:
+    """Teks yang di-/import: isi pesan itu sendiri, file yang dilampirkan, atau pesan yang di-reply."""
+    message = update.message
+    sources = [message, message.reply_to_message] if message.reply_to_message else [message]
+    parts = []
+    for source in sources:
+        document = source.document
+        if document is not None:
+            if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+                raise ValueError(f"file terlalu besar (maks {IMPORT_MAX_BYTES // 1024} KB)")
+            data = await (await document.get_file()).download_as_bytearray()
+            parts.append(bytes(data[:IMPORT_MAX_BYTES]).decode("utf-8", errors="replace"))
+        parts.append(source.text or source.caption or "")
+    return "\n".join(parts)
+
+async def import_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/import: tambah banyak URL sekaligus (teks, file .txt/.csv, atau reply ke pesan berisi URL)."""
+    try:
+        text = await _import_text(update)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ Gagal baca daftar: {e}")
+        return
+
+    parsed = parse_urls(text, IMPORT_MAX_ITEMS)
+    if not parsed:
+        await update.message.reply_text(
+            "⚠️ Tidak ada URL produk Shopee. Kirim `/import` diikuti URL (satu per baris), "
+            "lampirkan file .txt/.csv dengan caption `/import`, atau reply pesan berisi URL.",
+            parse_mode="Markdown",
+        )
+        return
+
+    progress_msg = await update.message.reply_text(f"⏳ Mengimpor {len(parsed)} produk...")
+    unresolved = []
+    if parsed.short_links:
+        # link pendek -> id produk (cache dulu, sisanya paralel)
+        unresolved = parsed.merge_resolved(await monitor.resolver.resolve_many(parsed.short_links))
+    last_edit = time.monotonic()
+
+    async def progress(result: dict):
+        nonlocal last_edit
+        # edit pesan paling sering tiap 2 detik (batas rate Telegram)
+        if result["done"] < result["total"] and time.monotonic() - last_edit >= 2:
+            last_edit = time.monotonic()
+            try:
+                await progress_msg.edit_text(f"⏳ Mengimpor... {result['done']}/{result['total']}")
+            except Exception as e:
+                logger.debug("edit progress /import gagal: %s", e)
+
+    result = await monitor.add_many(parsed.keys, chat_id=update.effective_chat.id, progress=progress)
+
+    lines = [
+        f"✅ Import selesai: {result['done']} URL diproses",
+        f"🆕 Produk baru: {result['added']}",
+        f"➕ Sudah dipantau bot, ditambahkan ke daftarmu: {result['subscribed']}",
+        f"♻️ Sudah ada di daftarmu: {result['already']}",
+    ]
+    if result["failed"]:
+        lines.append(f"❌ Gagal fetch: {result['failed']}")
+        lines.extend(f"   {url}" for url in result["failed_urls"][:5])
+    if parsed.duplicates:
+        lines.append(f"🔁 Duplikat di daftar: {parsed.duplicates}")
+    if parsed.invalid:
+        lines.append(f"⚠️ Bukan link produk: {len(parsed.invalid)}")
+    if unresolved:
+        lines.append(f"🔗 Link pendek gagal di-resolve: {len(unresolved)}")
+        lines.extend(f"   {url}" for url in unresolved[:5])
+    if len(parsed) >= IMPORT_MAX_ITEMS:
+        lines.append(f"✂️ Dipotong di {IMPORT_MAX_ITEMS} URL")
+    await progress_msg.edit_text("\n".join(lines))
+
+async def export_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/export: daftar pantauan chat ini sebagai CSV (bisa di-/import lagi)."""
+    chat_id = update.effective_chat.id
+    products = monitor.list_products(chat_id)
+    if not products:
+        await update.message.reply_text("📭 Belum ada produk yang dipantau. Gunakan /add <url>")
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["url", "shop_id", "item_id", "name", "price", "stock", "available", "urgency"])
+    for product in products:
+        key = (product["shop_id"], product["item_id"])
+        writer.writerow([
+            product["url"], product["shop_id"], product["item_id"], product["name"], product["price"],
+            product["stock"], int(bool(product["last_status"]["available"])), monitor.get_urgency(chat_id, key),
+        ])
+    await update.message.reply_document(
+        io.BytesIO(buffer.getvalue().encode("utf-8")),
+        filename="watchlist.csv",
+        caption=f"📋 {len(products)} produk. Kirim balik dengan caption /import untuk memulihkan.",
+    )
+
+async def list_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    products = monitor.list_products(update.effective_chat.id)
+    if not products:
+        await update.message.reply_text("📭 Belum ada produk yang dipantau. Gunakan /add <url>")
+        return
+
+    lines = ["📋 Produk yang dipantau:\n"]
+    for i, product in enumerate(products, 1):
+        status = "✅ Tersedia" if product["last_status"]["available"] else "❌ Habis"
+        key = (product["shop_id"], product["item_id"])
+        urgency = monitor.get_urgency(update.effective_chat.id, key)
+        urgent = f" | ⚡{urgency}" if urgency > 1 else ""
+        rule = monitor.get_rule(update.effective_chat.id, key)
+        ruled = f"\n   🎯 {rule.describe()}" if rule else ""
+        lines.append(f"{i}. {product['name']}\n   {status} | 📦 {product['stock']} | 💰 {product['price']}{urgent}{ruled}")
+    lines.append(
+        "\nHapus dengan /remove <nomor>, prioritaskan dengan /urgent <nomor>, aturan alert /rule <nomor>, "
+        "riwayat harga /history <nomor>, simpan daftar /export"
+    )
+    await update.message.reply_text("\n".join(lines))
+
+async def remove_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("⚠️ Format salah. Gunakan:\n`/remove <nomor>` (lihat /list)", parse_mode="Markdown")
+        return
+
+    removed = monitor.remove_product(update.effective_chat.id, int(context.args[0]) - 1)
+    if removed:
+        await update.message.reply_text(f"🗑️ {removed['name']} dihapus dari daftar pantauan.")
+    else:
+        await update.message.reply_text("❌ Nomor tidak valid. Cek lagi dengan /list")
+
+async def watch_shop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/watchshop <link toko | link produk | shop_id> [kata kunci...]"""
+    args = context.args or []
+    target = args[0] if args else ""
+    if is_short_link(target):
+        key = await monitor.resolver.resolve(target)
+        shop_id = key[0] if key else None
+    else:
+        shop_id = parse_shop_id(target) if target else None
+    if not shop_id:
+        await update.message.reply_text(
+            "⚠️ Format salah. Gunakan:\n`/watchshop <link toko / link produknya / shop_id> [kata kunci]`\n"
+            "Link toko berbentuk shopee.co.id/shop/<angka>; kalau tidak ada, pakai link salah satu produknya.",
+            parse_mode="Markdown",
+        )
+        return
+
+    keyword = " ".join(args[1:]).strip().lower()
+    feed_id, added = monitor.storage.add_shop_watch(update.effective_chat.id, shop_id, keyword)
+    label = feed_label({"shop_id": shop_id, "keyword": keyword})
+    if not added:
+        await update.message.reply_text(f"♻️ {label} sudah ada di /shops.")
+        return
+    if crawler is not None:
+        crawler.wake(feed_id)
+    await update.message.reply_text(
+        f"🏪 Memantau {label}: listing baru dan restock akan dikabari.\n"
+        "Daftar toko yang dipantau: /shops, berhenti: /unwatchshop <nomor>"
+    )
+
+async def list_shops(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    feeds = monitor.storage.shop_watches_of_chat(update.effective_chat.id)
+    if not feeds:
+        await update.message.reply_text("📭 Belum ada toko yang dipantau. Gunakan /watchshop <link toko>")
+        return
+    lines = ["🏪 Toko yang dipantau:\n"]
+    for i, feed in enumerate(feeds, 1):
+        sweep = "tersapu" if feed["baseline"] else "sapuan pertama"
+        lines.append(f"{i}. {feed_label(feed)} | {feed['items']} item dikenal ({sweep})")
+    lines.append("\nBerhenti dengan /unwatchshop <nomor>")
+    await update.message.reply_text("\n".join(lines))
+
+async def unwatch_shop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("⚠️ Format salah. Gunakan:\n`/unwatchshop <nomor>` (lihat /shops)", parse_mode="Markdown")
+        return
+    chat_id = update.effective_chat.id
+    feeds = monitor.storage.shop_watches_of_chat(chat_id)
+    index = int(context.args[0]) - 1
+    if not 0 <= index < len(feeds):
+        await update.message.reply_text("❌ Nomor tidak valid. Cek lagi dengan /shops")
+        return
+    monitor.storage.remove_shop_watch(chat_id, feeds[index]["id"])
+    await update.message.reply_text(f"🗑️ Berhenti memantau {feed_label(feeds[index])}.")
+
+SPARK = "▁▂▃▄▅▆▇█"
+
+def sparkline(samples, start: int, end: int, buckets: int = 12) -> str:
+    """Harga terendah per potongan waktu; potongan kosong ikut harga sebelumnya."""
+    if not samples:
+        return ""
+    width = max(1, (end - start) / buckets)
+    values, i, last = [], 0, None
+    for n in range(buckets):
+        bucket_end = start + (n + 1) * width
+        low = None
+        while i < len(samples) and samples[i][0] < bucket_end:
+            if samples[i][1] is not None:
+                low = samples[i][1] if low is None else min(low, samples[i][1])
+                last = samples[i][1]
+            i += 1
+        values.append(low if low is not None else last)
+    known = [v for v in values if v is not None]
+    lo, hi = min(known), max(known)
+    return "".join(
+        " " if v is None else SPARK[0 if hi == lo else int((v - lo) / (hi - lo) * (len(SPARK) - 1))]
+        for v in values
+    )
+
+RULE_HELP = (
+    "⚠️ Format salah. Gunakan:\n"
+    "/rule <nomor> harga=150rb stok=3 variasi=merah xl sepi=22-07\n"
+    "/rule <nomor> (lihat aturan), /rule <nomor> hapus (kembali ke notifikasi biasa)\n\n"
+    "Semua bagian opsional. Dengan harga/stok/variasi kamu cuma dikabari saat syaratnya baru terpenuhi; "
+    "sepi = jam tenang (WIB), notifikasi ditahan sampai jam tenang selesai."
+)
+
+async def set_rule(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/rule <nomor> [aturan | hapus]"""
+    args = context.args or []
+    if not args or not args[0].isdigit():
+        await update.message.reply_text(RULE_HELP)
+        return
+
+    chat_id, index = update.effective_chat.id, int(args[0]) - 1
+    products = monitor.list_products(chat_id)
+    if not 0 <= index < len(products):
+        await update.message.reply_text("❌ Nomor tidak valid. Cek lagi dengan /list")
+        return
+    product = products[index]
+    text = " ".join(args[1:]).strip()
+    if not text:
+        rule = monitor.get_rule(chat_id, (product["shop_id"], product["item_id"]))
+        described = rule.describe() if rule else "belum ada (notifikasi biasa)"
+        await update.message.reply_text(f"🎯 Aturan {product['name']}: {described}")
+        return
+    if text.lower() in ("hapus", "off", "reset"):
+        monitor.set_rule(chat_id, index, None)
+        await update.message.reply_text(f"🎯 Aturan {product['name']} dihapus, kembali ke notifikasi biasa.")
+        return
+
+    try:
+        rule = parse_rule(text)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{RULE_HELP}")
+        return
+    monitor.set_rule(chat_id, index, rule)
+    await update.message.reply_text(f"🎯 Aturan {product['name']}: {rule.describe()}")
+
+async def history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args or []
+    if not args or not args[0].isdigit() or (len(args) > 1 and not args[1].isdigit()):
+        await update.message.reply_text("⚠️ Format salah. Gunakan:\n`/history <nomor> [hari]` (lihat /list)", parse_mode="Markdown")
+        return
+    if monitor.history is None:
+        await update.message.reply_text("❌ Riwayat tidak aktif.")
+        return
+
+    products = monitor.list_products(update.effective_chat.id)
+    index = int(args[0]) - 1
+    if not 0 <= index < len(products):
+        await update.message.reply_text("❌ Nomor tidak valid. Cek lagi dengan /list")
+        return
+
+    product = products[index]
+    days = int(args[1]) if len(args) > 1 else 7
+    end = int(time.time())
+    start = end - days * 86400
+    lines = [f"📈 Riwayat {days} hari: {product['name']}\n"]
+    series = monitor.history.item_series(product["shop_id"], product["item_id"])
+    for key in series[:10]:
+        samples = monitor.history.query(key, start, end)
+        stats = monitor.history.window_stats(key, start, end)
+        if not stats:
+            continue
+        label = f"Variasi {key[2]}" if key[2] else "Harga"
+        lines.append(
+            f"{label}: Rp {stats['last']:,} | min Rp {stats['min']:,} | rata2 Rp {stats['avg']:,.0f} | "
+            f"maks Rp {stats['max']:,} | stok {stats['stock']}\n   {sparkline(samples, start, end)}"
+        )
+    if len(series) > 10:
+        lines.append(f"... dan {len(series) - 10} variasi lain")
+    if len(lines) == 1:
+        lines.append("Belum ada data.")
+    await update.message.reply_text("\n".join(lines))
+
+async def set_urgent(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args or []
+    if not args or not args[0].isdigit() or (len(args) > 1 and args[1] not in ("1", "2", "3")):
+        await update.message.reply_text(
+            "⚠️ Format salah. Gunakan:\n`/urgent <nomor> [1-3]` (1 = normal, 3 = paling sering dicek)",
+            parse_mode="Markdown",
+        )
+        return
+
+    level = int(args[1]) if len(args) > 1 else 3
+    product = monitor.set_urgency(update.effective_chat.id, int(args[0]) - 1, level)
+    if product:
+        await update.message.reply_text(f"⚡ Urgensi {product['name']} diset ke {level}.")
+    else:
+        await update.message.reply_text("❌ Nomor tidak valid. Cek lagi dengan /list")
+
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tidak menunggu after_load: selama data dimuat, progresnya ikut ditampilkan."""
+    client_status = monitor.batcher.client.status()
+    breaker = client_status["breaker"]
+    lines = ["📡 Status Shopee API"]
+    if not monitor.loaded.is_set():
+        subscriptions = sum(len(s) for s in monitor.subscribers.values())
+        lines.append(
+            f"⏳ Daftar pantauan masih dimuat: {len(monitor.products)} produk, {subscriptions} langganan sejauh ini"
+        )
+    lines.append(f"Circuit: {breaker['state']} (blok beruntun {breaker['consecutive_blocks']}, trip {breaker['trips']})")
+    if breaker["retry_in"]:
+        lines.append(f"Probe berikutnya: {breaker['retry_in']:.0f}s")
+    for cred in client_status["credentials"]:
+        health = "✅" if cred["healthy"] else f"🚫 karantina {cred['quarantine_left']:.0f}s"
+        rates = ", ".join(f"{l['rate']} req/s" for l in cred["limiters"].values()) or "-"
+        lines.append(
+            f"🔑 {os.path.basename(cred['name'])}: {health} | {rates} | "
+            f"ok {cred['successes']}, blok {cred['blocks']}"
+        )
+
+    batcher = monitor.batcher
+    lines.append(f"Lookup: {batcher.requests}, coalesced {batcher.coalesced}, request {batcher.sent}")
+    cache = client_status["cache"]
+    lines.append(
+        f"Cache: {cache['size']} item, hit {cache['hits']}, stale {cache['stale_hits']}, "
+        f"miss {cache['misses']}, 304 {cache['revalidations']}, evict {cache['evictions']}"
+    )
+    changes = monitor.detector.stats()
+    lines.append(
+        f"Snapshot: {changes['items']} item / {changes['variants']} variasi, "
+        f"diff {changes['diffs']}, sama {changes['unchanged']}, event {changes['events']}"
+    )
+    rules = monitor.rules.stats()
+    if rules["rules"]:
+        lines.append(
+            f"Aturan /rule: {rules['rules']} aturan di {rules['items']} item, "
+            f"item dievaluasi {rules['evaluated']}, terpenuhi {rules['hits']}"
+        )
+    if monitor.history is not None:
+        hist = monitor.history.stats()
+        lines.append(
+            f"Riwayat: {hist['series']} series, {hist['samples']} sample, {hist['segments']} segment, "
+            f"{hist['bytes_per_sample']:.1f} byte/sample"
+        )
+
+    if notifier is not None:
+        sent = notifier.status()
+        lines.append(
+            f"Notifikasi: antri {sent['pending']}, terkirim {sent['delivered']} ({sent['sent']} pesan, "
+            f"{sent['digests']} digest), 429 {sent['retries']}, dibuang {sent['dropped']}, rate {sent['rate']}/s"
+        )
+        if sent["paused_for"]:
+            lines.append(f"Notifikasi dipause {sent['paused_for']:.0f}s (flood limit)")
+
+    if poller is not None and poller.adaptive is not None:
+        sched = poller.status()
+        lines.append(
+            f"Scheduler adaptif: {sched['items']} item, budget {sched['budget']} req/s, "
+            f"interval {sched.get('min_interval', '-')}s–{sched.get('max_interval', '-')}s "
+            f"(median {sched.get('median_interval', '-')}s), telat {sched.get('overdue', 0)}, check {sched['checks']}"
+        )
+
+    if crawler is not None:
+        crawl = crawler.stats
+        lines.append(
+            f"Crawler toko: {crawl['crawls']} crawl, {crawl['pages']} halaman (sama {crawl['unchanged']}), "
+            f"listing baru {crawl['new']}, restock {crawl['restocks']}, gagal {crawl['failed']}"
+        )
+
+    if poller is not None and poller.mode == "remote":
+        workers = monitor.storage.live_workers(WORKER_TIMEOUT)
+        lines.append(f"Worker aktif: {len(workers)} ({', '.join(workers) or '-'}), hasil diterima {poller.checks}")
+
+    cycle = poller.last_cycle if poller else {}
+    if cycle.get("paused"):
+        lines.append(f"Cycle terakhir: dipause ({cycle['items']} item)")
+    elif cycle:
+        lines.append(
+            f"Cycle terakhir: {cycle['checked']}/{cycle['items']} item, "
+            f"{cycle['duration']:.1f}s, terlewat {cycle['missed']}"
+        )
+    await update.message.reply_text("\n".join(lines))
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_chat.id not in admin_chats:
+        await update.message.reply_text("⛔ Command ini khusus admin.")
+        return
+
+    uptime = time.time() - metrics.started
+    lines = [f"📊 Metrics ({uptime / 3600:.1f} jam)", "", "Tahap        n      avg    p50    p99    max (ms)"]
+    for stage, s in metrics.stages().items():
+        lines.append(
+            f"{stage:<10} {s['count']:>7} {s['avg'] * 1000:>7.1f} {s['p50'] * 1000:>6.0f} "
+            f"{s['p99'] * 1000:>6.0f} {s['max'] * 1000:>6.0f}"
+        )
+
+    def counts(name: str, label: str) -> str:
+        values = metrics.by_label(name, label)
+        return ", ".join(f"{k}: {v:g}" for k, v in sorted(values.items())) or "-"
+
+    lines += [
+        "",
+        f"HTTP: {counts('http_responses_total', 'status')}",
+        f"Error code Shopee: {counts('api_errors_total', 'code')}",
+        f"Fetch gagal: {counts('fetch_errors_total', 'kind')}",
+        f"Poll: {counts('polls_total', 'changed')} (berubah)",
+        f"Event: {counts('events_total', 'kind')}",
+        f"Notifikasi: {counts('notifications_total', 'result')}",
+        f"Poll lag: {metrics.gauges.get(('poll_lag_seconds', ()), 0.0):.1f}s",
+    ]
+    if metrics_server is not None and metrics_server.port:
+        lines.append(f"Prometheus: http://{metrics_server.host}:{metrics_server.port}/metrics")
+    await update.message.reply_text("<pre>" + html.escape("\n".join(lines)) + "</pre>", parse_mode="HTML")
+
+async def start_poller(app: Application):
+    global monitor, notifier, metrics_server, warmup
+    # lazy: cuma buka storage di sini, isi pantauan dimuat di _warm_up
+    monitor = get_monitor(lazy=LAZY_STARTUP)
+    notifier = NotificationDispatcher(app.bot, monitor.storage)
+    notifier.start()
+    # post_init menahan getUpdates: muat data besar di background, bot langsung jawab
+    warmup = app.create_task(_warm_up())
+
+    metrics.gauge_fn("tracked_items", lambda: len(monitor.products))
+    metrics.gauge_fn("cache_items", lambda: len(monitor.batcher.client.cache))
+    metrics_server = MetricsServer()
+    try:
+        if await metrics_server.start():
+            logger.info("📊 Metrics di http://%s:%s/metrics", metrics_server.host, metrics_server.port)
+    except OSError as e:
+        logger.warning("⚠️ Endpoint metrics tidak bisa dibuka: %s", e)
+        metrics_server = None
+
+async def _warm_up():
+    global poller, crawler
+    if not monitor.loaded.is_set():
+        await monitor.load_async()
+    # check pertama disebar sepanjang interval (lihat RestockPoller._sync)
+    poller = RestockPoller(monitor, notifier, mode=poll_mode or POLL_MODE)
+    poller.start()
+    crawler = CatalogCrawler(monitor, notifier)
+    crawler.start()
+
+async def stop_poller(app: Application):
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    if crawler is not None:
+        crawler.stop()
+    if poller is not None:
+        poller.stop()
+    if notifier is not None:
+        await notifier.stop()
+    if metrics_server is not None:
+        await metrics_server.stop()
+    if monitor is not None:
+        await monitor.resolver.aclose()
+        monitor.close()
+
+def run_bot(role: str = "all"):
+    """role "all": bot + poller satu proses; "bot": poll dikerjakan worker (src/cluster.py)."""
+    global poll_mode
+    poll_mode = "remote" if role == "bot" else None
+
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not token:
-        print("❌ TELEGRAM_BOT_TOKEN belum diset!")
+        logger.error("❌ TELEGRAM_BOT_TOKEN belum diset!")
         return
 
-    app = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(TELEGRAM_API_URL)
+    app = builder.post_init(start_poller).post_shutdown(stop_poller).build()
     app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("add", add_product))
-    print("🤖 Bot Telegram is running...")
+    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("add", after_load(add_product)))
+    app.add_handler(CommandHandler("list", after_load(list_products)))
+    app.add_handler(CommandHandler("import", after_load(import_products)))
+    app.add_handler(
+        MessageHandler(filters.Document.ALL & filters.CaptionRegex(r"^/import\b"), after_load(import_products))
+    )
+    app.add_handler(CommandHandler("export", after_load(export_products)))
+    app.add_handler(CommandHandler("remove", after_load(remove_product)))
+    app.add_handler(CommandHandler("urgent", after_load(set_urgent)))
+    app.add_handler(CommandHandler("rule", after_load(set_rule)))
+    app.add_handler(CommandHandler("history", after_load(history)))
+    app.add_handler(CommandHandler("watchshop", after_load(watch_shop)))
+    app.add_handler(CommandHandler("shops", after_load(list_shops)))
+    app.add_handler(CommandHandler("unwatchshop", after_load(unwatch_shop)))
+    app.add_handler(CommandHandler("status", status))
+    app.add_handler(CommandHandler("stats", stats))
+    logger.info("🤖 Bot Telegram is running...")
     app.run_polling()
@@ -0,0 +1,143 @@
+"""
+Parser URL produk Shopee: satu set regex yang di-compile sekali, dipakai
+/add, /import dan parse_shopee_url.
+
+Bentuk yang dikenali:
+
+  https://shopee.co.id/Nama-Produk-i.<shop_id>.<item_id>?sp_atk=...
+  https://shopee.co.id/product/<shop_id>/<item_id>?...
+  shopee.co.id/...                    (tanpa http://)
+  https://shopee.co.id/universal-link?redir=<URL produk ter-encode>  (link app)
+  https://shopee.co.id/shop/<shop_id> (link toko, lihat parse_shop_id)
+  https://shp.ee/xxxx, id.shp.ee/xxxx (link pendek: id-nya baru diketahui
+                                       setelah redirect, lihat src/resolver.py)
+"""
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+ProductKey = Tuple[str, str]  # (shop_id, item_id)
+
+# URL Shopee di tengah teks bebas (pesan, CSV, satu URL per baris, ...)
+URL_RE = re.compile(
+    r"(?:https?://)?(?:[a-z0-9-]+\.)*(?:shopee\.co\.id|shp\.ee)(?:/[^\s<>\"',;|]*)?",
+    re.IGNORECASE,
+)
+# -i.<shop>.<item> di slug produk, atau i.<shop>.<item> di awal segmen path
+SLUG_ID_RE = re.compile(r"(?:^|[-/.])i\.(\d{1,20})\.(\d{1,20})(?!\d)")
+PATH_ID_RE = re.compile(r"/product/(\d{1,20})/(\d{1,20})(?!\d)")
+SHOP_PATH_RE = re.compile(r"/shop/(\d{1,20})(?!\d)")
+SHORT_LINK_RE = re.compile(r"^(?:https?://)?(?:[a-z0-9-]+\.)?shp\.ee/\S+$", re.IGNORECASE)
+
+TRAILING = ").,]>}!"
+
+
+def _search_ids(text: str) -> Optional[ProductKey]:
+    match = SLUG_ID_RE.search(text) or PATH_ID_RE.search(text)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def parse_product_url(url: str) -> Optional[ProductKey]:
+    """(shop_id, item_id) dari URL produk, None kalau bukan URL produk (atau link pendek)."""
+    path, _, query = url.split("#", 1)[0].partition("?")
+    ids = _search_ids(path)
+    if ids is None and "%2F" in query.upper():
+        # link app / universal-link: URL produk ter-encode di query (redir=...)
+        ids = _search_ids(unquote(query))
+    return ids
+
+
+def parse_shop_id(text: str) -> Optional[str]:
+    """shop_id dari angka, link toko (shopee.co.id/shop/<id>) atau link salah satu produknya."""
+    text = text.strip()
+    if text.isdigit():
+        return text
+    match = SHOP_PATH_RE.search(text.split("?", 1)[0])
+    if match is not None:
+        return match.group(1)
+    key = parse_product_url(text)
+    return key[0] if key else None
+
+
+def product_url(key: ProductKey) -> str:
+    """URL kanonik untuk item yang id-nya sudah diketahui (mis. hasil resolve link pendek)."""
+    return f"https://shopee.co.id/product/{key[0]}/{key[1]}"
+
+
+def is_short_link(url: str) -> bool:
+    return SHORT_LINK_RE.match(url) is not None
+
+
+def short_link_key(url: str) -> str:
+    """Bentuk normal link pendek untuk cache & dedupe: host huruf kecil, tanpa skema/query."""
+    host, _, path = url.split("://", 1)[-1].split("?", 1)[0].split("#", 1)[0].partition("/")
+    return f"{host.lower()}/{path.rstrip('/')}"  # kode link pendek case-sensitive
+
+
+def extract_urls(text: str) -> Iterator[str]:
+    """Semua URL Shopee di `text`, urut kemunculan (belum dedupe)."""
+    for match in URL_RE.finditer(text):
+        url = match.group(0).rstrip(TRAILING)
+        if "/" in url:
+            yield url
+
+
+class ParsedUrls:
+    """
+    Hasil parse satu daftar URL:
+
+    keys        : (shop_id, item_id) -> URL pertama yang menyebutnya (urut, unik)
+    short_links : link pendek unik yang perlu di-resolve
+    invalid     : URL Shopee yang bukan link produk
+    duplicates  : URL yang menunjuk item / link pendek yang sudah ada di daftar
+    """
+
+    __slots__ = ("keys", "short_links", "invalid", "duplicates")
+
+    def __init__(self):
+        self.keys: Dict[ProductKey, str] = {}
+        self.short_links: List[str] = []
+        self.invalid: List[str] = []
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.keys) + len(self.short_links)
+
+    def merge_resolved(self, resolved: Dict[str, Optional[ProductKey]]) -> List[str]:
+        """Gabungkan hasil resolve link pendek ke `keys`; return link yang gagal di-resolve."""
+        failed = []
+        for url in self.short_links:
+            key = resolved.get(url)
+            if key is None:
+                failed.append(url)
+            elif key in self.keys:
+                self.duplicates += 1
+            else:
+                self.keys[key] = product_url(key)
+        self.short_links = []
+        return failed
+
+
+def parse_urls(text: str, limit: Optional[int] = None) -> ParsedUrls:
+    """Parse & dedupe semua URL di `text`; berhenti setelah `limit` item unik."""
+    parsed = ParsedUrls()
+    seen_short = set()
+    for url in extract_urls(text):
+        if limit is not None and len(parsed) >= limit:
+            break
+        key = parse_product_url(url)
+        if key is not None:
+            if key in parsed.keys:
+                parsed.duplicates += 1
+            else:
+                parsed.keys[key] = url if "://" in url else f"https://{url}"
+        elif is_short_link(url):
+            short = short_link_key(url)
+            if short in seen_short:
+                parsed.duplicates += 1
+            else:
+                seen_short.add(short)
+                parsed.short_links.append(url)
+        else:
+            parsed.invalid.append(url)
+    return parsed
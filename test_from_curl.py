@@ -2,6 +2,8 @@ import requests
 import json
 import re
 
+from src.parser import parse_product
+
 def parse_curl(file_path="curl.txt"):
     """Parse curl.txt jadi URL, headers, cookies"""
     with open(file_path) as f:
@@ -28,13 +30,6 @@ def parse_curl(file_path="curl.txt"):
 
     return url, headers, cookies
 
-def safe_int(value):
-    """Convert value ke int, fallback 0 kalau None atau error"""
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        return 0
-
 def fetch_product(file_path="curl.txt"):
     """Fetch produk dari PDP v4 Shopee dan parsing stock/harga/status"""
     url, headers, cookies = parse_curl(file_path)
@@ -52,41 +47,23 @@ def fetch_product(file_path="curl.txt"):
         return None
 
     # cek response
-    if "data" not in data or "item" not in data["data"]:
+    if "data" not in data or "item" not in (data["data"] or {}):
         print("❌ API gagal / data item tidak ada:", data)
         return None
 
-    item = data["data"]["item"]
-    name = item.get("title", "N/A")
-    status = item.get("status", 0)           # 1 = aktif, 0 = nonaktif
-
-    # ambil harga & stok
-    models = item.get("models") or item.get("model_list") or []
-    products_info = []
-
-    if models:
-        for m in models:
-            model_name = m.get("name", "")
-            price = safe_int(m.get("price")) // 100000
-            stock = safe_int(m.get("stock"))
-            products_info.append({
-                "model": model_name,
-                "price": price,
-                "stock": stock,
-                "available": stock > 0,
-            })
-    else:
+    # parsing nama/status/harga/stok per model: sama dengan yang dipakai bot
+    record = parse_product(data)
+    products_info = [v.as_dict() for v in record.variants]
+    if not products_info:
         # kalau tidak ada model, ambil stok dan harga item langsung
-        price = safe_int(item.get("price")) // 100000
-        stock = safe_int(item.get("stock"))
         products_info.append({
             "model": "",
-            "price": price,
-            "stock": stock,
-            "available": stock > 0,
+            "price": record.price,
+            "stock": record.stock or 0,
+            "available": record.available,
         })
 
-    return {"name": name, "status": status, "products": products_info}
+    return {"name": record.name, "status": record.status, "products": products_info}
 
 
 if __name__ == "__main__":
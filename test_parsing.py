@@ -1,4 +1,4 @@
-from monitor import parse_shopee_url
+from src.monitor import parse_shopee_url
 
 url = "https://shopee.co.id/Fibocom-FM350-GL-...-i.270580867.29087761079?sp_atk=xxxx"
 print(parse_shopee_url(url))